@@ -11,6 +11,7 @@ from matplotlib.widgets import CheckButtons
 from matplotlib.widgets import Button
 from sklearn import preprocessing
 import pyedflib
+import SignalCache
 import AccelSubject
 
 xfmt = mdates.DateFormatter("%Y/%m/%d\n%H:%M:%S")
@@ -22,9 +23,10 @@ class ANNE:
 
     def __init__(self, subj_id=None, chest_ecg_file=None, chest_acc_file=None,
                  chest_out_vital_file=None, limb_ppg_file=None, limb_out_vital_file=None,
-                 log_file=None):
+                 log_file=None, cache_dir=None):
 
         self.subj_id = subj_id
+        self.cache_dir = cache_dir
 
         self.chest_acc = None
         self.chest_ecg = None
@@ -116,7 +118,7 @@ class ANNE:
                 self.df_chest.drop("epoch_ms", axis=1)
 
             if "edf" in self.chest_out_vital_file or "EDF" in self.chest_out_vital_file:
-                file = pyedflib.EdfReader(self.chest_out_vital_file)
+                file = SignalCache.open_edf(self.chest_out_vital_file, cache_dir=self.cache_dir)
 
                 self.df_chest = pd.DataFrame(columns=[i for i in file.getSignalLabels()])
                 for chn, col_name in enumerate(file.getSignalLabels()):
@@ -156,7 +158,7 @@ class ANNE:
                 self.chest_acc.drop("time(ms)", axis=1)
 
             if "edf" in self.chest_acc_file or "EDF" in self.chest_acc_file:
-                file = pyedflib.EdfReader(self.chest_acc_file)
+                file = SignalCache.open_edf(self.chest_acc_file, cache_dir=self.cache_dir)
 
                 self.chest_acc = pd.DataFrame(columns=[i for i in file.getSignalLabels()])
                 for chn, col_name in enumerate(file.getSignalLabels()):
@@ -196,7 +198,7 @@ class ANNE:
                 self.chest_ecg.drop("time(ms)", axis=1)
 
             if "edf" in self.chest_ecg_file or "EDF" in self.chest_ecg_file:
-                file = pyedflib.EdfReader(self.chest_ecg_file)
+                file = SignalCache.open_edf(self.chest_ecg_file, cache_dir=self.cache_dir)
 
                 self.chest_ecg = pd.DataFrame(columns=[i for i in file.getSignalLabels()])
                 for chn, col_name in enumerate(file.getSignalLabels()):
@@ -247,7 +249,7 @@ class ANNE:
                 self.df_limb.drop("epoch_ms", axis=1)
 
             if "edf" in self.limb_out_vital_file or "EDF" in self.limb_out_vital_file:
-                file = pyedflib.EdfReader(self.limb_out_vital_file)
+                file = SignalCache.open_edf(self.limb_out_vital_file, cache_dir=self.cache_dir)
 
                 self.df_limb = pd.DataFrame(columns=[i for i in file.getSignalLabels()])
                 for chn, col_name in enumerate(file.getSignalLabels()):
@@ -278,7 +280,7 @@ class ANNE:
                 self.limb_ppg.drop("time(ms)", axis=1)
 
             if "edf" in self.limb_ppg_file or "EDF" in self.limb_ppg_file:
-                file = pyedflib.EdfReader(self.limb_ppg_file)
+                file = SignalCache.open_edf(self.limb_ppg_file, cache_dir=self.cache_dir)
 
                 self.limb_ppg = pd.DataFrame(columns=[i for i in file.getSignalLabels()])
                 for chn, col_name in enumerate(file.getSignalLabels()):
@@ -297,7 +299,8 @@ class ANNE:
     def filter_ecg_data(self, filter_type="bandpass", low_f=0.67, high_f=30):
 
         self.chest_ecg["ecg_filt"] = Filtering.filter_signal(data=self.chest_ecg['ecg'], filter_type=filter_type,
-                                                             low_f=low_f, high_f=high_f, sample_f=self.chest_ecg_fs)
+                                                             low_f=low_f, high_f=high_f, sample_f=self.chest_ecg_fs,
+                                                             block_len=Filtering.BLOCK_LEN)
 
     def filter_acc_data(self, filter_type="bandpass", low_f=0.05, high_f=10):
 
@@ -8,6 +8,11 @@ import pandas as pd
 import os
 import numpy as np
 import Filtering
+import EpochData
+import EpochTable
+import IntensityClassification
+import Headless
+import Instrumentation
 
 xfmt = mdates.DateFormatter("%Y/%m/%d\n%H:%M:%S")
 
@@ -23,7 +28,8 @@ class Subject:
                  crop_starts=False, dom_wrist="Right",
                  processed_filepath=None, from_processed=False,
                  load_raw=True, output_dir=None, epoch_len=15,
-                 write_epoched_data=False, write_intensity_data=False, overwrite_output=False):
+                 write_epoched_data=False, write_intensity_data=False, overwrite_output=False,
+                 epoch_file_format="parquet"):
         """Class to read in EDF-formatted wrist and ankle accelerometer files.
 
         :argument
@@ -38,7 +44,7 @@ class Subject:
         -crop_starts: boolean whether to crop files to start at the same time
         -dom_wrist: "Right" or "Left" for hand dominance
 
-        -processed_filepath: full pathway to .csv file created using Subject.create_epoch_df()
+        -processed_filepath: full pathway to .parquet/.feather/.csv/.xlsx file created using Subject.create_epoch_df()
         -load_raw: whether to load raw data; boolean
         -from_processed: whether to load file specified using processed_filepath; boolean
         -output_dir: full pathway to where files get written
@@ -47,6 +53,7 @@ class Subject:
         -write_intensity_data: whether to write df_daily and activity_totals to .csv's; boolean
         -overwrite_output: whether to automatically overwrite existing df_epoch file; boolean
             -If False, user will be prompted to manually overwrite existing file.
+        -epoch_file_format: "parquet", "feather" or "csv" (export) format of epoched data file
         """
 
         self.subj_id = subj_id
@@ -123,12 +130,16 @@ class Subject:
         self.write_epoched = write_epoched_data
         self.write_intensity_data = write_intensity_data
         self.overwrite_output = overwrite_output
+        self.epoch_file_format = epoch_file_format
 
         self.activity_totals = {"Sedentary": 0, "Light": 0, "Moderate": 0, "Vigorous": 0, "MVPA": 0}
         self.df_daily = pd.DataFrame(columns=["Date", "Sedentary", "Light", "Moderate", "Vigorous", "MVPA"])
 
         self.la_temperature, self.ra_temperature, self.lw_temperature, self.rw_temperature = None, None, None, None
 
+        # Time and memory of each processing stage (see Instrumentation)
+        self.instrumentation = Instrumentation.StageTimer(name=subj_id)
+
         # ================================================== RUNS METHODS =============================================
 
         # Prints summary of what data will be imported
@@ -179,47 +190,50 @@ class Subject:
 
         self.calculate_wrist_intensity()
 
-        print("\n=====================================================================================================")
-        print("Processing complete.")
+        Headless.report("\n================================================="
+                        "====================================================")
+        Headless.report("Processing complete.")
 
     def print_summary(self):
         """Prints summary of what data will be read in."""
 
-        print("======================================================================================================")
-        print("\nData import summary:")
+        Headless.report("==================================================="
+                        "===================================================")
+        Headless.report("\nData import summary:")
 
         if self.lw_filepath is not None:
-            print("-Importing left wrist file: {}".format(self.lw_filepath))
+            Headless.report("-Importing left wrist file: {}".format(self.lw_filepath))
         if self.lw_filepath is None:
-            print("-No left wrist file will be imported.")
+            Headless.report("-No left wrist file will be imported.")
 
         if self.rw_filepath is not None:
-            print("-Importing right wrist file: {}".format(self.rw_filepath))
+            Headless.report("-Importing right wrist file: {}".format(self.rw_filepath))
         if self.rw_filepath is None:
-            print("-No right wrist file will be imported.")
+            Headless.report("-No right wrist file will be imported.")
 
         if self.la_filepath is not None:
-            print("-Importing left ankle file: {}".format(self.la_filepath))
+            Headless.report("-Importing left ankle file: {}".format(self.la_filepath))
         if self.la_filepath is None:
-            print("-No left ankle file will be imported.")
+            Headless.report("-No left ankle file will be imported.")
 
         if self.ra_filepath is not None:
-            print("-Importing right ankle file: {}".format(self.ra_filepath))
+            Headless.report("-Importing right ankle file: {}".format(self.ra_filepath))
         if self.ra_filepath is None:
-            print("-No right ankle file will be imported.")
+            Headless.report("-No right ankle file will be imported.")
 
         if self.load_raw:
-            print("\n-Raw data will be imported.")
+            Headless.report("\n-Raw data will be imported.")
         if not self.load_raw:
-            print("\n-Raw data will not be imported.")
+            Headless.report("\n-Raw data will not be imported.")
 
         if not self.from_processed:
-            print("-Data will not be read from processed.")
+            Headless.report("-Data will not be read from processed.")
         if self.from_processed:
-            print("-Data will be read from processed.")
+            Headless.report("-Data will be read from processed.")
 
-        print()
-        print("======================================================================================================")
+        Headless.report()
+        Headless.report("==================================================="
+                        "===================================================")
 
     @staticmethod
     def check_file(filepath, print_summary=True):
@@ -241,20 +255,21 @@ class Subject:
         end_time = start_time + timedelta(seconds=edf_file.getFileDuration())
 
         if print_summary:
-            print("\n", filepath)
-            print("-Sample rate: {}Hz".format(edf_file.getSampleFrequency(0)))
-            print("-Start time: ", start_time)
-            print("-End time:", end_time)
-            print("-Duration: {} hours".format(round(duration / 3600, 2)))
+            Headless.report("\n {}".format(filepath))
+            Headless.report("-Sample rate: {}Hz".format(edf_file.getSampleFrequency(0)))
+            Headless.report("-Start time:  {}".format(start_time))
+            Headless.report("-End time: {}".format(end_time))
+            Headless.report("-Duration: {} hours".format(round(duration / 3600, 2)))
 
         return start_time, edf_file.getSampleFrequency(0)
     
+    @Instrumentation.timed(Instrumentation.CROP)
     def sync_starts(self):
 
-        print("\nChecking file start times to sync devices...")
+        Headless.report("\nChecking file start times to sync devices...")
 
         if self.la_exists + self.ra_exists + self.lw_exists + self.rw_exists > 1:
-            print("-Multiple files found. Cropping start times...")
+            Headless.report("-Multiple files found. Cropping start times...")
 
             start_dict = {"LA_start": None, "LA_fs": 1, "RA_start": None, "RA_fs": 1,
                           "LW_start": None, "LW_fs": 1, "RW_start": None, "RW_fs": 1}
@@ -273,26 +288,27 @@ class Subject:
 
             if self.la_exists and start_dict["LA_start"] > last_start:
                 self.la_offset = int((last_start - start_dict["LA_start"]).total_seconds() * start_dict["LA_fs"])
-                print("    -Left ankle offset = ", str(self.la_offset))
+                Headless.report("    -Left ankle offset =  {}".format(self.la_offset))
 
             if self.ra_exists and start_dict["RA_start"] > last_start:
                 self.ra_offset = int((last_start - start_dict["RA_start"]).total_seconds() * start_dict["RA_fs"])
-                print("    -Right ankle offset = ", str(self.ra_offset))
+                Headless.report("    -Right ankle offset =  {}".format(self.ra_offset))
 
             if self.lw_exists and start_dict["LW_start"] > last_start:
                 self.lw_offset = int((last_start - start_dict["LW_start"]).total_seconds() * start_dict["LW_fs"])
-                print("    -Left wrist offset = ", str(self.lw_offset))
+                Headless.report("    -Left wrist offset =  {}".format(self.lw_offset))
 
             if self.rw_exists and start_dict["RW_start"] > last_start:
                 self.rw_offset = int((last_start - start_dict["RW_start"]).total_seconds() * start_dict["RW_fs"])
-                print("    -Right wrist offset = ", str(self.rw_offset))
+                Headless.report("    -Right wrist offset =  {}".format(self.rw_offset))
 
             if self.la_offset == 0 and self.ra_offset == 0 and self.lw_offset == 0 and self.rw_offset == 0:
-                print("    -All files begin at same time. No cropping will be performed.")
+                Headless.report("    -All files begin at same time. No cropping will be performed.")
 
         if self.la_exists + self.ra_exists + self.lw_exists + self.rw_exists <= 1:
-            print("-Only one file input/found. No cropping will be performed.")
+            Headless.report("-Only one file input/found. No cropping will be performed.")
 
+    @Instrumentation.timed(Instrumentation.IMPORT)
     def create_wrist_obj(self):
         """Creates wrist accelerometer data object.
            Scales accelerometer cutpoints from Powell et al. (2017) to selected epoch length.
@@ -304,7 +320,8 @@ class Subject:
         """
 
         if self.lw_filepath is not None and os.path.exists(self.lw_filepath):
-            print("\n--------------------------------------- Left wrist file ----------------------------------------")
+            Headless.report("\n--------------------------------------- Left wrist file "
+                            "----------------------------------------")
             lw = AccelerometerCondensed(raw_filepath=self.lw_filepath,
                                         temp_filepath=self.lw_temp_filepath,
                                         load_raw=self.load_raw,
@@ -326,7 +343,8 @@ class Subject:
             lw_cutpoints = {"Light": 1, "Moderate": 1, "Vigorous": 0}
 
         if self.rw_filepath is not None and os.path.exists(self.rw_filepath):
-            print("\n--------------------------------------- Right wrist file ----------------------------------------")
+            Headless.report("\n--------------------------------------- Right wrist file "
+                            "----------------------------------------")
             rw = AccelerometerCondensed(raw_filepath=self.rw_filepath,
                                         temp_filepath=self.rw_temp_filepath,
                                         load_raw=self.load_raw,
@@ -349,6 +367,7 @@ class Subject:
 
         return lw, rw, lw_fs, rw_fs, lw_cutpoints, rw_cutpoints
 
+    @Instrumentation.timed(Instrumentation.IMPORT)
     def create_ankle_obj(self):
         """Creates ankle accelerometer data object.
 
@@ -359,7 +378,8 @@ class Subject:
         la, ra, la_fs, ra_fs = None, None, 1, 1
 
         if self.la_filepath is not None and os.path.exists(self.la_filepath):
-            print("\n--------------------------------------- Left ankle file ----------------------------------------")
+            Headless.report("\n--------------------------------------- Left ankle file "
+                            "----------------------------------------")
             la = AccelerometerCondensed(raw_filepath=self.la_filepath,
                                         temp_filepath=self.la_temp_filepath,
                                         load_raw=self.load_raw,
@@ -368,7 +388,8 @@ class Subject:
             la_fs = la.sample_rate
 
         if self.ra_filepath is not None and os.path.exists(self.ra_filepath):
-            print("\n--------------------------------------- Right ankle file ----------------------------------------")
+            Headless.report("\n--------------------------------------- Right ankle file "
+                            "----------------------------------------")
             ra = AccelerometerCondensed(raw_filepath=self.ra_filepath,
                                         temp_filepath=self.ra_temp_filepath,
                                         load_raw=self.load_raw,
@@ -392,27 +413,17 @@ class Subject:
 
         if self.load_raw and not self.from_processed:
 
-            print("\nEpoching {} data into {}-second epochs...".format(acc_type, self.epoch_len))
+            Headless.report("\nEpoching {} data into {}-second epochs...".format(acc_type, self.epoch_len))
             t0 = datetime.datetime.now()
 
-            vm = [i for i in vm_data]
-            svm = []
-            avm = []
-
-            for i in range(0, len(vm), int(fs * self.epoch_len)):
-
-                if i + self.epoch_len * fs > len(vm):
-                    break
-
-                vm_sum = sum(vm[i:i + self.epoch_len * fs])
-
-                avg = vm_sum * 1000 / len(vm[i:i + self.epoch_len * fs])
+            with self.instrumentation.stage(Instrumentation.EPOCH, n_samples=len(vm_data), source=acc_type):
+                epoched = EpochData.epoch_signal(data=vm_data, sample_rate=fs, epoch_len=self.epoch_len)
 
-                svm.append(round(vm_sum, 2))
-                avm.append(round(avg, 2))
+            svm = [i for i in np.round(epoched["Sum"], 2)]
+            avm = [i for i in np.round(epoched["Mean"] * 1000, 2)]
 
             t1 = datetime.datetime.now()
-            print("Complete ({} seconds)".format(round((t1 - t0).total_seconds(), 1)))
+            Headless.report("Complete ({} seconds)".format(round((t1 - t0).total_seconds(), 1)))
 
             return svm, avm
 
@@ -423,195 +434,59 @@ class Subject:
 
         if self.load_raw and not self.from_processed:
 
-            print("\nEpoching {} temperature data into {}-second epochs...".format(acc_type, self.epoch_len))
+            Headless.report("\nEpoching {} temperature data into {}-second epochs...".format(acc_type, self.epoch_len))
             t0 = datetime.datetime.now()
 
-            temp = [i for i in temp_data]
-            avg_temp = []
-
-            for i in range(0, len(temp), int(fs * self.epoch_len)):
-
-                if i + self.epoch_len * fs > len(temp):
-                    break
-
-                temp_sum = sum(temp[i:i + int(self.epoch_len * fs)])
-
-                avg = temp_sum / len(temp[i:i + int(self.epoch_len * fs)])
+            with self.instrumentation.stage(Instrumentation.EPOCH, n_samples=len(temp_data), source=acc_type):
+                epoched = EpochData.epoch_signal(data=temp_data, sample_rate=fs, epoch_len=self.epoch_len)
 
-                avg_temp.append(round(avg, 2))
+            avg_temp = [i for i in np.round(epoched["Mean"], 2)]
 
             t1 = datetime.datetime.now()
-            print("Complete ({} seconds)".format(round((t1 - t0).total_seconds(), 1)))
+            Headless.report("Complete ({} seconds)".format(round((t1 - t0).total_seconds(), 1)))
 
             return avg_temp
 
-    def fill_missing_data(self):
-
-        # Creates list of epoched data lengths
-        data_lens = []
-
-        if self.lw_svm is not None:
-            data_lens.append(len(self.lw_svm))
-
-        if self.rw_svm is not None:
-            data_lens.append(len(self.rw_svm))
-
-        if self.la_svm is not None:
-            data_lens.append(len(self.la_svm))
-
-        if self.ra_svm is not None:
-            data_lens.append(len(self.ra_svm))
-
-        # Fills data with lists of Nones
-        data_len = max(data_lens)
-
-        if self.lw is None:
-            self.lw_svm = [None for i in range(data_len)]
-            self.lw_avm = [None for i in range(data_len)]
-
-        if self.lw_temp_filepath is None:
-            self.lw_temperature = [None for i in range(data_len)]
-
-        if self.la is None:
-            self.la_svm = [None for i in range(data_len)]
-            self.la_avm = [None for i in range(data_len)]
-
-        if self.la_temp_filepath is None:
-            self.la_temperature = [None for i in range(data_len)]
-
-        if self.rw is None:
-            self.rw_svm = [None for i in range(data_len)]
-            self.rw_avm = [None for i in range(data_len)]
-
-        if self.rw_temp_filepath is None:
-            self.rw_temperature = [None for i in range(data_len)]
-
-        if self.ra is None:
-            self.ra_svm = [None for i in range(data_len)]
-            self.ra_avm = [None for i in range(data_len)]
-
-        if self.ra_temp_filepath is None:
-            self.ra_temperature = [None for i in range(data_len)]
-
+    @Instrumentation.timed(Instrumentation.MODELS)
     def calculate_wrist_intensity(self):
         """Calculates activity intensity using wrist cutpoints from Powell et al. (2017). Requires 15-second epochs.
            Calculates total and daily activity volumes."""
 
-        print("\nCalculating activity intensity data using wrist accelerometer...")
+        Headless.report("\nCalculating activity intensity data using wrist accelerometer...")
 
         if self.epoch_len != 15:
-            print("-Requires 15-second epoch length. Reprocess data and try again.")
+            Headless.report("-Requires 15-second epoch length. Reprocess data and try again.")
             return None
 
-        # LEFT WRIST -------------------------------------------------------------------------------------------------
-        lw = self.df_epoch["LW_SVM"]
-
-        lw_intensity = []
-        for i in lw:
-            if i < self.lw_cutpoints["Light"]:
-                lw_intensity.append("Sedentary")
-            if self.lw_cutpoints["Light"] <= i < self.lw_cutpoints["Moderate"]:
-                lw_intensity.append("Light")
-            if self.lw_cutpoints["Moderate"] <= i < self.lw_cutpoints["Vigorous"]:
-                lw_intensity.append("Moderate")
-            if self.lw_cutpoints["Vigorous"] <= i:
-                lw_intensity.append("Vigorous")
-
-        self.df_epoch["LW_Intensity"] = lw_intensity
-
-        # RIGHT WRIST -------------------------------------------------------------------------------------------------
-        rw = self.df_epoch["RW_SVM"]
-
-        rw_intensity = []
-        for i in rw:
-            if i < self.rw_cutpoints["Light"]:
-                rw_intensity.append("Sedentary")
-            if self.rw_cutpoints["Light"] <= i < self.rw_cutpoints["Moderate"]:
-                rw_intensity.append("Light")
-            if self.rw_cutpoints["Moderate"] <= i < self.rw_cutpoints["Vigorous"]:
-                rw_intensity.append("Moderate")
-            if self.rw_cutpoints["Vigorous"] <= i:
-                rw_intensity.append("Vigorous")
-
-        self.df_epoch["RW_Intensity"] = rw_intensity
-
-        # SUMMARY MEASURES --------------------------------------------------------------------------------------------
         epoch_to_mins = 60 / self.epoch_len
 
-        # Left wrist
-        lw_values = self.df_epoch["LW_Intensity"].value_counts()
-
-        if "Light" not in lw_values.keys():
-            lw_values["Light"] = 0
-        if "Moderate" not in lw_values.keys():
-            lw_values["Moderate"] = 0
-        if "Vigorous" not in lw_values.keys():
-            lw_values["Vigorous"] = 0
-
-        # Right wrist
-        rw_values = self.df_epoch["RW_Intensity"].value_counts()
-
-        if "Light" not in rw_values.keys():
-            rw_values["Light"] = 0
-        if "Moderate" not in rw_values.keys():
-            rw_values["Moderate"] = 0
-        if "Vigorous" not in rw_values.keys():
-            rw_values["Vigorous"] = 0
-
-        # TOTAL ACTIVITY ---------------------------------------------------------------------------------------------
-        self.activity_totals = {"LW_Sedentary": lw_values["Sedentary"] / epoch_to_mins,
-                                "LW_Light": lw_values["Light"] / epoch_to_mins,
-                                "LW_Moderate": lw_values["Moderate"] / epoch_to_mins,
-                                "LW_Vigorous": lw_values["Vigorous"] / epoch_to_mins,
-                                "LW_MVPA": lw_values["Moderate"] / epoch_to_mins +
-                                           lw_values["Vigorous"] / epoch_to_mins,
-                                "RW_Sedentary": rw_values["Sedentary"] / epoch_to_mins,
-                                "RW_Light": rw_values["Light"] / epoch_to_mins,
-                                "RW_Moderate": rw_values["Moderate"] / epoch_to_mins,
-                                "RW_Vigorous": rw_values["Vigorous"] / epoch_to_mins,
-                                "RW_MVPA": rw_values["Moderate"] / epoch_to_mins +
-                                           rw_values["Vigorous"] / epoch_to_mins
-                                }
-
-        # DAILY ACTIVITY ---------------------------------------------------------------------------------------------
-        dates = set([i.date() for i in self.df_epoch["Timestamp"]])
+        # Daily totals: epochs are counted by date and intensity in one pass
         self.df_epoch["Date"] = [i.date() for i in self.df_epoch["Timestamp"]]
+        dates, date_index = np.unique(self.df_epoch["Date"], return_inverse=True)
 
-        daily_totals = []
-
-        for date in sorted(dates):
-            df = self.df_epoch.loc[self.df_epoch["Date"] == date]
+        self.activity_totals = {}
+        daily_totals = {"Date": dates}
 
-            # Left wrist
-            lw_values = df["LW_Intensity"].value_counts()
+        for wrist, cutpoints in zip(["LW", "RW"], [self.lw_cutpoints, self.rw_cutpoints]):
+            categories = IntensityClassification.classify(values=self.df_epoch[wrist + "_SVM"], cutpoints=cutpoints)
 
-            if "Light" not in lw_values.keys():
-                lw_values["Light"] = 0
-            if "Moderate" not in lw_values.keys():
-                lw_values["Moderate"] = 0
-            if "Vigorous" not in lw_values.keys():
-                lw_values["Vigorous"] = 0
+            self.df_epoch[wrist + "_Intensity"] = IntensityClassification.to_labels(categories)
 
-            lw_values = lw_values/4
+            # TOTAL ACTIVITY -----------------------------------------------------------------------------------------
+            counts = IntensityClassification.count_categories(categories)
 
-            # Right wrist
-            rw_values = df["RW_Intensity"].value_counts()
+            for name, count in zip(IntensityClassification.CATEGORIES, counts):
+                self.activity_totals["{}_{}".format(wrist, name)] = count / epoch_to_mins
+            self.activity_totals[wrist + "_MVPA"] = (counts[2] + counts[3]) / epoch_to_mins
 
-            if "Light" not in rw_values.keys():
-                rw_values["Light"] = 0
-            if "Moderate" not in rw_values.keys():
-                rw_values["Moderate"] = 0
-            if "Vigorous" not in rw_values.keys():
-                rw_values["Vigorous"] = 0
+            # DAILY ACTIVITY -----------------------------------------------------------------------------------------
+            valid = categories >= 0
+            daily_counts = np.bincount(date_index[valid] * 4 + categories[valid],
+                                       minlength=len(dates) * 4).reshape(len(dates), 4) / epoch_to_mins
 
-            rw_values = rw_values/4
-
-            daily_data = [date, lw_values["Sedentary"], lw_values["Light"], lw_values["Moderate"],
-                          lw_values["Vigorous"], lw_values["Moderate"] + lw_values["Vigorous"],
-                          rw_values["Sedentary"], rw_values["Light"], rw_values["Moderate"],
-                          rw_values["Vigorous"], rw_values["Moderate"] + rw_values["Vigorous"]
-                          ]
-            daily_totals.append(daily_data)
+            for i, name in enumerate(IntensityClassification.CATEGORIES):
+                daily_totals["{}_{}".format(wrist, name)] = daily_counts[:, i]
+            daily_totals[wrist + "_MVPA"] = daily_counts[:, 2] + daily_counts[:, 3]
 
         self.df_daily = pd.DataFrame(daily_totals,
                                      columns=["Date",
@@ -640,7 +515,7 @@ class Subject:
         # Removes date column
         self.df_epoch = self.df_epoch.drop("Date", axis=1)
 
-        print("Complete.")
+        Headless.report("Complete.")
 
         # Writing activity totals data --------------------------------------------------------------------------------
         if self.write_intensity_data:
@@ -655,7 +530,7 @@ class Subject:
                 # If overwrite set to True
                 if self.overwrite_output:
                     write_file = True
-                    print("Automatically overwritting existing file.")
+                    Headless.report("Automatically overwritting existing file.")
 
                 # If overwrite set to False, prompts user
                 if not self.overwrite_output:
@@ -665,7 +540,7 @@ class Subject:
                         write_file = True
 
                     if user_input.capitalize() == "N" or user_input.capitalize() == "No":
-                        print("File will not be overwritten.")
+                        Headless.report("File will not be overwritten.")
 
             # What to do if file does not exist
             if f_name not in file_list:
@@ -673,8 +548,8 @@ class Subject:
 
             # Writing file?
             if write_file:
-                print("Writing total activity volume data to "
-                      "{}{}_DailyActivityVolume.csv".format(self.output_dir, self.subj_id))
+                Headless.report("Writing total activity volume data to "
+                                "{}{}_DailyActivityVolume.csv".format(self.output_dir, self.subj_id))
 
                 df = self.df_daily.copy()
 
@@ -696,7 +571,7 @@ class Subject:
         -epoched dataframe: df
         """
 
-        print("\nCombining data into single dataframe...")
+        Headless.report("\nCombining data into single dataframe...")
 
         # Finds data that contains timestamps
         timestamps = None
@@ -713,39 +588,46 @@ class Subject:
         if self.ra is not None and timestamps is None:
             timestamps = self.ra.timestamps[::self.epoch_len * self.ra_fs]
 
-        # Creates empty lists for df creation
-        self.fill_missing_data()
+        with self.instrumentation.stage(Instrumentation.EPOCH, n_samples=len(timestamps), source="Subject"):
+            # Columns for devices that were not loaded stay as NaN
+            table = EpochTable.EpochTable(n_epochs=len(timestamps), schema=EpochTable.ACCEL_SCHEMA)
+
+            table.fill("Timestamp", timestamps)
 
-        df = pd.DataFrame(list(zip(timestamps,
-                                   self.lw_svm, self.lw_avm, self.lw_temperature,
-                                   self.rw_svm, self.rw_avm, self.rw_temperature,
-                                   self.la_svm, self.la_avm, self.la_temperature,
-                                   self.ra_svm, self.ra_avm, self.ra_temperature)),
-                          columns=["Timestamp",
-                                   "LW_SVM", "LW_AVM", "LW_Temp",
-                                   "RW_SVM", "RW_AVM", "RW_Temp",
-                                   "LA_SVM", "LA_AVM", "LA_Temp",
-                                   "RA_SVM", "RA_AVM", "RA_Temp"])
+            for device, svm, avm, temperature in [["LW", self.lw_svm, self.lw_avm, self.lw_temperature],
+                                                  ["RW", self.rw_svm, self.rw_avm, self.rw_temperature],
+                                                  ["LA", self.la_svm, self.la_avm, self.la_temperature],
+                                                  ["RA", self.ra_svm, self.ra_avm, self.ra_temperature]]:
+                table.fill(device + "_SVM", svm)
+                table.fill(device + "_AVM", avm)
+                table.fill(device + "_Temp", temperature)
 
-        df["Timestamp"] = df["Timestamp"].dt.round("1s")
+            df = table.to_dataframe()
+
+            df["Timestamp"] = df["Timestamp"].dt.round("1s")
 
         # del self.lw_svm, self.lw_avm, self.rw_svm, self.rw_avm, self.la_svm, self.la_avm, self.ra_svm, self.ra_avm
 
-        print("Complete.")
+        Headless.report("Complete.")
 
         if write_df:
             write_file = False
 
-            file_list = os.listdir(self.output_dir)
-            f_name = "{}_EpochedAccelerometer.csv".format(self.subj_id)
+            f_name = "{}_EpochedAccelerometer{}".format(self.subj_id,
+                                                        EpochTable.FILE_EXTENSIONS[self.epoch_file_format])
+
+            # Existing output in any epoch file format (e.g. CSV written without a Parquet engine)
+            existing_file = EpochTable.find_epoch_file(self.output_dir + "{}_EpochedAccelerometer".format(self.subj_id))
+            file_exists = os.path.exists(existing_file)
 
             # What to do if file already exists -----------------------------------------------------------------------
-            if f_name in file_list:
+            if file_exists:
+                Headless.report("Found existing file {}".format(existing_file))
 
                 # If overwrite set to True
                 if self.overwrite_output:
                     write_file = True
-                    print("Automatically overwritting existing file.")
+                    Headless.report("Automatically overwritting existing file.")
 
                 # If overwrite set to False, prompts user
                 if not self.overwrite_output:
@@ -755,20 +637,22 @@ class Subject:
                         write_file = True
 
                     if user_input.capitalize() == "N" or user_input.capitalize() == "No":
-                        print("File will not be overwritten.")
+                        Headless.report("File will not be overwritten.")
 
             # What to do if file does not exist -----------------------------------------------------------------------
-            if f_name not in file_list:
+            if not file_exists:
                 write_file = True
 
             # Writing file? -------------------------------------------------------------------------------------------
             if write_file:
-                print("Writing epoched data to {}{}_EpochedAccelerometer.csv".format(self.output_dir, self.subj_id))
-                df.to_csv("{}{}_EpochedAccelerometer.csv".format(self.output_dir, self.subj_id),
-                          index=False, float_format='%.2f')
+                with self.instrumentation.stage(Instrumentation.WRITE, n_samples=df.shape[0], source="Subject"):
+                    filepath = EpochTable.write_epoch_file(df, self.output_dir + f_name, float_format='%.2f')
+
+                Headless.report("Epoched data written to {}".format(filepath))
 
         return df
 
+    @Instrumentation.timed(Instrumentation.IMPORT)
     def import_processed_df(self):
         """Imports existing processed epoch data file (.csv).
 
@@ -776,14 +660,12 @@ class Subject:
         -dataframe: df
         """
 
-        print("\nImporting existing data ({})".format(self.processed_filepath.split("/")[-1]))
+        Headless.report("\nImporting existing data ({})".format(self.processed_filepath.split("/")[-1]))
 
-        if "csv" in self.processed_filepath:
-            df = pd.read_csv(self.processed_filepath)
         if "xlsx" in self.processed_filepath:
-            df = pd.read_excel(self.processed_filepath)
-
-        df["Timestamp"] = pd.to_datetime(df["Timestamp"])
+            df = EpochTable.apply_schema(pd.read_excel(self.processed_filepath), EpochTable.ACCEL_SCHEMA)
+        else:
+            df = EpochTable.read_epoch_file(self.processed_filepath, schema=EpochTable.ACCEL_SCHEMA)
 
         # Sets epoch length
         self.epoch_len = int((df["Timestamp"].iloc[1] - df["Timestamp"].iloc[0]).total_seconds())
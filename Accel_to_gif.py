@@ -3,8 +3,9 @@ import matplotlib.pyplot as plt
 import imageio
 import os
 import numpy as np
-from Filtering import filter_signal
+from Filtering import filter_signals, BLOCK_LEN
 import ImportEDF
+from MemmapEDF import MemmapEDF
 import matplotlib.dates as mdates
 from datetime import timedelta
 import Filtering
@@ -41,11 +42,8 @@ class GifGenerator:
             if "csv" in self.wrist_file:
                 self.lw = pd.read_csv(self.wrist_file, skiprows=100)
             if "edf" in self.wrist_file:
-                d = ImportEDF.GENEActiv(filepath=self.wrist_file, load_raw=True)
-
-                self.lw = pd.DataFrame(list(zip(d.timestamps, d.x, d.y, d.z, [None for i in range(len(d.timestamps))],
-                                                [None for i in range(len(d.timestamps))],
-                                                [None for i in range(len(d.timestamps))])))
+                self.lw = import_edf_window(filepath=self.wrist_file, start_time=self.start_time,
+                                            stop_time=self.stop_time)
 
             self.lw.columns = ["Timestamp", "x", "y", "z", "light", 'button', 'temperature']
             self.lw["Timestamp"] = pd.to_datetime(self.lw["Timestamp"], format="%Y-%m-%d %H:%M:%S:%f")
@@ -57,13 +55,8 @@ class GifGenerator:
             if "csv" in self.ankle_file:
                 self.la = pd.read_csv(self.ankle_file, skiprows=100)
             if "edf" in self.ankle_file:
-                d = ImportEDF.GENEActiv(filepath=self.ankle_file, load_raw=True)
-
-                # d.sample_rate = 50
-
-                self.la = pd.DataFrame(list(zip(d.timestamps, d.x, d.y, d.z, [None for i in range(len(d.timestamps))],
-                                                [None for i in range(len(d.timestamps))],
-                                                [None for i in range(len(d.timestamps))])))
+                self.la = import_edf_window(filepath=self.ankle_file, start_time=self.start_time,
+                                            stop_time=self.stop_time)
 
             self.la.columns = ["Timestamp", "x", "y", "z", "light", 'button', 'temperature']
             self.la["Timestamp"] = pd.to_datetime(self.la["Timestamp"], format="%Y-%m-%d %H:%M:%S:%f")
@@ -76,19 +69,10 @@ class GifGenerator:
         if self.rem_gravity:
             print("-Filtering data to remove gravity...")
 
-            self.lw["x_filt"] = filter_signal(data=self.lw["x"], filter_type="highpass", high_f=0.1, filter_order=2,
-                                              sample_f=self.sample_rate)
-            self.lw["y_filt"] = filter_signal(data=self.lw["y"], filter_type="highpass", high_f=0.1, filter_order=2,
-                                              sample_f=self.sample_rate)
-            self.lw["z_filt"] = filter_signal(data=self.lw["z"], filter_type="highpass", high_f=0.1, filter_order=2,
-                                              sample_f=self.sample_rate)
-
-            self.la["x_filt"] = filter_signal(data=self.la["x"], filter_type="highpass", high_f=0.1, filter_order=2,
-                                              sample_f=self.sample_rate)
-            self.la["y_filt"] = filter_signal(data=self.la["y"], filter_type="highpass", high_f=0.1, filter_order=2,
-                                              sample_f=self.sample_rate)
-            self.la["z_filt"] = filter_signal(data=self.la["z"], filter_type="highpass", high_f=0.1, filter_order=2,
-                                              sample_f=self.sample_rate)
+            for df in [self.lw, self.la]:
+                df[["x_filt", "y_filt", "z_filt"]] = filter_signals(data=df[["x", "y", "z"]].values.T,
+                                                                    filter_type="highpass", high_f=0.1, filter_order=2,
+                                                                    sample_f=self.sample_rate).T
 
     def remove_dc(self):
 
@@ -108,19 +92,10 @@ class GifGenerator:
         if self.rem_highf:
             print("\nFiltering data to remove high-frequency noise...")
 
-            self.lw["x_filt"] = filter_signal(data=self.lw["x"], filter_type="lowpass", low_f=5, filter_order=2,
-                                              sample_f=self.sample_rate)
-            self.lw["y_filt"] = filter_signal(data=self.lw["y"], filter_type="lowpass", low_f=5, filter_order=2,
-                                              sample_f=self.sample_rate)
-            self.lw["z_filt"] = filter_signal(data=self.lw["z"], filter_type="lowpass", low_f=5, filter_order=2,
-                                              sample_f=self.sample_rate)
-
-            self.la["x_filt"] = filter_signal(data=self.la["x"], filter_type="lowpass", low_f=5, filter_order=2,
-                                              sample_f=self.sample_rate)
-            self.la["y_filt"] = filter_signal(data=self.la["y"], filter_type="lowpass", low_f=5, filter_order=2,
-                                              sample_f=self.sample_rate)
-            self.la["z_filt"] = filter_signal(data=self.la["z"], filter_type="lowpass", low_f=5, filter_order=2,
-                                              sample_f=self.sample_rate)
+            for df in [self.lw, self.la]:
+                df[["x_filt", "y_filt", "z_filt"]] = filter_signals(data=df[["x", "y", "z"]].values.T,
+                                                                    filter_type="lowpass", low_f=5, filter_order=2,
+                                                                    sample_f=self.sample_rate, block_len=BLOCK_LEN).T
 
     def create_plot(self, start=None, stop=None, use_timestamps=False, slide_window=False, window_len=None,
                     acc_min=None, acc_max=None, column_suffix="", show_plot=True, save_plot=False, fname=""):
@@ -285,6 +260,28 @@ class GifGenerator:
         print("\nComplete.")
 
 
+def import_edf_window(filepath, start_time=None, stop_time=None):
+    """Imports GENEActiv EDF file as DataFrame. If start_time and stop_time are given, only that section of the file
+       is read from disk (memory-mapped) instead of the whole file.
+    """
+
+    start_offset, end_offset = 0, 0
+
+    if start_time is not None and stop_time is not None:
+        edf = MemmapEDF(filepath)
+        start_offset = max(edf.get_index(chn=0, timestamp=pd.to_datetime(start_time)), 0)
+        end_offset = max(edf.get_index(chn=0, timestamp=pd.to_datetime(stop_time)) - start_offset, 1)
+        edf.close()
+
+    d = ImportEDF.GENEActiv(filepath=filepath, load_raw=True, start_offset=start_offset, end_offset=end_offset,
+                            memmap=True)
+
+    df = pd.DataFrame({"Timestamp": np.asarray(d.timestamps), "x": d.x, "y": d.y, "z": d.z,
+                       "light": None, "button": None, "temperature": None})
+
+    return df
+
+
 def create_plot_gif(wrist_file=None, ankle_file=None, start_time=None, stop_time=None,
                     sample_rate=75, plot_period_ms=100, wrist_obj=None, ankle_obj=None,
                     output_dir=None,
@@ -296,12 +293,7 @@ def create_plot_gif(wrist_file=None, ankle_file=None, start_time=None, stop_time
         if "csv" in wrist_file:
             lw = pd.read_csv(wrist_file, skiprows=100)
         if "edf" in wrist_file:
-            d = ImportEDF.GENEActiv(filepath=wrist_file, load_raw=True)
-
-            d.sample_rate = 50
-
-            lw = pd.DataFrame(list(zip(d.timestamps, d.x, d.y, d.z, [None for i in range(len(d.timestamps))],
-                              [None for i in range(len(d.timestamps))], [None for i in range(len(d.timestamps))])))
+            lw = import_edf_window(filepath=wrist_file, start_time=start_time, stop_time=stop_time)
 
         lw.columns = ["Timestamp", "x", "y", "z", "light", 'button', 'temperature']
         lw["Timestamp"] = pd.to_datetime(lw["Timestamp"], format="%Y-%m-%d %H:%M:%S:%f")
@@ -314,13 +306,7 @@ def create_plot_gif(wrist_file=None, ankle_file=None, start_time=None, stop_time
         if "csv" in ankle_file:
             la = pd.read_csv(ankle_file, skiprows=100)
         if "edf" in ankle_file:
-            d = ImportEDF.GENEActiv(filepath=ankle_file, load_raw=True)
-
-            d.sample_rate = 50
-
-            la = pd.DataFrame(list(zip(d.timestamps, d.x, d.y, d.z, [None for i in range(len(d.timestamps))],
-                                       [None for i in range(len(d.timestamps))],
-                                       [None for i in range(len(d.timestamps))])))
+            la = import_edf_window(filepath=ankle_file, start_time=start_time, stop_time=stop_time)
 
         la.columns = ["Timestamp", "x", "y", "z", "light", 'button', 'temperature']
         la["Timestamp"] = pd.to_datetime(la["Timestamp"], format="%Y-%m-%d %H:%M:%S:%f")
@@ -344,23 +330,19 @@ def create_plot_gif(wrist_file=None, ankle_file=None, start_time=None, stop_time
 
         print("-Filtering data to remove gravity...")
 
-        lw_x = filter_signal(data=lw_x, filter_type="highpass", high_f=0.1, filter_order=2, sample_f=sample_rate)
-        lw_y = filter_signal(data=lw_y, filter_type="highpass", high_f=0.1, filter_order=2, sample_f=sample_rate)
-        lw_z = filter_signal(data=lw_z, filter_type="highpass", high_f=0.1, filter_order=2, sample_f=sample_rate)
-        la_x = filter_signal(data=la_x, filter_type="highpass", high_f=0.1, filter_order=2, sample_f=sample_rate)
-        la_y = filter_signal(data=la_y, filter_type="highpass", high_f=0.1, filter_order=2, sample_f=sample_rate)
-        la_z = filter_signal(data=la_z, filter_type="highpass", high_f=0.1, filter_order=2, sample_f=sample_rate)
+        lw_x, lw_y, lw_z = filter_signals(data=[lw_x, lw_y, lw_z], filter_type="highpass", high_f=0.1,
+                                          filter_order=2, sample_f=sample_rate)
+        la_x, la_y, la_z = filter_signals(data=[la_x, la_y, la_z], filter_type="highpass", high_f=0.1,
+                                          filter_order=2, sample_f=sample_rate)
 
     if remove_high_f:
 
         print("-Filtering data to remove high frequency...")
 
-        lw_x = filter_signal(data=lw_x, filter_type="lowpass", low_f=5, filter_order=2, sample_f=sample_rate)
-        lw_y = filter_signal(data=lw_y, filter_type="lowpass", low_f=5, filter_order=2, sample_f=sample_rate)
-        lw_z = filter_signal(data=lw_z, filter_type="lowpass", low_f=5, filter_order=2, sample_f=sample_rate)
-        la_x = filter_signal(data=la_x, filter_type="lowpass", low_f=5, filter_order=2, sample_f=sample_rate)
-        la_y = filter_signal(data=la_y, filter_type="lowpass", low_f=5, filter_order=2, sample_f=sample_rate)
-        la_z = filter_signal(data=la_z, filter_type="lowpass", low_f=5, filter_order=2, sample_f=sample_rate)
+        lw_x, lw_y, lw_z = filter_signals(data=[lw_x, lw_y, lw_z], filter_type="lowpass", low_f=5,
+                                          filter_order=2, sample_f=sample_rate)
+        la_x, la_y, la_z = filter_signals(data=[la_x, la_y, la_z], filter_type="lowpass", low_f=5,
+                                          filter_order=2, sample_f=sample_rate)
 
     if remove_dc:
         print("\n-Removing DC component from signal...")
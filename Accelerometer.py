@@ -1,14 +1,19 @@
 import ImportEDF
 import EpochData
+import IntensityClassification
+import Headless
+import Instrumentation
 
 import csv
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from matplotlib.ticker import PercentFormatter
 import numpy as np
 from datetime import datetime
 import statistics as stats
 import pandas as pd
+from LazyImport import lazy_import
+
+# Plotting packages are imported on first use
+plt = lazy_import("matplotlib.pyplot")
+mdates = lazy_import("matplotlib.dates")
 
 
 # ====================================================================================================================
@@ -22,10 +27,11 @@ class Wrist:
                  temperature_filepath=None,
                  output_dir=None, load_raw=False, accel_only=False,
                  epoch_len=15, start_offset=0, end_offset=0, ecg_object=None,
-                 from_processed=True, processed_folder=None):
+                 from_processed=True, processed_folder=None, write_results=False, instrumentation=None):
 
-        print()
-        print("======================================== WRIST ACCELEROMETER ========================================")
+        Headless.report()
+        Headless.report("======================================== WRIST ACCELEROMETER "
+                        "========================================")
 
         self.subject_id = subject_id
         self.filepath = raw_filepath
@@ -45,24 +51,36 @@ class Wrist:
 
         self.from_processed = from_processed
         self.processed_folder = processed_folder
+        self.write_results = write_results
+
+        # Time and memory of each stage (see Instrumentation)
+        self.instrumentation = Instrumentation.StageTimer(name=subject_id) if instrumentation is None \
+            else instrumentation
 
         # Loads raw accelerometer data and generates timestamps
         self.raw = ImportEDF.GENEActiv(filepath=self.filepath,
                                        start_offset=self.start_offset, end_offset=self.end_offset,
-                                       load_raw=self.load_raw)
+                                       load_raw=self.load_raw, instrumentation=self.instrumentation)
 
-        self.epoch = EpochData.EpochAccel(raw_data=self.raw,
-                                          accel_type="wrist",
-                                          raw_filename=self.filename,
-                                          proc_filepath=self.proc_filepath,
-                                          accel_only=self.accel_only, epoch_len=self.epoch_len,
-                                          from_processed=self.from_processed, processed_folder=self.processed_folder)
+        with self.instrumentation.stage(Instrumentation.EPOCH, source="Wrist") as record:
+            self.epoch = EpochData.EpochAccel(raw_data=self.raw,
+                                              accel_type="wrist",
+                                              raw_filename=self.filename,
+                                              proc_filepath=self.proc_filepath,
+                                              accel_only=self.accel_only, epoch_len=self.epoch_len,
+                                              from_processed=self.from_processed,
+                                              processed_folder=self.processed_folder,
+                                              save_pyramid=self.write_results)
+
+            record["Samples"] = len(self.raw.x) if self.raw.x is not None else None
 
         # Model
-        self.model = WristModel(accel_object=self, ecg_object=self.ecg_object)
+        with self.instrumentation.stage(Instrumentation.MODELS, source="Wrist"):
+            self.model = WristModel(accel_object=self, ecg_object=self.ecg_object)
 
         # Temperature data
-        self.temperature = ImportEDF.GENEActivTemperature(filepath=self.temperature_filepath)
+        self.temperature = ImportEDF.GENEActivTemperature(filepath=self.temperature_filepath,
+                                                          instrumentation=self.instrumentation)
 
         if self.load_raw:
             self.temperature.sample_rate = 1 / (300 / self.raw.sample_rate)
@@ -72,7 +90,7 @@ class Wrist:
 
 class WristModel:
 
-    def __init__(self, accel_object, ecg_object=None):
+    def __init__(self, accel_object, ecg_object=None, cutpoints=None):
         """Contains activity data for the Wrist accelerometer. Calculates total amount of time spent in each intensity
            category. Reported as % of valid epochs (awake + device worn). These values are contained in the
            intensity_totals object.
@@ -81,9 +99,13 @@ class WristModel:
            intensity_totals_valid object.
 
            Report that gets printed in console does not reflect ECG data.
+
+           cutpoints: dictionary of lower limits of each intensity ({"Light": x, "Moderate": y, "Vigorous": z}).
+                      Uses Powell et al. (2017) non-dominant cut-points if None.
         """
 
         self.accel_object = accel_object
+        self.cutpoints = cutpoints
 
         if ecg_object is not None:
             self.valid_ecg = ecg_object.epoch_validity
@@ -106,84 +128,53 @@ class WristModel:
            -accel_object: Data class object that contains accelerometer data (epoch)
            """
 
-        scaling_factor = self.accel_object.epoch_len / 15
+        if self.cutpoints is None:
+            scaling_factor = self.accel_object.epoch_len / 15
 
-        print("\nPowell et al. cut-points are being scaled by a factor of "
-              "{} to match epoch lengths.".format(round(scaling_factor, 2)))
+            Headless.report("\nPowell et al. cut-points are being scaled by a factor of "
+                            "{} to match epoch lengths.".format(round(scaling_factor, 2)))
 
-        print("\n" + "Applying Powell et al. (2017) cut-points to the data...")
+            # Non-dominant cut-points; scaled to sample rate
+            self.cutpoints = IntensityClassification.powell_cutpoints(sample_rate=self.accel_object.raw.sample_rate,
+                                                                      epoch_len=self.accel_object.epoch_len,
+                                                                      dominant=False)
 
-        # Conversion factor: epochs to minutes
-        epoch_to_minutes = 60 / self.accel_object.epoch_len
-
-        # Sample rate
-        sample_rate = self.accel_object.raw.sample_rate
+        Headless.report("\n" + "Applying Powell et al. (2017) cut-points to the data...")
 
         # Epoch-by-epoch intensity
-        for epoch in self.accel_object.epoch.svm:
-            if epoch < 47 * scaling_factor * sample_rate / 30:
-                self.epoch_intensity.append(0)
-            if 47 * scaling_factor * sample_rate / 30 <= epoch < 64 * scaling_factor * sample_rate / 30:
-                self.epoch_intensity.append(1)
-            if 64 * scaling_factor * sample_rate / 30 <= epoch < 157 * scaling_factor * sample_rate / 30:
-                self.epoch_intensity.append(2)
-            if epoch >= 157 * scaling_factor * sample_rate / 30:
-                self.epoch_intensity.append(3)
-
-        if self.valid_ecg is not None:
-            index_list = min([len(self.epoch_intensity), len(self.valid_ecg)])
-
-            self.epoch_intensity_valid = [self.epoch_intensity[i] if self.valid_ecg[i] == 0
-                                          else None for i in range(0, index_list)]
+        categories = IntensityClassification.classify(values=self.accel_object.epoch.svm, cutpoints=self.cutpoints)
+        self.epoch_intensity = IntensityClassification.to_list(categories)
 
         # MODEL TOTALS IF NOT CORRECTED USING VALID ECG EPOCHS -------------------------------------------------------
         # Intensity data: totals
         # In minutes and %
-        self.intensity_totals = {"Sedentary": self.epoch_intensity.count(0) / epoch_to_minutes,
-                                 "Sedentary%": round(self.epoch_intensity.count(0) /
-                                                     len(self.accel_object.epoch.svm), 3),
-                                 "Light": (self.epoch_intensity.count(1)) / epoch_to_minutes,
-                                 "Light%": round(self.epoch_intensity.count(1) /
-                                                 len(self.accel_object.epoch.svm), 3),
-                                 "Moderate": self.epoch_intensity.count(2) / epoch_to_minutes,
-                                 "Moderate%": round(self.epoch_intensity.count(2) /
-                                                    len(self.accel_object.epoch.svm), 3),
-                                 "Vigorous": self.epoch_intensity.count(3) / epoch_to_minutes,
-                                 "Vigorous%": round(self.epoch_intensity.count(3) /
-                                                    len(self.accel_object.epoch.svm), 3)}
+        self.intensity_totals = IntensityClassification.intensity_totals(categories=categories,
+                                                                         epoch_len=self.accel_object.epoch_len,
+                                                                         n_epochs=len(self.accel_object.epoch.svm))
 
         # MODEL TOTALS IF CORRECTED USING VALID ECG EPOCHS -----------------------------------------------------------
-        # Intensity data: totals
-        # In minutes and %
         if self.valid_ecg is not None:
-            n_valid_epochs = len(self.epoch_intensity_valid) - self.epoch_intensity_valid.count(None)
+            index_list = min([len(categories), len(self.valid_ecg)])
 
-            if n_valid_epochs == 0:
-                n_valid_epochs = len(self.epoch_intensity_valid)
+            # ECG epoch validity is "Valid"/"Invalid"
+            invalid_ecg = np.asarray(self.valid_ecg[:index_list]) == "Invalid"
 
-            self.intensity_totals_valid = {"Sedentary": self.epoch_intensity_valid.count(0) / epoch_to_minutes,
-                                           "Sedentary%": round(self.epoch_intensity_valid.count(0) / n_valid_epochs, 3),
-                                           "Light": (self.epoch_intensity.count(1)) / epoch_to_minutes,
-                                           "Light%": round(self.epoch_intensity_valid.count(1) / n_valid_epochs, 3),
-                                           "Moderate": self.epoch_intensity.count(2) / epoch_to_minutes,
-                                           "Moderate%": round(self.epoch_intensity_valid.count(2) / n_valid_epochs, 3),
-                                           "Vigorous": self.epoch_intensity.count(3) / epoch_to_minutes,
-                                           "Vigorous%": round(self.epoch_intensity_valid.count(3) / n_valid_epochs, 3)}
+            categories_valid = IntensityClassification.classify(values=self.accel_object.epoch.svm[:index_list],
+                                                                cutpoints=self.cutpoints, invalid=invalid_ecg)
+            self.epoch_intensity_valid = IntensityClassification.to_list(categories_valid)
 
-        print("Complete.")
+            n_valid_epochs = np.count_nonzero(categories_valid != IntensityClassification.INVALID)
 
-        print("\n" + "WRIST MODEL SUMMARY")
-        print("-Sedentary: {} minutes ({}%)".format(self.intensity_totals["Sedentary"],
-                                                    round(self.intensity_totals["Sedentary%"]*100, 3)))
+            if n_valid_epochs == 0:
+                n_valid_epochs = len(categories_valid)
 
-        print("-Light: {} minutes ({}%)".format(self.intensity_totals["Light"],
-                                                round(self.intensity_totals["Light%"]*100, 3)))
+            self.intensity_totals_valid = \
+                IntensityClassification.intensity_totals(categories=categories_valid,
+                                                         epoch_len=self.accel_object.epoch_len, n_epochs=n_valid_epochs)
 
-        print("-Moderate: {} minutes ({}%)".format(self.intensity_totals["Moderate"],
-                                                   round(self.intensity_totals["Moderate%"]*100, 3)))
+        Headless.report("Complete.")
 
-        print("-Vigorous: {} minutes ({}%)".format(self.intensity_totals["Vigorous"],
-                                                   round(self.intensity_totals["Vigorous%"]*100, 3)))
+        IntensityClassification.print_totals(title="WRIST MODEL SUMMARY", totals=self.intensity_totals)
 
 # ====================================================================================================================
 # ================================================ ANKLE ACCELEROMETER ===============================================
@@ -198,10 +189,11 @@ class Ankle:
                  start_offset=0, end_offset=0,
                  remove_baseline=False, ecg_object=None,
                  from_processed=True, treadmill_log_file=None, treadmill_regression_file=None,
-                 processed_folder=None, write_results=False):
+                 processed_folder=None, write_results=False, instrumentation=None):
 
-        print()
-        print("======================================== ANKLE ACCELEROMETER ========================================")
+        Headless.report()
+        Headless.report("======================================== ANKLE ACCELEROMETER "
+                        "========================================")
 
         self.subject_id = subject_id
         self.filepath = raw_filepath
@@ -228,25 +220,35 @@ class Ankle:
         self.treadmill_regression_file = treadmill_regression_file
         self.write_results = write_results
 
+        # Time and memory of each stage (see Instrumentation)
+        self.instrumentation = Instrumentation.StageTimer(name=subject_id) if instrumentation is None \
+            else instrumentation
+
         # Loads raw accelerometer data and generates timestamps
         self.raw = ImportEDF.GENEActiv(filepath=self.filepath,
                                        start_offset=self.start_offset, end_offset=self.end_offset,
-                                       load_raw=self.load_raw)
+                                       load_raw=self.load_raw, instrumentation=self.instrumentation)
 
-        self.epoch = EpochData.EpochAccel(raw_data=self.raw,
-                                          accel_type="ankle",
-                                          raw_filename=self.filename,
-                                          proc_filepath=self.proc_filepath,
-                                          epoch_len=self.epoch_len,
-                                          remove_baseline=self.remove_baseline, accel_only=self.accel_only,
-                                          from_processed=self.from_processed, processed_folder=self.processed_folder)
+        with self.instrumentation.stage(Instrumentation.EPOCH, source="Ankle") as record:
+            self.epoch = EpochData.EpochAccel(raw_data=self.raw,
+                                              accel_type="ankle",
+                                              raw_filename=self.filename,
+                                              proc_filepath=self.proc_filepath,
+                                              epoch_len=self.epoch_len,
+                                              remove_baseline=self.remove_baseline, accel_only=self.accel_only,
+                                              from_processed=self.from_processed,
+                                              processed_folder=self.processed_folder,
+                                              save_pyramid=self.write_results)
 
-        # Create Treadmill object
-        self.treadmill = Treadmill(ankle_object=self)
+            record["Samples"] = len(self.raw.x) if self.raw.x is not None else None
 
-        # Create AnkleModel object
-        self.model = AnkleModel(ankle_object=self, bmi=self.bmi, write_results=self.write_results,
-                                ecg_object=self.ecg_object)
+        with self.instrumentation.stage(Instrumentation.MODELS, source="Ankle"):
+            # Create Treadmill object
+            self.treadmill = Treadmill(ankle_object=self)
+
+            # Create AnkleModel object
+            self.model = AnkleModel(ankle_object=self, bmi=self.bmi, write_results=self.write_results,
+                                    ecg_object=self.ecg_object)
 
     def write_model(self):
 
@@ -264,7 +266,7 @@ class Ankle:
             writer.writerows(zip(self.model.epoch_timestamps, self.model.epoch_data,
                                  self.model.linear_speed, self.model.predicted_mets, self.model.epoch_intensity))
 
-        print("\n" + "Complete. File {}".format(out_filename))
+        Headless.report("\n" + "Complete. File {}".format(out_filename))
 
 
 class Treadmill:
@@ -342,10 +344,10 @@ class Treadmill:
                 try:
                     colnames = [i for i in df.columns]
                     walk_indexes = [df[col_name].iloc[0] for col_name in colnames[8:18]]
-                    print("\n" + "Previous processed treadmill data found. Skipping processing.")
+                    Headless.report("\n" + "Previous processed treadmill data found. Skipping processing.")
                 except ValueError:
                     walk_indexes = []
-                    print("\n" + "No previous treadmill processing found. ")
+                    Headless.report("\n" + "No previous treadmill processing found. ")
                     pass
 
                 # Retrieves regression equation data if available
@@ -370,7 +372,8 @@ class Treadmill:
             walk_indexes = []
             walk_speeds = []
 
-            print("\nParticipant did not perform individual treadmill protocol. Using group-level regression.")
+            Headless.report("\nParticipant did not perform individual treadmill protocol. "
+                            "Using group-level regression.")
 
         return treadmill_dict, walk_speeds, walk_indexes, df
 
@@ -381,7 +384,7 @@ class Treadmill:
         # If raw data available ---------------------------------------------------------------------------------------
         if ankle_object.raw.timestamps is not None:
 
-            print("\n" + "Plotting raw and epoched treadmill protocol data.")
+            Headless.report("\n" + "Plotting raw and epoched treadmill protocol data.")
 
             raw_start = ankle_object.treadmill.treadmill_dict["StartIndex"] * \
                         ankle_object.raw.sample_rate * ankle_object.epoch_len
@@ -442,7 +445,7 @@ class Treadmill:
         # If raw data not available -----------------------------------------------------------------------------------
         if ankle_object.raw.timestamps is None:
 
-            print("\n" + "Plotting epoched treadmill protocol data. Raw data not available.")
+            Headless.report("\n" + "Plotting epoched treadmill protocol data. Raw data not available.")
 
             fig, ax1 = plt.subplots(1, figsize=(10, 7))
 
@@ -489,7 +492,8 @@ class Treadmill:
 
 class AnkleModel:
 
-    def __init__(self, ankle_object, bmi=1, write_results=False, ecg_object=None):
+    def __init__(self, ankle_object, bmi=1, write_results=False, ecg_object=None,
+                 cutpoints=IntensityClassification.METS_CUTPOINTS):
         """Class that stores ankle model data. Performs regression analysis on activity counts vs. gait speed if
            participant performed the treadmill protocol. Uses group-level regression otherwise.
 
@@ -499,9 +503,11 @@ class AnkleModel:
         -ankle_object: AnkleAccel class instance
         -treadmill_object: Treadmill class instance
         -output_dir: pathway to folder where data is to be saved
+        -cutpoints: dictionary of lower limit of each intensity in METs
         """
 
         self.epoch_data = ankle_object.epoch.svm
+        self.cutpoints = cutpoints
         self.epoch_len = ankle_object.epoch_len
         self.accel_only = ankle_object.accel_only
         self.epoch_scale = 1
@@ -647,7 +653,7 @@ class AnkleModel:
         speed = self.regression_dict["a"] * count + self.regression_dict["b"]
 
         if print_output:
-            print("-Predicted speed for {} counts is {} m/s.".format(count, round(speed, 3)))
+            Headless.report("-Predicted speed for {} counts is {} m/s.".format(count, round(speed, 3)))
 
         return speed
 
@@ -655,7 +661,7 @@ class AnkleModel:
         """Plots measured results and results predicted from regression."""
 
         if not self.tm_object.valid_data:
-            print("\nNo valid treadmill data; cannot generate plot.")
+            Headless.report("\nNo valid treadmill data; cannot generate plot.")
             return None
 
         # Variables from each regression type ------------------------------------------------------------------------
@@ -723,60 +729,30 @@ class AnkleModel:
     def calculate_intensity(self, predicted_speed):
 
         # Converts m/s to m/min
-        m_min = [i * 60 for i in predicted_speed]
+        m_min = IntensityClassification.to_array(predicted_speed) * 60
 
         # Uses ACSM equation to predict METs from predicted gait speed
-        mets = []
-
-        for epoch_speed in m_min:
-            if epoch_speed <= 100:
-                mets.append((self.rvo2 + .1 * epoch_speed) / self.rvo2)
-            if epoch_speed > 100:
-                mets.append((self.rvo2 + .2 * epoch_speed) / self.rvo2)
+        mets = np.where(m_min <= 100, (self.rvo2 + .1 * m_min) / self.rvo2, (self.rvo2 + .2 * m_min) / self.rvo2)
 
         # Calculates epoch-by-epoch intensity
         # <1.5 METs = sedentary, 1.5-2.99 METs = light, 3.00-5.99 METs = moderate, >= 6.0 METS = vigorous
-        intensity = []
-
-        for met in mets:
-            if met < 1.5:
-                intensity.append(0)
-            if 1.5 <= met < 3.0:
-                intensity.append(1)
-            if 3.0 <= met < 6.0:
-                intensity.append(2)
-            if met >= 6.0:
-                intensity.append(3)
+        categories = IntensityClassification.classify(values=mets, cutpoints=self.cutpoints)
 
         # Calculates time spent in each intensity category
-        intensity_totals = {"Sedentary": intensity.count(0) / (60 / self.epoch_len),
-                            "Sedentary%": round(intensity.count(0) / len(self.epoch_data), 3),
-                            "Light": intensity.count(1) / (60 / self.epoch_len),
-                            "Light%": round(intensity.count(1) / len(self.epoch_data), 3),
-                            "Moderate": intensity.count(2) / (60 / self.epoch_len),
-                            "Moderate%": round(intensity.count(2) / len(self.epoch_data), 3),
-                            "Vigorous": intensity.count(3) / (60 / self.epoch_len),
-                            "Vigorous%": round(intensity.count(3) / len(self.epoch_data), 3)}
-
-        print("\n" + "ANKLE MODEL SUMMARY")
-        print("Sedentary: {} minutes ({}%)".format(intensity_totals["Sedentary"],
-                                                   round(intensity_totals["Sedentary%"] * 100, 3)))
-
-        print("Light: {} minutes ({}%)".format(intensity_totals["Light"],
-                                               round(intensity_totals["Light%"] * 100, 3)))
+        intensity_totals = IntensityClassification.intensity_totals(categories=categories, epoch_len=self.epoch_len,
+                                                                    n_epochs=len(self.epoch_data))
 
-        print("Moderate: {} minutes ({}%)".format(intensity_totals["Moderate"],
-                                                  round(intensity_totals["Moderate%"] * 100, 3)))
+        IntensityClassification.print_totals(title="ANKLE MODEL SUMMARY", totals=intensity_totals)
 
-        print("Vigorous: {} minutes ({}%)".format(intensity_totals["Vigorous"],
-                                                  round(intensity_totals["Vigorous%"] * 100, 3)))
+        mets = [i for i in mets]
+        intensity = IntensityClassification.to_list(categories)
 
         return mets, intensity, intensity_totals
 
     def plot_results(self):
         """Plots predicted speed, predicted METs, and predicted intensity categorization on 3 subplots"""
 
-        print("\n" + "Plotting ankle model data...")
+        Headless.report("\n" + "Plotting ankle model data...")
 
         # X-axis datestamp formating
         xfmt = mdates.DateFormatter("%a, %I:%M %p")
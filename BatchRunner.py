@@ -0,0 +1,314 @@
+from Subject import Subject
+import SleepData
+import Nonwear
+import EpochTable
+import Headless
+import Instrumentation
+import multiprocessing
+import traceback
+import queue
+import os
+import time
+import pandas as pd
+from datetime import datetime
+
+
+# ====================================================== STAGES =======================================================
+# Each stage takes a Subject object. Stages run in order; timings are recorded for each.
+def stage_setup(subject):
+    subject.import_demographics()
+    subject.create_filenames()
+    subject.get_edf_filepaths()
+
+
+def stage_import_epoch_df(subject):
+    subject.import_epoch_df()
+
+
+def stage_crop_files(subject):
+    subject.crop_files()
+
+
+def stage_device_objects(subject):
+    subject.create_device_objects()
+    subject.get_data_len()
+
+
+def stage_sleep(subject):
+    subject.sleep = SleepData.Sleep(subject_object=subject)
+
+
+def stage_nonwear(subject):
+    with subject.instrumentation.stage(Instrumentation.NONWEAR, source="Subject"):
+        subject.nonwear = Nonwear.NonwearLog(subject_object=subject)
+
+
+def stage_epoch_df(subject):
+    subject.epoch_df = subject.create_epoch_df()
+
+
+default_stages = [("Setup", stage_setup),
+                  ("Import epoch data", stage_import_epoch_df),
+                  ("Crop files", stage_crop_files),
+                  ("Device objects", stage_device_objects),
+                  ("Sleep", stage_sleep),
+                  ("Nonwear", stage_nonwear),
+                  ("Epoch df", stage_epoch_df)]
+
+
+# ===================================================== WORKER =======================================================
+def get_output_file(output_dir, participant, file_format="parquet"):
+    return os.path.join(output_dir, "{}_EpochData{}".format(participant, EpochTable.FILE_EXTENSIONS[file_format]))
+
+
+def find_output_file(output_dir, participant):
+    """Existing output file of participant in any epoch file format (see EpochTable.find_epoch_file())."""
+
+    return EpochTable.find_epoch_file(os.path.join(output_dir, "{}_EpochData".format(participant)))
+
+
+def run_subject(participant, subject_kwargs, stages, output_dir, result_queue, headless=True, progress_interval=5):
+    """Runs all stages for one participant in its own process and writes the epoched data. Result is put in
+       result_queue as a dictionary; exceptions are caught and reported instead of stopping the batch.
+
+    :argument
+    -participant: participant ID as in SubjectSubset.participant_list (e.g. "OND07_WTL_3028")
+    -subject_kwargs: dictionary of arguments passed to Subject
+    -stages: list of [stage name, function] pairs
+    -output_dir: folder where epoched data is written
+    -result_queue: multiprocessing.Queue
+    -headless: boolean; runs without figures or console output (see Headless). Progress messages are put in
+               result_queue as {"ID": participant, "Progress": update} at most every progress_interval seconds.
+
+    Result includes the Subject's stage report ("Instrumentation"; see Instrumentation.StageTimer.to_dict()).
+    """
+
+    if headless:
+        Headless.set_headless(True, min_interval=progress_interval,
+                              progress_callback=lambda update: result_queue.put({"ID": participant,
+                                                                                 "Progress": update}))
+
+    result = {"ID": participant, "Status": "Complete", "Stage": None, "Error": None, "Traceback": None,
+              "Stage times": {}, "Instrumentation": None}
+
+    current_stage = "Subject"
+    subject = None
+
+    try:
+        t0 = time.perf_counter()
+        subject = Subject(subject_id=int(participant.split("_")[-1]), study_code=participant.split("_")[0],
+                          **subject_kwargs)
+        result["Stage times"]["Subject"] = time.perf_counter() - t0
+
+        for current_stage, stage in stages:
+            t0 = time.perf_counter()
+            Headless.report("Starting stage: {}".format(current_stage), stage=current_stage, force=True)
+            stage(subject)
+            result["Stage times"][current_stage] = time.perf_counter() - t0
+
+        current_stage = "Write output"
+        t0 = time.perf_counter()
+        with subject.instrumentation.stage(Instrumentation.WRITE, n_samples=subject.epoch_df.shape[0],
+                                           source="Subject"):
+            EpochTable.write_epoch_file(subject.epoch_df,
+                                        get_output_file(output_dir, participant, subject.epoch_file_format))
+        result["Stage times"][current_stage] = time.perf_counter() - t0
+
+    except Exception as error:
+        result["Status"] = "Failed"
+        result["Stage"] = current_stage
+        result["Error"] = "{}: {}".format(type(error).__name__, error)
+        result["Traceback"] = traceback.format_exc()
+
+    # Stages recorded up to the end (or failure) of the run
+    if subject is not None:
+        result["Instrumentation"] = subject.instrumentation.to_dict()
+
+    result_queue.put(result)
+
+
+# =================================================== BATCH RUNNER ====================================================
+class BatchRunner:
+
+    def __init__(self, participant_list, subject_kwargs, output_dir, stages=None,
+                 n_workers=4, timeout=3600, overwrite=False, headless=True, progress_callback=None,
+                 progress_interval=5):
+        """Runs Subject pipelines for a list of participants, each in its own process.
+
+        :argument
+        -participant_list: list of participant IDs (e.g. LocateParticipants.SubjectSubset.participant_list)
+        -subject_kwargs: dictionary of arguments passed to Subject for every participant (not subject_id/study_code)
+        -output_dir: folder where each participant's epoched data and the batch report are written
+        -stages: list of [stage name, function] pairs run on each Subject. Uses default_stages if None.
+        -n_workers: number of participants processed at once
+        -timeout: seconds before a participant's process is stopped
+        -overwrite: if False, participants whose output file already exists are skipped (lets a batch be resumed)
+        -headless: boolean; participants are processed without figures or console output (see Headless)
+        -progress_callback: function called in the main process with {"ID": participant, "Progress": update} for
+                            progress messages from headless workers
+        -progress_interval: minimum seconds between progress messages from each worker
+        """
+
+        self.participant_list = participant_list
+        self.subject_kwargs = subject_kwargs
+        self.output_dir = output_dir
+        self.stages = default_stages if stages is None else stages
+        self.n_workers = n_workers
+        self.timeout = timeout
+        self.overwrite = overwrite
+        self.headless = headless
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self.progress = {}  # participant: last progress update
+
+        self.results = []
+        self.report = None
+
+    def run(self):
+        """Runs all participants. Returns report as DataFrame (one row per participant)."""
+
+        print("\nRunning {} participants with {} processes...".format(len(self.participant_list), self.n_workers))
+        t_start = datetime.now()
+
+        self.results = []
+        to_run = []
+
+        for participant in self.participant_list:
+            output_file = find_output_file(self.output_dir, participant)
+
+            if not self.overwrite and os.path.exists(output_file):
+                self.results.append({"ID": participant, "Status": "Skipped", "Stage": None,
+                                     "Error": None, "Traceback": None, "Stage times": {}})
+            else:
+                to_run.append(participant)
+
+        if len(self.results) > 0:
+            print("-Skipping {} participants with existing output.".format(len(self.results)))
+
+        result_queue = multiprocessing.Queue()
+        running = {}  # participant: [process, start time]
+
+        while len(to_run) > 0 or len(running) > 0:
+
+            # Starts new processes
+            while len(to_run) > 0 and len(running) < self.n_workers:
+                participant = to_run.pop(0)
+
+                process = multiprocessing.Process(target=run_subject,
+                                                  args=(participant, self.subject_kwargs, self.stages,
+                                                        self.output_dir, result_queue, self.headless,
+                                                        self.progress_interval))
+                process.start()
+                running[participant] = [process, time.perf_counter()]
+
+            # Collects finished results
+            try:
+                result = result_queue.get(timeout=1)
+
+                # Progress message from a headless worker
+                if "Progress" in result:
+                    self.progress[result["ID"]] = result["Progress"]
+
+                    if self.progress_callback is not None:
+                        self.progress_callback(result)
+                    continue
+
+                # Result from a process that has already been stopped
+                if result["ID"] not in running:
+                    continue
+
+                result["Total time"] = time.perf_counter() - running[result["ID"]][1]
+
+                running[result["ID"]][0].join()
+                del running[result["ID"]]
+
+                self.results.append(result)
+                print("-{}: {} ({}/{})".format(result["ID"], result["Status"],
+                                               len(self.results), len(self.participant_list)))
+
+            except queue.Empty:
+                pass
+
+            # Stops timed out or crashed processes
+            for participant in list(running.keys()):
+                process, start_time = running[participant]
+                elapsed = time.perf_counter() - start_time
+
+                if elapsed > self.timeout or (not process.is_alive() and process.exitcode != 0):
+                    status = "Timeout" if process.is_alive() else "Crashed"
+
+                    process.terminate()
+                    process.join()
+                    del running[participant]
+
+                    self.results.append({"ID": participant, "Status": status, "Stage": None,
+                                         "Error": "Exit code {}".format(process.exitcode) if status == "Crashed"
+                                         else "Timed out after {} seconds".format(self.timeout),
+                                         "Traceback": None, "Stage times": {}, "Total time": elapsed})
+                    print("-{}: {} ({}/{})".format(participant, status,
+                                                   len(self.results), len(self.participant_list)))
+
+        self.report = self.create_report()
+
+        t_end = datetime.now()
+        print("\nBatch complete ({} seconds).".format(round((t_end - t_start).total_seconds(), 1)))
+        print(self.report["Status"].value_counts().to_string())
+
+        return self.report
+
+    def create_report(self, write_file=True):
+        """Creates DataFrame with one row per participant: status, failed stage, error, time for each stage and peak
+           memory use.
+        """
+
+        stage_names = ["Subject"] + [i[0] for i in self.stages] + ["Write output"]
+
+        rows = []
+        for result in self.results:
+            row = {"ID": result["ID"], "Status": result["Status"], "Stage": result["Stage"],
+                   "Error": result["Error"], "Total time": result.get("Total time", None)}
+
+            for stage in stage_names:
+                row[stage] = result["Stage times"].get(stage, None)
+
+            instrumentation = result.get("Instrumentation", None)
+            row["Peak RSS (MB)"] = instrumentation["Peak RSS (MB)"] if instrumentation is not None else None
+
+            row["Traceback"] = result["Traceback"]
+            rows.append(row)
+
+        report = pd.DataFrame(rows, columns=["ID", "Status", "Stage", "Error", "Total time"] +
+                              stage_names + ["Peak RSS (MB)", "Traceback"])
+
+        # Keeps order of participant_list
+        report["Order"] = [self.participant_list.index(i) for i in report["ID"]]
+        report = report.sort_values("Order").drop("Order", axis=1).reset_index(drop=True)
+
+        if write_file:
+            report_file = os.path.join(self.output_dir,
+                                       "BatchReport_{}.csv".format(datetime.now().strftime("%Y%m%d_%H%M%S")))
+            report.to_csv(report_file, index=False)
+            print("-Report written to {}".format(report_file))
+
+        return report
+
+    def summarize_stages(self):
+        """Returns time, CPU time, peak memory and throughput of each processing stage (import, filter, QC, etc.)
+           across participants. See Instrumentation.aggregate().
+        """
+
+        reports = [i["Instrumentation"] for i in self.results if i.get("Instrumentation") is not None]
+
+        return Instrumentation.aggregate(reports)
+
+    def summarize_timings(self):
+        """Returns table of time spent in each stage (seconds) across completed participants."""
+
+        stage_names = ["Subject"] + [i[0] for i in self.stages] + ["Write output", "Total time"]
+
+        completed = self.report.loc[self.report["Status"] == "Complete"]
+
+        summary = pd.DataFrame({"Mean": completed[stage_names].mean(), "Median": completed[stage_names].median(),
+                                "Max": completed[stage_names].max(), "Total": completed[stage_names].sum()})
+
+        return summary.round(2)
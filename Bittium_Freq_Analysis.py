@@ -1,15 +1,21 @@
-from matplotlib import pyplot as plt
 import numpy as np
 import pandas as pd
-import scipy.stats as stats
 from datetime import datetime
-import matplotlib.dates as mdates
 import scipy.fft
 import random
 from ECG import ECG
-import pingouin as pg
-import sklearn.metrics
+import Nonwear
+import SpectralFeatures
+import ParameterSweep
 from csv import DictWriter
+from LazyImport import lazy_import
+
+# Plotting and statistics packages are imported on first use
+plt = lazy_import("matplotlib.pyplot")
+mdates = lazy_import("matplotlib.dates")
+stats = lazy_import("scipy.stats")
+pg = lazy_import("pingouin")
+sklearn_metrics = lazy_import("sklearn.metrics")
 
 
 class Data:
@@ -27,6 +33,7 @@ class Data:
 
         self.ecg = None
         self.nonwear = None
+        self.nonwear_bouts = None
         self.ecg_cutoffs = None
 
         self.ecg_fft = None
@@ -349,70 +356,30 @@ class Data:
             # First accel check: SD and range below threshold calculations -------------------------------------------
             print("\nPerforming non-wear detection algorithm...")
 
-            accel_nw = []
-            accel_sd_list = []
-
-            for i in np.arange(0, len(self.ecg.accel_x), self.ecg.accel_sample_rate * self.seg_length):
-
-                # Calculates SD for each accel axis
-                sd_x = np.std(self.ecg.accel_x[i:i + self.ecg.accel_sample_rate * self.seg_length])
-                sd_y = np.std(self.ecg.accel_y[i:i + self.ecg.accel_sample_rate * self.seg_length])
-                sd_z = np.std(self.ecg.accel_z[i:i + self.ecg.accel_sample_rate * self.seg_length])
-
-                # How many axes below threshold
-                axes_below_thresh = int(sd_x <= accel_sd_thresh) + \
-                                    int(sd_y <= accel_sd_thresh) + \
-                                    int(sd_z <= accel_sd_thresh)
-
-                # Average SD across axes
-                avg_sd = (sd_x + sd_y + sd_z) / 3
-                accel_sd_list.append(round(avg_sd, 2))
-
-                # Calculates accelerometer signal range
-                range_x = max(self.ecg.accel_x[i:i + self.ecg.accel_sample_rate * self.seg_length]) - \
-                          min(self.ecg.accel_x[i:i + self.ecg.accel_sample_rate * self.seg_length])
-                range_y = max(self.ecg.accel_y[i:i + self.ecg.accel_sample_rate * self.seg_length]) - \
-                          min(self.ecg.accel_y[i:i + self.ecg.accel_sample_rate * self.seg_length])
-                range_z = max(self.ecg.accel_z[i:i + self.ecg.accel_sample_rate * self.seg_length]) - \
-                          min(self.ecg.accel_z[i:i + self.ecg.accel_sample_rate * self.seg_length])
+            accel_features = Nonwear.accel_epoch_features(x=self.ecg.accel_x, y=self.ecg.accel_y, z=self.ecg.accel_z,
+                                                          sample_rate=self.ecg.accel_sample_rate,
+                                                          epoch_len=self.seg_length)
 
-                # How many accel axes below range threshold (50mG)
-                axes_below_range = int(range_x <= 50) + int(range_y <= 50) + int(range_z <= 50)
+            # Average SD across axes
+            accel_sd_list = np.round(accel_features["AvgSD"], 2)
 
-                # if axes_below_range >= 2 or axes_below_thresh >= 2:
-                if axes_below_thresh >= 2 or avg_sd <= accel_sd_thresh:
-                    accel_nw.append("Nonwear")
-                else:
-                    accel_nw.append("Wear")
+            # Non-wear if 2+ axes or the average SD are below threshold (range not used)
+            accel_nw = Nonwear.accel_nonwear_epochs(features=accel_features, sd_thresh=accel_sd_thresh,
+                                                    range_thresh=None, avg_sd_thresh=accel_sd_thresh, n_axes=2)
+            accel_nw = ["Nonwear" if i else "Wear" for i in accel_nw]
 
             # ECG FFT data --------------------------------------------------------------------------------------------
             if ecg_fft_dict["Use"] and self.ecg_cutoffs is None:
 
-                cutoff_freqs = []
-                dom_freqs = []
+                spectral = SpectralFeatures.spectral_features(data=self.ecg.raw, sample_rate=self.ecg.sample_rate,
+                                                              epoch_len=self.seg_length,
+                                                              percent=ecg_fft_dict["Percent"])
 
-                for epoch in np.arange(0, len(self.ecg.raw), self.seg_length * self.ecg.sample_rate):
+                # Only invalid epochs are checked: valid epochs have a cutoff of 0 and no dominant frequency
+                invalid = np.array(self.ecg.epoch_validity[:len(spectral["Cutoff F"])]) == "Invalid"
 
-                    if self.ecg.epoch_validity[epoch] == "Valid":
-                        cutoff_freqs.append(0)
-
-                    if self.ecg.epoch_validity[epoch] == "Invalid":
-
-                        # Runs FFT
-                        ecg_fft = self.run_ecg_fft(start=int(epoch * self.ecg.sample_rate), fft_filtered=False,
-                                                   show_plot=False, print_data=False)
-
-                        # Finds dominant frequency
-                        dom_f_ecg = ecg_fft.loc[ecg_fft["Power"] == max(ecg_fft["Power"])]["Frequency"].iloc[0]
-                        dom_freqs.append(dom_f_ecg)
-
-                        # Calculates frequency that corresponds to cumulative power at ecg_fft_dict["Percent"]
-                        ecg_fft["Normalized_CumulativePower"] = [i / ecg_fft["Power"].sum() for
-                                                                 i in ecg_fft["Power"].cumsum()]
-
-                        cutoff_f = ecg_fft.loc[ecg_fft["Normalized_CumulativePower"] >=
-                                               ecg_fft_dict["Percent"]/100].iloc[0]["Frequency"]
-                        cutoff_freqs.append(cutoff_f)
+                cutoff_freqs = list(np.where(invalid, spectral["Cutoff F"][:len(invalid)], 0))
+                dom_freqs = [f if i else None for f, i in zip(spectral["Dominant F"], invalid)]
 
             if ecg_fft_dict["Use"] and self.ecg_cutoffs is not None:
                 cutoff_freqs = self.ecg_cutoffs
@@ -452,33 +419,12 @@ class Data:
 
             # X-minute windows ----------------------------------------------------------------------------------------
             t0 = datetime.now()
-            final_nw = np.zeros(len(nw))
-
             n_epochs = int(n_minutes * 60 / self.seg_length)
             n_epochs_thresh = int(n_epochs * window_percent / 100)
 
-            for i in range(len(nw)):
-
-                if nw[i:i + n_epochs].count("Nonwear") >= n_epochs_thresh:
-                    final_nw[i:i + n_epochs] = 1
-
-                    for j in range(i, len(nw)):
-                        """if nw[j] == "Nonwear":
-                            pass
-                        if nw[j] == "Wear":
-                            stop_ind = j
-                            if j > i:
-                                final_nw[i:stop_ind] = 1"""
-                        if "Nonwear" in nw[j:j+int(60/self.seg_length)]:
-                            pass
-                        if "Nonwear" not in nw[j:j+int(60/self.seg_length)]:
-                            stop_ind = j
-                            if j > i:
-                                final_nw[i:stop_ind] = 1
-
-
-                else:
-                    final_nw[i] = 0
+            # Non-wear periods end when there is no non-wear in the next minute
+            final_nw = Nonwear.window_nonwear(epoch_nonwear=np.array(nw) == "Nonwear", n_epochs=n_epochs,
+                                              n_epochs_thresh=n_epochs_thresh, end_gap=int(60 / self.seg_length))
 
             final_nw = ["Nonwear" if i == 1 else "Wear" for i in final_nw]
 
@@ -495,6 +441,10 @@ class Data:
             final_nw = self.nonwear
             df_ecg = self.df_ecg
 
+        # One row per non-wear period
+        self.nonwear_bouts = Nonwear.find_bouts(status=np.array(final_nw) == "Nonwear",
+                                                timestamps=self.ecg.epoch_timestamps[:len(final_nw)])
+
         # Gets timestamps when device was removed and put back on ----------------------------------------------------
         on_stamps = []
         off_stamps = []
@@ -580,13 +530,24 @@ class Data:
 
         nonwear_status = []
 
+        # Average accelerometer SD for every epoch
+        accel_features = Nonwear.accel_epoch_features(x=self.ecg.accel_x, y=self.ecg.accel_y, z=self.ecg.accel_z,
+                                                      sample_rate=self.ecg.accel_sample_rate,
+                                                      epoch_len=self.ecg.epoch_len)
+
+        # FFT features for every epoch: one batched FFT per signal
+        accel_spectral = SpectralFeatures.spectral_features(data=self.ecg.accel_x,
+                                                            sample_rate=self.ecg.accel_sample_rate,
+                                                            epoch_len=self.ecg.epoch_len, min_f=.05)
+
+        ecg_spectral = SpectralFeatures.spectral_features(data=self.ecg.raw, sample_rate=self.ecg.sample_rate,
+                                                          epoch_len=self.ecg.epoch_len,
+                                                          percent=90 if ecg_power_thresh["Percent"] is None
+                                                          else ecg_power_thresh["Percent"])
+
         # Loops through epochs
         for epoch in np.arange(0, len(self.ecg.epoch_validity)):
 
-            # Calculates corresponding accelerometer data indexes
-            accel_epoch_len = int(self.ecg.sample_rate / self.ecg.accel_sample_rate)
-            raw_accel_ind = int(epoch * accel_epoch_len * self.ecg.accel_sample_rate)
-
             # Sets epoch as wear if ECG signal was valid
             if self.ecg.epoch_validity[epoch] == "Valid":
                 nonwear_status.append("Wear")
@@ -595,17 +556,13 @@ class Data:
             if self.ecg.epoch_validity[epoch] == "Invalid":
 
                 # Calculates average axes SD if invalid ECG period ----------------------------------------------------
-                sd_x = np.std(self.ecg.accel_x[raw_accel_ind:raw_accel_ind + accel_epoch_len])
-                sd_y = np.std(self.ecg.accel_y[raw_accel_ind:raw_accel_ind + accel_epoch_len])
-                sd_z = np.std(self.ecg.accel_z[raw_accel_ind:raw_accel_ind + accel_epoch_len])
-
-                avg = (sd_x + sd_y + sd_z) / 3
+                avg = accel_features["AvgSD"][epoch] if epoch < len(accel_features["AvgSD"]) else np.nan
                 accel_sd_nonwear = True if avg <= accel_sd_thresh else False
 
                 # Calculates dominant frequency in accel signal -------------------------------------------------------
                 if accel_dom_f_thresh is not None:
-                    accel_fft = self.run_accel_fft(start=raw_accel_ind, show_plot=False, print_data=False)
-                    dom_f_x = accel_fft.loc[accel_fft["Power_X"] == max(accel_fft["Power_X"])]["Frequency"].iloc[0]
+                    dom_f_x = accel_spectral["Dominant F"][epoch] if epoch < len(accel_spectral["Dominant F"]) \
+                        else np.nan
 
                     accel_f_nonwear = True if dom_f_x >= accel_dom_f_thresh else False
 
@@ -614,9 +571,8 @@ class Data:
 
                 # Calculates dominant frequency in ECG signal --------------------------------------------------------
                 if ecg_dom_f_thresh is not None:
-                    ecg_fft = self.run_ecg_fft(start=int(epoch * self.ecg.sample_rate), fft_filtered=False,
-                                               show_plot=False, print_data=False)
-                    dom_f_ecg = ecg_fft.loc[ecg_fft["Power"] == max(ecg_fft["Power"])]["Frequency"].iloc[0]
+                    dom_f_ecg = ecg_spectral["Dominant F"][epoch] if epoch < len(ecg_spectral["Dominant F"]) \
+                        else np.nan
 
                     ecg_f_nonwear = True if dom_f_ecg >= ecg_dom_f_thresh else False
 
@@ -625,14 +581,8 @@ class Data:
 
                 # Calculates cumulative frequency power in ECG signal ------------------------------------------------
                 if ecg_power_thresh["F"] is not None and ecg_power_thresh["Percent"] is not None:
-                    ecg_fft = self.run_ecg_fft(start=int(epoch * self.ecg.sample_rate),
-                                               show_plot=False, print_data=False)
-
-                    ecg_fft["Normalized_CumulativePower"] = [i / ecg_fft["Power"].sum() for
-                                                             i in ecg_fft["Power"].cumsum()]
-
-                    cutoff_f = ecg_fft.loc[ecg_fft["Normalized_CumulativePower"] >=
-                                           ecg_power_thresh["Percent"]/100].iloc[0]["Frequency"]
+                    cutoff_f = ecg_spectral["Cutoff F"][epoch] if epoch < len(ecg_spectral["Cutoff F"]) \
+                        else np.nan
 
                     ecg_power_nonwear = True if cutoff_f >= ecg_power_thresh["F"] else False
 
@@ -652,28 +602,10 @@ class Data:
                     nonwear_status.append("Wear")
 
         # Requiring x-minute windows ----------------------------------------------------------------------------------
-        final_nw = np.zeros(len(nonwear_status))
         n_epochs = int(window_len * 60 / self.ecg.epoch_len)
 
-        for i in range(len(nonwear_status)):
-
-            if final_nw[i] == "Wear" or final_nw[i] == "Nonwear":
-                pass
-
-            if nonwear_status[i:i + n_epochs].count("Nonwear") >= int(n_epochs * percent_nonwear / 100):
-
-                final_nw[i:i + n_epochs] = 1
-
-                for j in range(i, len(nonwear_status)):
-                    if nonwear_status[j] == "Nonwear":
-                        pass
-                    if nonwear_status[j] == "Wear":
-                        stop_ind = j
-                        if j > i:
-                            final_nw[i:stop_ind] = 1
-
-            else:
-                final_nw[i] = 0
+        final_nw = Nonwear.window_nonwear(epoch_nonwear=np.array(nonwear_status) == "Nonwear", n_epochs=n_epochs,
+                                          n_epochs_thresh=int(n_epochs * percent_nonwear / 100), end_gap=1)
 
         final_nw = ["Nonwear" if i == 1 else "Wear" for i in final_nw]
 
@@ -718,6 +650,10 @@ class Data:
             if (off - on) <= n_gap_epochs:
                 really_final_nw[on:off] = "Nonwear"
 
+        # One row per non-wear period
+        self.nonwear_bouts = Nonwear.find_bouts(status=really_final_nw == "Nonwear",
+                                                timestamps=self.ecg.epoch_timestamps[:len(really_final_nw)])
+
         t1 = datetime.now()
 
         print("-Complete ({} seconds).".format(round((t1-t0).total_seconds()), 1))
@@ -764,34 +700,17 @@ class Data:
     def calculate_freq_cutoffs(self, epoch_len=15, percent=70):
 
         print("\nCalculating frequency of {}% cumulative FFT power for {}-second epochs...".format(percent, epoch_len))
-        ecg_cutoffs = []
-
         t0 = datetime.now()
 
-        percent_markers = [int(i) for i in np.arange(0, len(self.ecg.raw) * 1.1, len(self.ecg.raw)/10)]
-        marker_tally = 0
-        # Loops through all data
-        for i in np.arange(0, len(self.ecg.raw), epoch_len * self.ecg.sample_rate):
-
-            if percent_markers[marker_tally] <= i <= percent_markers[marker_tally + 1]:
-                marker_tally += 1
-
-                print("-{}% done ({} seconds)...".format(int(100 * i / len(self.ecg.raw)),
-                                                         round((datetime.now() - t0).total_seconds(), 1)))
-
-            try:
-
-                ecg_fft = self.run_ecg_fft(start=i, show_plot=False, print_data=False, fft_filtered=False)
-                ecg_fft["Normalized_CumulativePower"] = [i / ecg_fft["Power"].sum() for
-                                                         i in ecg_fft["Power"].cumsum()]
-
-                cutoff_freq = round(ecg_fft.loc[ecg_fft["Normalized_CumulativePower"]
-                                                >= percent / 100].iloc[0].values[0], 1)
+        # One FFT for all epochs
+        spectral = SpectralFeatures.spectral_features(data=self.ecg.raw, sample_rate=self.ecg.sample_rate,
+                                                      epoch_len=epoch_len, percent=percent)
 
-                ecg_cutoffs.append(cutoff_freq)
+        ecg_cutoffs = [None if np.isnan(i) else round(i, 1) for i in spectral["Cutoff F"]]
 
-            except IndexError:
-                ecg_cutoffs.append(None)
+        # Incomplete epoch at end of data
+        n_epochs = int(np.ceil(len(self.ecg.raw) / (epoch_len * self.ecg.sample_rate)))
+        ecg_cutoffs += [None for i in range(n_epochs - len(ecg_cutoffs))]
 
         t1 = datetime.now()
         print("Complete. Time =", round((t1 - t0).total_seconds(), 1), "seconds")
@@ -856,6 +775,8 @@ class GoldStandardReview:
         self.anova = None
         self.posthoc = None
 
+        self.df_roc = None
+
         self.import_file()
 
     def import_file(self):
@@ -930,15 +851,15 @@ class GoldStandardReview:
         nonwear = df.groupby("Group").get_group("InvalidNonwear")
 
         nw_desc = nonwear.describe().loc[["mean", "std", "count"]].transpose()
-        nw_desc["95%CI"] = nw_desc["std"] / np.sqrt(nw_desc["count"]) * scipy.stats.t.ppf(.95, nw_desc["count"] - 1)
+        nw_desc["95%CI"] = nw_desc["std"] / np.sqrt(nw_desc["count"]) * stats.t.ppf(.95, nw_desc["count"] - 1)
 
         wear_desc = validwear.describe().loc[["mean", "std", "count"]].transpose()
         wear_desc["95%CI"] = wear_desc["std"] / np.sqrt(wear_desc["count"]) * \
-                             scipy.stats.t.ppf(.95, wear_desc["count"] - 1)
+                             stats.t.ppf(.95, wear_desc["count"] - 1)
 
         invalidwear_desc = invalidwear.describe().loc[["mean", "std", "count"]].transpose()
         invalidwear_desc["95%CI"] = invalidwear_desc["std"] / np.sqrt(invalidwear_desc["count"]) * \
-                                    scipy.stats.t.ppf(.95, invalidwear_desc["count"] - 1)
+                                    stats.t.ppf(.95, invalidwear_desc["count"] - 1)
 
         plt.fill_between(x=np.arange(0, 100, 10),
                          y1=nw_desc['mean'] - nw_desc[error_range], y2=nw_desc['mean'],
@@ -980,15 +901,15 @@ class GoldStandardReview:
         nonwear = df.groupby("Group").get_group("InvalidNonwear")
 
         nw_desc = nonwear.describe().loc[["mean", "std", "count"]].transpose()
-        nw_desc["95%CI"] = nw_desc["std"] / np.sqrt(nw_desc["count"]) * scipy.stats.t.ppf(.95, nw_desc["count"] - 1)
+        nw_desc["95%CI"] = nw_desc["std"] / np.sqrt(nw_desc["count"]) * stats.t.ppf(.95, nw_desc["count"] - 1)
 
         wear_desc = validwear.describe().loc[["mean", "std", "count"]].transpose()
         wear_desc["95%CI"] = wear_desc["std"] / np.sqrt(wear_desc["count"]) * \
-                             scipy.stats.t.ppf(.95, wear_desc["count"] - 1)
+                             stats.t.ppf(.95, wear_desc["count"] - 1)
 
         invalidwear_desc = invalidwear.describe().loc[["mean", "std", "count"]].transpose()
         invalidwear_desc["95%CI"] = invalidwear_desc["std"] / np.sqrt(invalidwear_desc["count"]) * \
-                                    scipy.stats.t.ppf(.95, invalidwear_desc["count"] - 1)
+                                    stats.t.ppf(.95, invalidwear_desc["count"] - 1)
 
         plt.fill_between(x=np.arange(0, 100, 10),
                          y1=nw_desc['mean'] - nw_desc[error_range], y2=nw_desc['mean'],
@@ -1187,7 +1108,7 @@ class GoldStandardReview:
                             "ECG_cf_perc": ecg_perc_thresh, "ECG_cf_f": ecg_f_thresh,
                             "% Accuracy": perc_accuracy,
                             "Sensitivity": sens, "Specificity": spec,
-                            "AUC": round(sklearn.metrics.roc_auc_score(y_true=[0 if i == "Wear" else 1 for
+                            "AUC": round(sklearn_metrics.roc_auc_score(y_true=[0 if i == "Wear" else 1 for
                                                                                i in df["VisualNonwear"]],
                                                                        y_score=[0 if i == "Wear" else 1 for
                                                                                 i in df["Outcome"]]), 3),
@@ -1225,38 +1146,32 @@ class GoldStandardReview:
         return sens, spec
 
     def perform_roc(self, volt_ranges=np.arange(50, 750, 100), ecg_f=np.arange(2.5, 27.5, 2.5),
-                    accel_f=np.arange(0.5, 3.5, .25), accel_sd=np.arange(1, 30, 3), n_conditions=3):
-        """Loops through all combinations of parameters given as arguments.
+                    accel_f=np.arange(0.5, 3.5, .25), accel_sd=np.arange(1, 30, 3), n_conditions=3,
+                    chunk_size=None, pool=None):
+        """Tests all combinations of parameters given as arguments at once using ParameterSweep.
            Returns df of best AUC and minimum distance to perfect accuracy.
+
+        :argument
+        -chunk_size: number of voltage thresholds tested at once. Use for grids too large to hold in memory.
+        -pool: executor or multiprocessing.Pool used to process chunks in parallel
         """
 
-        print("\nRunning ROC analysis...Please wait a while...")
+        print("\nRunning ROC analysis...")
 
         t0 = datetime.now()
 
-        n_combos = len(volt_ranges) * len(ecg_f) * len(accel_f) * len(accel_sd)
-
-        data = []
-        tally = 0
-        percent_markers = np.arange(0, n_combos * 1.1, n_combos/10)
-
-        for v in volt_ranges:
-            for e in ecg_f:
-                for accel in accel_f:
-                    for sd in accel_sd:
-                        tally += 1
-
-                        if tally in percent_markers:
-                            print("{}% done ({} seconds)...".format(int(100*tally/n_combos),
-                                                                    round((datetime.now() - t0).total_seconds(), 1)))
+        df = self.df.loc[self.df["Group"] != "InvalidUnsure"]
 
-                        perf, results = self.recalculate_nonwear(volt_thresh=v, ecg_dom_f_thresh=e,
-                                                                 accel_dom_f_thresh=accel, accel_sd_thresh=sd,
-                                                                 n_conditions=n_conditions, print_data=False)
+        # Same conditions as recalculate_nonwear()
+        grids = [["ECG_volt_range", volt_ranges, "below"],
+                 ["ECG_dom_f", ecg_f, "above"],
+                 ["Accel_dom_f_avg", accel_f, "above"],
+                 ["Accel_avg", accel_sd, "below"]]
 
-                        data.append([i for i in perf.values()])
+        df = ParameterSweep.sweep(features=df, labels=df["VisualNonwear"] == "Nonwear", grids=grids,
+                                  n_conditions=n_conditions, chunk_size=chunk_size, pool=pool)
 
-        df = pd.DataFrame(data, columns=[i for i in perf.keys()])
+        self.df_roc = df
 
         best_auc = df.loc[df["AUC"] == max(df["AUC"])]
         best_dist = df.loc[df["Distance"] == min(df["Distance"])]
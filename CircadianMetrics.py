@@ -0,0 +1,202 @@
+"""Non-parametric and cosinor circadian rhythm measures from any epoched activity series (e.g. wrist SVM). All measures
+   use pandas resample/groupby so run time is linear in the number of epochs.
+
+   -Interday stability (IS) and intradaily variability (IV): Witting et al., 1990
+   -L5/M10 and relative amplitude (RA): Van Someren et al., 1999
+   -Cosinor: Cornelissen, 2014
+"""
+
+import pandas as pd
+import numpy as np
+
+
+def to_series(timestamps, data):
+    """Returns data as a pd.Series indexed by timestamp, sorted by time."""
+
+    return pd.Series(np.asarray(data, dtype="float64"), index=pd.DatetimeIndex(timestamps)).sort_index()
+
+
+def crop_to_whole_days(series):
+    """Removes data before the first midnight and after the last midnight so only complete days are used."""
+
+    first_midnight = series.index[0].normalize()
+    if series.index[0] != first_midnight:
+        first_midnight += pd.Timedelta(days=1)
+
+    last_midnight = series.index[-1].normalize()
+
+    cropped = series.loc[(series.index >= first_midnight) & (series.index < last_midnight)]
+
+    # Less than one full day: uses all data
+    return cropped if cropped.shape[0] > 0 else series
+
+
+def resample_series(series, resolution="1H"):
+    """Averages series into bins of length resolution. Returns series unchanged if resolution is None."""
+
+    if resolution is None:
+        return series
+
+    return series.resample(resolution.lower()).mean()
+
+
+def interday_stability(series, resolution="1H"):
+    """Interday stability: variance of the average 24-hour profile relative to total variance (0-1; 0 = noise,
+       1 = same pattern every day).
+
+    :argument
+    -series: data indexed by timestamp (see to_series())
+    -resolution: length of bins data is averaged into first. None uses data as given (e.g. Suibkitwanchai et al.,
+                 2020 calculate IS from epochs grouped by hour of day).
+    """
+
+    data = resample_series(series, resolution).dropna()
+
+    mean = data.mean()
+    hourly_profile = data.groupby(data.index.hour).mean()
+
+    numerator = data.shape[0] * np.square(hourly_profile - mean).sum()
+    denominator = 24 * np.square(data - mean).sum()
+
+    return numerator / denominator
+
+
+def intradaily_variability(series, resolution="1H"):
+    """Intradaily variability: how much data changes between consecutive bins relative to total variance (0 = smooth
+       sine wave; ~2 = noise).
+    """
+
+    data = resample_series(series, resolution).dropna()
+
+    mean = data.mean()
+    n = data.shape[0]
+
+    numerator = n * np.square(np.diff(data.values)).sum()
+    denominator = (n - 1) * np.square(data - mean).sum()
+
+    return numerator / denominator
+
+
+def average_day(series, resolution="1H"):
+    """Average 24-hour profile. Index is hour of day (decimal hours)."""
+
+    data = resample_series(series, resolution).dropna()
+
+    time_of_day = data.index.hour + data.index.minute / 60 + data.index.second / 3600
+
+    return data.groupby(time_of_day).mean()
+
+
+def l5_m10(series, resolution="1H"):
+    """Finds the least active 5 hours (L5) and most active 10 hours (M10) in the average 24-hour profile. Windows
+       wrap around midnight.
+
+    :returns
+    -dictionary: "L5", "L5 Start", "M10", "M10 Start", "RA" (relative amplitude = (M10 - L5) / (M10 + L5)). Start
+     values are hour of day.
+    """
+
+    profile = average_day(series, resolution)
+
+    bin_hours = 24 / profile.shape[0]
+    values = profile.values
+
+    output = {}
+    for name, hours, func in [["L5", 5, np.argmin], ["M10", 10, np.argmax]]:
+        n_bins = max(int(round(hours / bin_hours)), 1)
+
+        # Circular rolling mean
+        wrapped = np.concatenate([values, values[:n_bins - 1]])
+        cumulative = np.concatenate([[0], np.cumsum(wrapped)])
+        window_means = (cumulative[n_bins:] - cumulative[:-n_bins]) / n_bins
+
+        index = func(window_means)
+        output[name] = window_means[index]
+        output[name + " Start"] = profile.index[index]
+
+    output["RA"] = (output["M10"] - output["L5"]) / (output["M10"] + output["L5"])
+
+    return output
+
+
+def cosinor(series, period=24):
+    """Fits data = MESOR + amplitude * cos(2 * pi * (t - acrophase) / period) by least squares. t is clock time in
+       hours since midnight on the first day.
+
+    :returns
+    -dictionary: "MESOR", "Amplitude", "Acrophase" (hour of peak), "R2"
+    """
+
+    data = series.dropna()
+
+    t = (data.index - data.index[0].normalize()).total_seconds().values / 3600
+    omega = 2 * np.pi / period
+
+    design = np.column_stack([np.ones(len(t)), np.cos(omega * t), np.sin(omega * t)])
+    (mesor, beta, gamma), _, _, _ = np.linalg.lstsq(design, data.values, rcond=None)
+
+    fitted = design @ np.array([mesor, beta, gamma])
+    total = np.square(data.values - data.values.mean()).sum()
+
+    return {"MESOR": mesor,
+            "Amplitude": np.sqrt(beta ** 2 + gamma ** 2),
+            "Acrophase": (np.arctan2(gamma, beta) / omega) % period,
+            "R2": 1 - np.square(data.values - fitted).sum() / total if total > 0 else np.nan}
+
+
+def circadian_metrics(timestamps, data, resolution="1H", crop_days=True):
+    """Calculates all circadian measures for one series.
+
+    :argument
+    -timestamps: epoch timestamps
+    -data: epoched data (e.g. SVM)
+    -resolution: bin length used for IS, IV and L5/M10
+    -crop_days: boolean; only uses complete days (midnight to midnight)
+
+    :returns
+    -dictionary of measures
+    """
+
+    series = to_series(timestamps, data)
+
+    if crop_days:
+        series = crop_to_whole_days(series)
+
+    output = {"Days": round((series.index[-1] - series.index[0]).total_seconds() / 86400, 2),
+              "IS": interday_stability(series, resolution),
+              "IV": intradaily_variability(series, resolution)}
+
+    output.update(l5_m10(series, resolution))
+    output.update(cosinor(series))
+
+    return output
+
+
+def _subject_metrics(args):
+    """Runs circadian_metrics() for one subject. Returns [subject ID, dictionary]."""
+
+    subject_id, timestamps, data, kwargs = args
+
+    return [subject_id, circadian_metrics(timestamps=timestamps, data=data, **kwargs)]
+
+
+def batch_circadian_metrics(subjects, pool=None, **kwargs):
+    """Calculates circadian measures for many subjects.
+
+    :argument
+    -subjects: dictionary of subject ID: [timestamps, data]
+    -pool: executor or multiprocessing.Pool; subjects are processed with pool.map() if given
+    -kwargs: arguments passed to circadian_metrics()
+
+    :returns
+    -dataframe with one row per subject
+    """
+
+    tasks = [[subject_id, timestamps, data, kwargs] for subject_id, (timestamps, data) in subjects.items()]
+
+    results = list(pool.map(_subject_metrics, tasks) if pool is not None else map(_subject_metrics, tasks))
+
+    df = pd.DataFrame([metrics for subject_id, metrics in results])
+    df.insert(0, "ID", [subject_id for subject_id, metrics in results])
+
+    return df
@@ -1,8 +1,9 @@
 import pandas as pd
-import math
 import numpy as np
 import scipy.fft
 import matplotlib.pyplot as plt
+import CircadianMetrics
+import EpochData
 
 
 class CircadianRhythm:
@@ -12,6 +13,7 @@ class CircadianRhythm:
         self.subj_obj = subject_obj
         self.interday_stability = None
         self.intraday_variability = None
+        self.metrics = None
 
         if subject_obj.epoch_len != 5:
             self.df = self.recalculate_epochs()
@@ -21,38 +23,31 @@ class CircadianRhythm:
                                             self.subj_obj.wrist.epoch.svm)), columns=["Timestamp", "SVM"])
 
     def recalculate_epochs(self):
+        """Creates 5-second epochs from the wrist epoch pyramid. The pyramid is only calculated from raw data if the
+           wrist data does not have one.
+        """
 
         print("\nRecalculating from {}-second epochs to 5-second epochs...".format(self.subj_obj.epoch_len))
 
-        timestamps = self.subj_obj.wrist.raw.timestamps[::self.subj_obj.epoch_len *
-                                                          self.subj_obj.wrist.raw.sample_rate]
+        pyramid = self.subj_obj.wrist.epoch.pyramid
 
-        raw_data = self.subj_obj.wrist.raw
-        epoch_len = self.subj_obj.epoch_len
+        if pyramid is None:
+            raw_data = self.subj_obj.wrist.raw
 
-        # Calculates gravity-subtracted vector magnitude
-        raw_data.vm = [round(abs(math.sqrt(math.pow(raw_data.x[i], 2) + math.pow(raw_data.y[i], 2) +
-                                           math.pow(raw_data.z[i], 2)) - 1), 5) for i in range(len(raw_data.x))]
+            # Calculates gravity-subtracted vector magnitude
+            raw_data.vm = EpochData.vector_magnitude(x=raw_data.x, y=raw_data.y, z=raw_data.z,
+                                                     remove_gravity=True, absolute=True, decimals=5)
 
-        # Calculates activity counts
-        svm = []
-        for i in range(0, len(raw_data.vm), int(raw_data.sample_rate * epoch_len)):
+            pyramid = EpochData.EpochPyramid(data=raw_data.vm, sample_rate=raw_data.sample_rate,
+                                             start_time=raw_data.timestamps[0])
+            self.subj_obj.wrist.epoch.pyramid = pyramid
 
-            if i + epoch_len * raw_data.sample_rate > len(raw_data.vm):
-                break
+        # Bug handling: when we combine multiple EDF files they are zero-padded
+        # When vector magnitude is calculated, it is 1
+        # Any epoch where every value is 1 becomes 0
+        epoched = pyramid.get_epochs(epoch_len=5, correct_padding=True)
 
-            vm_sum = sum(raw_data.vm[i:i + epoch_len * raw_data.sample_rate])
-
-            # Bug handling: when we combine multiple EDF files they are zero-padded
-            # When vector magnitude is calculated, it is 1
-            # Any epoch where the values were all the epoch length * sampling rate (i.e. a VM of 1 for each data point)
-            # becomes 0
-            if vm_sum == epoch_len * raw_data.sample_rate:
-                vm_sum = 0
-
-            svm.append(round(vm_sum, 5))
-
-        df = pd.DataFrame(list(zip(timestamps, svm)), columns=["Timestamp", "SVM"])
+        df = pd.DataFrame({"Timestamp": epoched["Timestamps"], "SVM": np.round(epoched["Sum"], 5)})
 
         print("Complete.")
 
@@ -62,30 +57,40 @@ class CircadianRhythm:
 
         print("\nCalculating interday stability...")
 
-        # Gets value for which hour of day
-        hours = []
-        for row in self.df.itertuples():
-            h = str(row.Timestamp.hour)
+        # Equation from Suibkitwanchai et al. 2020 paper: epochs grouped by hour of day
+        interday_stability = CircadianMetrics.interday_stability(series=self.get_series(), resolution=None)
+        interday_stability = round(interday_stability, 4)
 
-            hours.append(h)
+        print("-Interday stability = {}".format(interday_stability))
 
-        self.df["Hour"] = hours
+        return interday_stability
 
-        # Calculates mean SVM by hour of day
-        mean_svms = c.df.groupby("Hour")["SVM"].describe()["mean"]
+    def calculate_intraday(self):
 
-        # Calculates overall SVM mean value
-        mean_svm = c.df["SVM"].mean()
+        print("\nCalculating intradaily variability...")
 
-        # Equation from Suibkitwanchai et al. 2020 paper
-        numerator = sum([(hourly - mean_svm) ** 2 / 24 for hourly in mean_svms])
-        denominator = sum([(value - mean_svm) ** 2 / c.df.shape[0] for value in c.df["SVM"]])
+        intraday_variability = round(CircadianMetrics.intradaily_variability(series=self.get_series(),
+                                                                             resolution="1H"), 4)
 
-        interday_stability = round(numerator / denominator, 4)
+        print("-Intradaily variability = {}".format(intraday_variability))
 
-        print("-Interday stability = {}".format(interday_stability))
+        return intraday_variability
 
-        return interday_stability
+    def calculate_metrics(self, resolution="1H", crop_days=True):
+        """Calculates IS, IV, L5/M10, relative amplitude and cosinor fit. See CircadianMetrics.circadian_metrics()."""
+
+        print("\nCalculating circadian rhythm measures...")
+
+        self.metrics = CircadianMetrics.circadian_metrics(timestamps=self.df["Timestamp"], data=self.df["SVM"],
+                                                          resolution=resolution, crop_days=crop_days)
+
+        print("-IS = {}, IV = {}, RA = {}".format(round(self.metrics["IS"], 4), round(self.metrics["IV"], 4),
+                                                  round(self.metrics["RA"], 4)))
+
+        return self.metrics
+
+    def get_series(self):
+        return CircadianMetrics.to_series(timestamps=self.df["Timestamp"], data=self.df["SVM"])
 
     def calculate_fft(self):
 
@@ -104,5 +109,23 @@ class CircadianRhythm:
         plt.xlim(0, 1/86400*6)
 
 
-c = CircadianRhythm(x)
-c.interday = c.calculate_interday()
+def batch_circadian_rhythm(subject_objs, pool=None, resolution="1H", crop_days=True):
+    """Calculates circadian rhythm measures from wrist epoch data for many subjects.
+
+    :argument
+    -subject_objs: list of Subject objects
+    -pool: executor or multiprocessing.Pool; subjects are processed in parallel if given
+    -resolution, crop_days: see CircadianMetrics.circadian_metrics()
+
+    :returns
+    -dataframe with one row per subject
+    """
+
+    subjects = {subj.subject_id: [subj.wrist.epoch.timestamps, subj.wrist.epoch.svm] for subj in subject_objs}
+
+    return CircadianMetrics.batch_circadian_metrics(subjects=subjects, pool=pool,
+                                                    resolution=resolution, crop_days=crop_days)
+
+
+# c = CircadianRhythm(x)
+# c.interday = c.calculate_interday()
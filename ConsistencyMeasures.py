@@ -1,6 +1,9 @@
 import pandas as pd
 import numpy as np
-from datetime import timedelta
+from datetime import datetime
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.spatial import cKDTree
+import CircadianMetrics
 
 
 def approxentropy(data, m=2, r=3) -> float:
@@ -31,8 +34,176 @@ def approxentropy(data, m=2, r=3) -> float:
     return abs(_phi(m + 1) - _phi(m))
 
 
+def _templates(data, m):
+    """Returns array of shape (N - m + 1, m) where each row is a template of m consecutive data points (no copy)."""
+
+    return sliding_window_view(np.asarray(data, dtype="float64"), m)
+
+
+def _count_matches(templates, r, method="kdtree", chunk_size=2000):
+    """For each template, counts how many templates (including itself) are within distance r. Distance is the
+       maximum absolute difference between data points (Chebyshev distance), as in approxentropy().
+
+    :argument
+    -templates: array from _templates()
+    -r: tolerance
+    -method: "kdtree" uses a KD-tree; "chunked" compares chunk_size templates with all others at a time so memory
+             is limited to chunk_size * N values
+    -chunk_size: number of templates per chunk for method "chunked"
+
+    :returns
+    -array of counts
+    """
+
+    if method == "kdtree":
+        tree = cKDTree(templates)
+
+        return tree.query_ball_point(templates, r=r, p=np.inf, return_length=True)
+
+    if method == "chunked":
+        counts = np.zeros(templates.shape[0], dtype="int64")
+
+        for start in range(0, templates.shape[0], chunk_size):
+            chunk = templates[start:start + chunk_size]
+
+            dist = np.zeros((chunk.shape[0], templates.shape[0]))
+            for k in range(templates.shape[1]):
+                np.maximum(dist, np.abs(chunk[:, k, None] - templates[None, :, k]), out=dist)
+
+            counts[start:start + chunk_size] = (dist <= r).sum(axis=1)
+
+        return counts
+
+    raise ValueError("method must be 'kdtree' or 'chunked', not '{}'.".format(method))
+
+
+def approximate_entropy(data, m=2, r=3, method="kdtree", chunk_size=2000):
+    """Approximate entropy from Pincus et al., 1991. Gives the same value as approxentropy() but templates are
+       compared with a KD-tree (or in chunks) instead of Python loops, so it can be used on long series.
+
+    :argument
+    -data: time series data
+    -m: template length
+    -r: tolerance; templates match if no data points differ by more than r
+    -method, chunk_size: see _count_matches()
+
+    :return
+    -approximate entropy value
+    """
+
+    data = np.asarray(data, dtype="float64")
+    n = len(data)
+
+    def _phi(length):
+        counts = _count_matches(templates=_templates(data, length), r=r, method=method, chunk_size=chunk_size)
+        return np.mean(np.log(counts / (n - length + 1.0)))
+
+    return abs(_phi(m + 1) - _phi(m))
+
+
+def sample_entropy(data, m=2, r=3, method="kdtree", chunk_size=2000):
+    """Sample entropy from Richman & Moorman, 2000. Same as approximate entropy but self-matches are excluded and
+       the same N - m templates are used for lengths m and m + 1.
+
+    :argument
+    -data: time series data
+    -m: template length
+    -r: tolerance
+    -method, chunk_size: see _count_matches()
+
+    :return
+    -sample entropy value. inf if no templates of length m + 1 match; NaN if no templates of length m match.
+    """
+
+    data = np.asarray(data, dtype="float64")
+    n = len(data)
+
+    # Number of matching pairs, excluding self-matches
+    b = (_count_matches(templates=_templates(data, m)[:n - m], r=r, method=method, chunk_size=chunk_size) - 1).sum()
+    a = (_count_matches(templates=_templates(data, m + 1), r=r, method=method, chunk_size=chunk_size) - 1).sum()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -np.log(a / b)
+
+
+def multiscale_entropy(data, scales=range(1, 11), m=2, r=None, method="kdtree", chunk_size=2000):
+    """Multiscale entropy from Costa et al., 2002. Sample entropy of the series coarse-grained by averaging
+       non-overlapping windows of each scale.
+
+    :argument
+    -data: time series data
+    -scales: list of scale factors (number of data points averaged)
+    -m: template length
+    -r: tolerance. Uses 0.15 * SD of data if None. The same r is used at every scale.
+    -method, chunk_size: see _count_matches()
+
+    :return
+    -dataframe of scale and sample entropy
+    """
+
+    data = np.asarray(data, dtype="float64")
+    r = .15 * np.std(data) if r is None else r
+
+    sampen = []
+    for scale in scales:
+        n = len(data) // scale
+        coarse = data[:n * scale].reshape(n, scale).mean(axis=1)
+
+        sampen.append(sample_entropy(data=coarse, m=m, r=r, method=method, chunk_size=chunk_size))
+
+    return pd.DataFrame(list(zip(scales, sampen)), columns=["Scale", "SampEn"])
+
+
+def benchmark_entropy(lengths=(100, 250, 500, 1000, 2000, 10000), max_original_len=2000, m=2, r=3, seed=0):
+    """Times approxentropy() against approximate_entropy() and sample_entropy() on synthetic series of increasing
+       length. approxentropy() is only run for series up to max_original_len data points.
+
+    :argument
+    -lengths: series lengths to test
+    -max_original_len: longest series run through approxentropy()
+    -m, r: entropy parameters
+    -seed: random seed for synthetic data
+
+    :return
+    -dataframe of timings (seconds) and entropy values for each length
+    """
+
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for n in lengths:
+        # Noisy sine wave scaled like epoched activity counts
+        data = 10 * np.sin(np.arange(n) * 2 * np.pi / 96) + rng.normal(0, 3, n)
+
+        t0 = datetime.now()
+        apen_fast = approximate_entropy(data=data, m=m, r=r)
+        t_fast = (datetime.now() - t0).total_seconds()
+
+        t0 = datetime.now()
+        apen_chunked = approximate_entropy(data=data, m=m, r=r, method="chunked")
+        t_chunked = (datetime.now() - t0).total_seconds()
+
+        t0 = datetime.now()
+        sampen = sample_entropy(data=data, m=m, r=r)
+        t_sampen = (datetime.now() - t0).total_seconds()
+
+        apen_orig, t_orig = None, None
+        if n <= max_original_len:
+            t0 = datetime.now()
+            apen_orig = approxentropy(data=data, m=m, r=r)
+            t_orig = (datetime.now() - t0).total_seconds()
+
+        rows.append([n, t_orig, t_fast, t_chunked, t_sampen, apen_orig, apen_fast, apen_chunked, sampen])
+        print("-N = {}: original = {} s, KD-tree = {} s, chunked = {} s".format(n, t_orig, round(t_fast, 3),
+                                                                               round(t_chunked, 3)))
+
+    return pd.DataFrame(rows, columns=["N", "Original time", "KDTree time", "Chunked time", "SampEn time",
+                                       "Original ApEn", "KDTree ApEn", "Chunked ApEn", "SampEn"])
+
+
 def interday_stability(timestamps, data):
     """Calculates interday stability measure using accelerometer data. Equation from Merilahti et al. (2016).
+       See CircadianMetrics for other circadian measures.
 
     :argument
     -timestamps: list/array of timestamps
@@ -44,44 +215,19 @@ def interday_stability(timestamps, data):
     -IS: interday stability measure (0-1; 0 = noise, 1 = perfect agreement)
     """
 
-    # Gets start dates (days)
-    dates = sorted(set([i.date() for i in timestamps]))
-
     # Crops data to exclude first and last days
-    timestamps = timestamps.loc[(timestamps >= pd.to_datetime(str(dates[1]) + " " + "00:00:00")) &
-                                (timestamps <= pd.to_datetime(str(dates[-1]) + " " + "00:00:00"))]
-    data = data.iloc[timestamps.index[0]:timestamps.index[-1] + 1]
-
-    data = pd.DataFrame(list(zip(timestamps, data)), columns=["Timestamp", "Data"])
-
-    # Boundaries for each epoch (hourly)
-    hours = [i for i in
-             pd.date_range(start=timestamps.iloc[0], end=timestamps.iloc[-1] + timedelta(hours=1), freq="1H")]
-
-    # Calculates hourly average SVM
-    hourly_averages = []
-    for start, stop in zip(hours[:], hours[1:]):
-        d = data.loc[(start <= data["Timestamp"]) & (data["Timestamp"] <= stop)]
-        hourly_averages.append(d["Data"].mean())
-
-    hourly_data = pd.DataFrame(list(zip(hours, hourly_averages, [i.time().hour for i in hours[:-1]])),
-                               columns=["Timestamp", "Average", "Hour"])
+    series = CircadianMetrics.crop_to_whole_days(CircadianMetrics.to_series(timestamps=timestamps, data=data))
 
-    # Equation
-    n = hourly_data.shape[0]  # total number of one-hour epochs
-    p = 24  # number of epochs per day
-    xh = [hourly_data["Average"].loc[hourly_data["Hour"] == i].mean() for i in
-          range(24)]  # Mean of each hour across days
-    xi = hourly_data["Average"]  # Average for each hour (time series)
-    x = xi.mean()  # Mean of all epochs
+    # Hourly averages
+    hourly_data = CircadianMetrics.resample_series(series, resolution="1H")
 
-    numerator = n * sum([(h - x) ** 2 for h in xh])
-    denominator = p * sum([(i - x) ** 2 for i in xi])
+    IS = CircadianMetrics.interday_stability(series=hourly_data, resolution=None)
 
-    IS = numerator / denominator
+    weekly_df = pd.DataFrame({"Timestamp": hourly_data.index, "Average": hourly_data.values})
 
-    weekly_df = pd.DataFrame(list(zip(hours, xi)), columns=["Timestamp", "Average"])
-    hourly_df = pd.DataFrame(list(zip([i for i in range(24)], xh)), columns=["Hour", "Average"])
+    # Mean of each hour across days
+    xh = hourly_data.groupby(hourly_data.index.hour).mean().reindex(range(24))
+    hourly_df = pd.DataFrame({"Hour": xh.index, "Average": xh.values})
 
     return weekly_df, hourly_df, round(IS, 5)
 
@@ -1,21 +1,30 @@
 import ImportEDF
+import EpochData
+import Nonwear
+import SpectralFeatures
+import IntensityClassification
+import RestingHR
+import EpochTable
+import Headless
+import Instrumentation
+from LazyImport import lazy_import
 
-from ecgdetectors import Detectors
-# https://github.com/luishowell/ecg-detectors
-
-from matplotlib import pyplot as plt
 import numpy as np
 import pandas as pd
-import statistics
-import scipy.stats as stats
 from datetime import datetime
-import progressbar
-from matplotlib.ticker import PercentFormatter
 from random import randint
-import matplotlib.dates as mdates
 import scipy.fft
 from scipy.signal import butter, filtfilt
 import random
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+# Plotting, statistics and peak detection packages are imported on first use
+plt = lazy_import("matplotlib.pyplot")
+mdates = lazy_import("matplotlib.dates")
+mticker = lazy_import("matplotlib.ticker")
+stats = lazy_import("scipy.stats")
+ecgdetectors = lazy_import("ecgdetectors")  # https://github.com/luishowell/ecg-detectors
 
 # --------------------------------------------------------------------------------------------------------------------
 # -------------------------------------------------- ECG CLASS OBJECT ------------------------------------------------
@@ -30,7 +39,9 @@ class ECG:
                  rest_hr_window=60, n_epochs_rest=10,
                  epoch_len=15, load_accel=False,
                  filter_data=False, low_f=1, high_f=30, f_type="bandpass",
-                 load_raw=False, from_processed=True):
+                 load_raw=False, from_processed=True,
+                 qc_workers=1, qc_chunk_len=3600, qc_peak_detection="epoch", qc_batch_rules=False,
+                 hrr_cutpoints=IntensityClassification.HRR_CUTPOINTS, instrumentation=None):
         """Class that contains raw and processed ECG data.
 
         :argument
@@ -54,15 +65,29 @@ class ECG:
         -low_f, high_1: cut-off frequencies for the filter. Set to None if irrelevant. In Hz.
         -f_type: type of filter; "lowpass", "highpass", "bandpass"
 
+        QUALITY CHECK
+        -qc_workers: number of processes used to run the quality check. 1 runs in the current process.
+        -qc_chunk_len: length of data sent to each process, seconds. Rounded to a multiple of epoch_len.
+        -qc_peak_detection: "epoch" runs peak detection separately in each epoch; "recording" detects peaks once on
+                            the whole filtered signal (in blocks of qc_chunk_len seconds) and slices them per epoch
+        -qc_batch_rules: if True, rules are checked for all epochs at once with batch_rule_check(). Uses "recording"
+                         peak detection.
+
         OTHER
         -ecg_downsample: ratio by which ECG data are downsampled
         -age: participant age in years. Needed for HRmax calculation.
+        -hrr_cutpoints: dictionary of lower limit of each intensity in %HRR ({"Light": 30, "Moderate": 40,
+                        "Vigorous": 60})
+        -instrumentation: Instrumentation.StageTimer that records time and memory of each stage (e.g. the Subject's).
+                          A new one is created if None.
         """
 
-        print()
-        print("============================================= ECG DATA ==============================================")
+        Headless.report()
+        Headless.report("============================================= ECG DATA "
+                        "==============================================")
 
         self.filepath = filepath
+        self.hrr_cutpoints = hrr_cutpoints
         self.processed_file = processed_file
         self.subject_id = subject_id
         self.output_dir = output_dir
@@ -83,6 +108,14 @@ class ECG:
         self.load_accel = load_accel
         self.from_processed = from_processed
 
+        self.qc_workers = qc_workers
+        self.qc_chunk_len = qc_chunk_len
+        self.qc_peak_detection = qc_peak_detection
+        self.qc_batch_rules = qc_batch_rules
+
+        self.instrumentation = Instrumentation.StageTimer(name=subject_id) if instrumentation is None \
+            else instrumentation
+
         self.accel_sample_rate = 1
         self.accel_x = None
         self.accel_y = None
@@ -94,7 +127,8 @@ class ECG:
         if self.load_raw:
             self.ecg = ImportEDF.Bittium(filepath=self.filepath, load_accel=self.load_accel,
                                          start_offset=self.start_offset, end_offset=self.end_offset,
-                                         low_f=self.low_f, high_f=self.high_f, f_type=self.f_type)
+                                         low_f=self.low_f, high_f=self.high_f, f_type=self.f_type,
+                                         instrumentation=self.instrumentation)
 
             self.sample_rate = self.ecg.sample_rate
             self.accel_sample_rate = self.ecg.accel_sample_rate
@@ -108,8 +142,8 @@ class ECG:
             del self.ecg
 
         if ecg_downsample != 1:
-            print("\n-ECG data will be downsampled by a factor of "
-                  "{} to {}Hz...".format(ecg_downsample, round(self.sample_rate/ecg_downsample, 1)))
+            Headless.report("\n-ECG data will be downsampled by a factor of "
+                            "{} to {}Hz...".format(ecg_downsample, round(self.sample_rate/ecg_downsample, 1)))
             self.sample_rate = int(self.sample_rate / ecg_downsample)
             self.timestamps = self.timestamps[::ecg_downsample]
             self.raw = self.raw[::ecg_downsample]
@@ -122,7 +156,9 @@ class ECG:
         if self.from_processed:
             self.epoch_validity, self.epoch_hr = None, None
         if not self.from_processed:
-            self.epoch_validity, self.epoch_hr, self.avg_voltage, self.rr_sd, self.r_peaks = self.check_quality()
+            self.epoch_validity, self.epoch_hr, self.avg_voltage, self.rr_sd, self.r_peaks = \
+                self.check_quality(n_workers=self.qc_workers, chunk_len=self.qc_chunk_len,
+                                   peak_detection=self.qc_peak_detection, batch_rules=self.qc_batch_rules)
 
         # Loads epoched data from existing file
         if self.from_processed:
@@ -136,31 +172,49 @@ class ECG:
 
         self.rolling_avg_hr = None
         self.rest_hr = None
+        self.rest_hr_daily = None
         self.perc_hrr = None
         self.epoch_intensity = None
         self.epoch_intensity_totals = None
 
         self.nonwear = None
+        self.nonwear_bouts = None
 
+    @Instrumentation.timed(Instrumentation.EPOCH, samples="accel_vm")
     def epoch_accel(self):
 
-        for i in range(0, len(self.accel_vm), int(self.accel_sample_rate * self.epoch_len)):
+        epoched = EpochData.epoch_signal(data=self.accel_vm, sample_rate=self.accel_sample_rate,
+                                         epoch_len=self.epoch_len)
 
-            if i + self.epoch_len * self.accel_sample_rate > len(self.accel_vm):
-                break
-
-            vm_sum = sum(self.accel_vm[i:i + self.epoch_len * self.accel_sample_rate])
+        self.svm = [i for i in np.round(epoched["Sum"], 5)]
 
-            self.svm.append(round(vm_sum, 5))
-
-    def check_quality(self):
+    @Instrumentation.timed(Instrumentation.QC, samples="raw")
+    def check_quality(self, n_workers=None, chunk_len=None, peak_detection=None, batch_rules=None):
         """Performs quality check using Orphanidou et al. (2015) algorithm that has been tweaked to factor in voltage
            range as well.
 
-           This function runs a loop that creates object from the class CheckQuality for each epoch in the raw data.
+           The data is split into chunks of whole epochs. Each chunk runs a loop that creates object from the class
+           CheckQuality for each epoch. Chunks are processed in parallel if n_workers > 1 and merged in order so
+           results are identical to running in a single process.
+
+        :argument
+        -n_workers: number of processes. Defaults to self.qc_workers
+        -chunk_len: seconds of data per chunk. Defaults to self.qc_chunk_len
+        -peak_detection: "epoch" or "recording". Defaults to self.qc_peak_detection
+        -batch_rules: runs batch_rule_check() instead of CheckQuality. Defaults to self.qc_batch_rules
         """
 
-        print("\n" + "Running quality check with Orphanidou et al. (2015) algorithm...")
+        n_workers = self.qc_workers if n_workers is None else n_workers
+        chunk_len = self.qc_chunk_len if chunk_len is None else chunk_len
+        peak_detection = self.qc_peak_detection if peak_detection is None else peak_detection
+        batch_rules = self.qc_batch_rules if batch_rules is None else batch_rules
+
+        # Batch rule check needs peaks for all epochs before it runs
+        if batch_rules:
+            peak_detection = "recording"
+
+        Headless.report("\n" + "Running quality check with Orphanidou et al. (2015) algorithm "
+                               "({} process{})...".format(n_workers, "es" if n_workers > 1 else ""))
 
         t0 = datetime.now()
 
@@ -170,34 +224,52 @@ class ECG:
         rr_sd = []  # window's RR SD
         r_peaks = []  # all R peak indexes
 
-        for start_index in range(0, int(len(self.raw)), self.epoch_len * self.sample_rate):
+        # Chunk length rounded to whole epochs so epochs line up with single-process version
+        epoch_samples = int(self.epoch_len * self.sample_rate)
+        chunk_samples = max(int(chunk_len / self.epoch_len), 1) * epoch_samples
+
+        chunk_starts = [i for i in range(0, len(self.raw), chunk_samples)]
 
-            qc = CheckQuality(ecg_object=self, start_index=start_index, epoch_len=self.epoch_len)
+        # Detects all peaks once; overlapping blocks avoid edge artefacts at block boundaries
+        all_peaks = None
+        if peak_detection == "recording":
+            peak_detector = DetectAllPeaks(data=self.filtered, sample_rate=self.sample_rate, algorithm="wavelet")
+            peak_detector.detect_peaks(block_len=chunk_samples / self.sample_rate)
+            all_peaks = peak_detector.r_peaks
 
-            avg_voltage.append(qc.volt_range)
+        if n_workers <= 1 or len(chunk_starts) == 1:
+            results = [check_quality_chunk(ecg_object=self, chunk_start=0, epoch_len=self.epoch_len,
+                                           r_peaks=all_peaks, batch_rules=batch_rules)]
 
-            if qc.valid_period:
-                validity_list.append("Valid")
-                epoch_hr.append(round(qc.hr, 2))
-                rr_sd.append(qc.rr_sd)
+        if n_workers > 1 and len(chunk_starts) > 1:
+            segments = [ECGSegment(ecg_object=self, start_index=i, end_index=i + chunk_samples)
+                        for i in chunk_starts]
 
-                for peak in qc.r_peaks_index_all:
-                    r_peaks.append(peak)
-                for peak in qc.removed_peak:
-                    r_peaks.append(peak + start_index)
+            chunk_peaks = [None] * len(chunk_starts)
+            if all_peaks is not None:
+                bounds = np.searchsorted(all_peaks, chunk_starts + [len(self.raw)])
+                chunk_peaks = [all_peaks[bounds[i]:bounds[i + 1]] - chunk_starts[i] for i in range(len(chunk_starts))]
 
-                r_peaks = sorted(r_peaks)
+            # map() returns results in order of submission
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = list(executor.map(check_quality_chunk, segments, chunk_starts,
+                                            [self.epoch_len] * len(chunk_starts), chunk_peaks,
+                                            [batch_rules] * len(chunk_starts)))
 
-            if not qc.valid_period:
-                validity_list.append("Invalid")
-                epoch_hr.append(0)
-                rr_sd.append(0)
+        for result in results:
+            validity_list += result["Validity"]
+            epoch_hr += result["HR"]
+            avg_voltage += result["Voltage Range"]
+            rr_sd += result["RR SD"]
+            r_peaks += result["R Peaks"]
+
+        r_peaks = sorted(r_peaks)
 
         t1 = datetime.now()
-        proc_time = (t1 - t0).seconds
-        print("\n" + "Quality check complete ({} seconds).".format(round(proc_time, 2)))
-        print("-Processing time of {} seconds per "
-              "hour of data.".format(round(proc_time / (len(self.raw)/self.sample_rate/3600)), 2))
+        proc_time = (t1 - t0).total_seconds()
+        Headless.report("\n" + "Quality check complete ({} seconds).".format(round(proc_time, 2)))
+        Headless.report("-Processing time of {} seconds per "
+                        "hour of data.".format(round(proc_time / (len(self.raw)/self.sample_rate/3600)), 2))
 
         return validity_list, epoch_hr, avg_voltage, rr_sd, r_peaks
 
@@ -212,25 +284,30 @@ class ECG:
                           "Percent invalid": perc_invalid,
                           "Average valid duration (minutes)": None}
 
-        print("-{}% of the data is valid.".format(round(100 - perc_invalid), 3))
+        Headless.report("-{}% of the data is valid.".format(round(100 - perc_invalid), 3))
 
         return quality_report
 
+    @Instrumentation.timed(Instrumentation.IMPORT, samples="epoch_hr")
     def load_processed(self):
 
-        df = pd.read_csv(self.processed_file)
+        df = EpochTable.read_epoch_file(self.processed_file, columns=["Timestamps", "ECG_Validity", "HR"],
+                                        schema=EpochTable.SUBJECT_SCHEMA)
 
-        self.epoch_timestamps = [i for i in pd.to_datetime(df["Timestamps"])]
-        self.epoch_validity = [i for i in df["ECG_Validity"]]
-        self.epoch_hr = [i for i in df["HR"]]
+        self.epoch_timestamps = df["Timestamps"].tolist()
+        self.epoch_validity = df["ECG_Validity"].tolist()
+        self.epoch_hr = df["HR"].tolist()
 
-    def find_resting_hr(self, window_size, n_windows, sleep_status=None, start_index=None, end_index=None):
-        """Function that calculates resting HR based on inputs.
+    @Instrumentation.timed(Instrumentation.MODELS, samples="valid_hr")
+    def find_resting_hr(self, window_size, n_windows, sleep_status=None, start_index=None, end_index=None,
+                        per_day=False):
+        """Function that calculates resting HR based on inputs. See RestingHR.resting_hr().
 
         :argument
         -window_size: size of window over which rolling average is calculated, seconds
         -n_windows: number of epochs over which resting HR is averaged (lowest n_windows number of epochs)
         -sleep_status: data from class Sleep that corresponds to asleep/awake epochs
+        -per_day: boolean; also calculates resting HR for each day (stored in self.rest_hr_daily)
         """
 
         if start_index is not None and end_index is not None:
@@ -238,52 +315,35 @@ class ECG:
         else:
             epoch_hr = self.epoch_hr
 
-        # Sets integer for window length based on window_size and epoch_len
-        window_len = int(window_size / self.epoch_len)
+        rest_hr = RestingHR.resting_hr(epoch_hr=epoch_hr, epoch_len=self.epoch_len, window_size=window_size,
+                                       n_windows=n_windows, sleep_status=sleep_status,
+                                       timestamps=self.epoch_timestamps[start_index:end_index] if per_day else None)
 
-        try:
-            rolling_avg = [statistics.mean(epoch_hr[i:i + window_len]) if 0 not in epoch_hr[i:i + window_len]
-                           else None for i in range(len(epoch_hr))]
-        except statistics.StatisticsError:
-            print("No data points found.")
-            rolling_avg = []
+        rolling_avg = [None if np.isnan(i) else i for i in rest_hr["Rolling HR"]]
+        resting_hr = "N/A" if np.isnan(rest_hr["Resting HR"]) else round(rest_hr["Resting HR"], 1)
+
+        if per_day:
+            self.rest_hr_daily = rest_hr["Daily"]
 
         # Calculates resting HR during waking hours if sleep_log available --------------------------------------------
         if sleep_status is not None:
-            print("\n" + "Calculating resting HR from periods of wakefulness...")
-
-            awake_hr = [rolling_avg[i] for i in range(0, min([len(sleep_status), len(rolling_avg)]))
-                        if sleep_status[i] == 0 and rolling_avg[i] is not None]
+            Headless.report("\n" + "Calculating resting HR from periods of wakefulness...")
 
-            sorted_hr = sorted(awake_hr)
+            awake_hr = [i for i in rest_hr["Rolling HR"][rest_hr["Used"]]]
 
-            if len(sorted_hr) < n_windows:
-                resting_hr = "N/A"
-
-            if len(sorted_hr) >= n_windows:
-                resting_hr = round(sum(sorted_hr[0:n_windows]) / n_windows, 1)
-
-            print("Resting HR (average of {} lowest {}-second periods while awake) is {} bpm.".format(n_windows,
-                                                                                                      window_size,
-                                                                                                      resting_hr))
+            Headless.report("Resting HR (average of {} lowest {}-second periods while awake) is {} "
+                            "bpm.".format(n_windows, window_size, resting_hr))
 
         # Calculates resting HR during all hours if sleep_log not available -------------------------------------------
         if sleep_status is None:
-            # print("\n" + "Calculating resting HR from periods of all data (sleep data not available)...")
-
             awake_hr = None
 
-            valid_hr = [i for i in rolling_avg if i is not None]
-
-            sorted_hr = sorted(valid_hr)
-
-            resting_hr = round(sum(sorted_hr[:n_windows]) / n_windows, 1)
-
-            print("Resting HR (sleep not removed; average of {} lowest "
-                  "{}-second periods) is {} bpm.".format(n_windows, window_size, resting_hr))
+            Headless.report("Resting HR (sleep not removed; average of {} lowest "
+                            "{}-second periods) is {} bpm.".format(n_windows, window_size, resting_hr))
 
         return rolling_avg, resting_hr, awake_hr
 
+    @Instrumentation.timed(Instrumentation.MODELS, samples="valid_hr")
     def calculate_percent_hrr(self):
         """Calculates HR as percent of heart rate reserve using resting heart rate and predicted HR max using the
            equation from Tanaka et al. (2001).
@@ -292,22 +352,13 @@ class ECG:
 
         hr_max = 208 - 0.7 * self.age
 
-        perc_hrr = [round(100 * (hr - self.rest_hr) / (hr_max - self.rest_hr), 2) if hr
-                    is not None else None for hr in self.valid_hr]
+        hr = IntensityClassification.to_array(self.valid_hr)
 
         # A single epoch's HR can be below resting HR based on how it's defined
         # Changes any negative values to 0, maintains Nones and positive values
-        # Can't figure out how to do this as a list comprehension - don't judge
-        perc_hrr_final = []
-
-        for i in perc_hrr:
-            if i is not None:
-                if i >= 0:
-                    perc_hrr_final.append(i)
-                if i < 0:
-                    perc_hrr_final.append(0)
-            if i is None:
-                perc_hrr_final.append(None)
+        perc_hrr = np.clip(np.round(100 * (hr - self.rest_hr) / (hr_max - self.rest_hr), 2), 0, None)
+
+        perc_hrr_final = [None if np.isnan(i) else float(i) for i in perc_hrr]
 
         return perc_hrr_final
 
@@ -330,6 +381,7 @@ class ECG:
 
         return hr
 
+    @Instrumentation.timed(Instrumentation.MODELS, samples="valid_hr")
     def calculate_intensity(self):
         """Calculates intensity category based on %HRR ranges.
            Sums values to determine total time spent in each category.
@@ -341,22 +393,9 @@ class ECG:
 
         # INTENSITIY DEFINITIONS
         # Sedentary = %HRR < 30, light = 30 < %HRR <= 40, moderate = 40 < %HRR <= 60, vigorous = %HRR >= 60
+        categories = IntensityClassification.classify(values=self.perc_hrr, cutpoints=self.hrr_cutpoints)
 
-        intensity = []
-
-        for hrr in self.perc_hrr:
-            if hrr is None:
-                intensity.append(None)
-
-            if hrr is not None:
-                if hrr < 30:
-                    intensity.append(0)
-                if 30 <= hrr < 40:
-                    intensity.append(1)
-                if 40 <= hrr < 60:
-                    intensity.append(2)
-                if hrr >= 60:
-                    intensity.append(3)
+        intensity = IntensityClassification.to_list(categories)
 
         n_valid_epochs = len(self.valid_hr) - self.quality_report["Invalid epochs"]
 
@@ -364,27 +403,10 @@ class ECG:
             n_valid_epochs = len(self.valid_hr)
 
         # Calculates time spent in each intensity category
-        intensity_totals = {"Sedentary": intensity.count(0) / (60 / self.epoch_len),
-                            "Sedentary%": round(intensity.count(0) / n_valid_epochs, 3),
-                            "Light": intensity.count(1) / (60 / self.epoch_len),
-                            "Light%": round(intensity.count(1) / n_valid_epochs, 3),
-                            "Moderate": intensity.count(2) / (60 / self.epoch_len),
-                            "Moderate%": round(intensity.count(2) / n_valid_epochs, 3),
-                            "Vigorous": intensity.count(3) / (60 / self.epoch_len),
-                            "Vigorous%": round(intensity.count(3) / n_valid_epochs, 3)}
-
-        print("\n" + "HEART RATE MODEL SUMMARY")
-        print("Sedentary: {} minutes ({}%)".format(intensity_totals["Sedentary"],
-                                                   round(intensity_totals["Sedentary%"] * 100, 3)))
-
-        print("Light: {} minutes ({}%)".format(intensity_totals["Light"],
-                                               round(intensity_totals["Light%"] * 100, 3)))
-
-        print("Moderate: {} minutes ({}%)".format(intensity_totals["Moderate"],
-                                                  round(intensity_totals["Moderate%"] * 100, 3)))
+        intensity_totals = IntensityClassification.intensity_totals(categories=categories, epoch_len=self.epoch_len,
+                                                                    n_epochs=n_valid_epochs)
 
-        print("Vigorous: {} minutes ({}%)".format(intensity_totals["Vigorous"],
-                                                  round(intensity_totals["Vigorous%"] * 100, 3)))
+        IntensityClassification.print_totals(title="HEART RATE MODEL SUMMARY", totals=intensity_totals)
 
         return intensity, intensity_totals
 
@@ -406,7 +428,7 @@ class ECG:
         plt.axvline(x=self.rest_hr, color='green', linestyle='dashed',
                     label='Calculated resting HR ({} bpm)'.format(round(self.rest_hr, 1)))
 
-        plt.gca().yaxis.set_major_formatter(PercentFormatter(1))
+        plt.gca().yaxis.set_major_formatter(mticker.PercentFormatter(1))
 
         plt.ylabel("% of Epochs")
         plt.xlabel("HR (bpm)")
@@ -430,7 +452,7 @@ class ECG:
         # Rounds random start to an index that corresponds to start of an epoch
         start_index -= start_index % (self.epoch_len * self.sample_rate)
 
-        print("\n" + "Index {}.".format(start_index))
+        Headless.report("\n" + "Index {}.".format(start_index))
 
         # End index: one epoch
         end_index = start_index + self.epoch_len * self.sample_rate
@@ -442,24 +464,26 @@ class ECG:
         validity_data = CheckQuality(ecg_object=self, start_index=start_index,
                                      epoch_len=self.epoch_len, template_data=template_data)
 
-        print()
-        print("Valid HR: {} (passed {}/5 conditions)".format(validity_data.rule_check_dict["Valid Period"],
-                                                             validity_data.rule_check_dict["HR Valid"] +
-                                                             validity_data.rule_check_dict["Max RR Interval Valid"] +
-                                                             validity_data.rule_check_dict["RR Ratio Valid"] +
-                                                             validity_data.rule_check_dict["Voltage Range Valid"] +
-                                                             validity_data.rule_check_dict["Correlation Valid"]))
-
-        print("-HR range ({} bpm): {}".format(validity_data.rule_check_dict["HR"],
-                                              validity_data.rule_check_dict["HR Valid"]))
-        print("-Max RR interval ({} sec): {}".format(validity_data.rule_check_dict["Max RR Interval"],
-                                                     validity_data.rule_check_dict["Max RR Interval Valid"]))
-        print("-RR ratio ({}): {}".format(validity_data.rule_check_dict["RR Ratio"],
-                                          validity_data.rule_check_dict["RR Ratio Valid"]))
-        print("-Voltage range ({} uV): {}".format(validity_data.rule_check_dict["Voltage Range"],
-                                                  validity_data.rule_check_dict["Voltage Range Valid"]))
-        print("-Correlation (r={}): {}".format(validity_data.rule_check_dict["Correlation"],
-                                               validity_data.rule_check_dict["Correlation Valid"]))
+        Headless.report()
+        n_passed = validity_data.rule_check_dict["HR Valid"] + \
+            validity_data.rule_check_dict["Max RR Interval Valid"] + \
+            validity_data.rule_check_dict["RR Ratio Valid"] + \
+            validity_data.rule_check_dict["Voltage Range Valid"] + \
+            validity_data.rule_check_dict["Correlation Valid"]
+
+        Headless.report("Valid HR: {} (passed {}/5 conditions)".format(validity_data.rule_check_dict["Valid Period"],
+                                                                       n_passed))
+
+        Headless.report("-HR range ({} bpm): {}".format(validity_data.rule_check_dict["HR"],
+                                                        validity_data.rule_check_dict["HR Valid"]))
+        Headless.report("-Max RR interval ({} sec): {}".format(validity_data.rule_check_dict["Max RR Interval"],
+                                                               validity_data.rule_check_dict["Max RR Interval Valid"]))
+        Headless.report("-RR ratio ({}): {}".format(validity_data.rule_check_dict["RR Ratio"],
+                                                    validity_data.rule_check_dict["RR Ratio Valid"]))
+        Headless.report("-Voltage range ({} uV): {}".format(validity_data.rule_check_dict["Voltage Range"],
+                                                            validity_data.rule_check_dict["Voltage Range Valid"]))
+        Headless.report("-Correlation (r={}): {}".format(validity_data.rule_check_dict["Correlation"],
+                                                         validity_data.rule_check_dict["Correlation Valid"]))
 
         # Plot
 
@@ -529,7 +553,7 @@ class ECG:
 
         xf = np.linspace(0.0, 1.0 / (2.0 * (1 / self.sample_rate)), (seg_length * self.sample_rate) // 2)
 
-        if show_plot:
+        if show_plot and Headless.plots_enabled():
             fig, (ax1, ax2) = plt.subplots(2, figsize=(10, 8))
             plt.suptitle("Index = {}".format(start))
             plt.subplots_adjust(hspace=.35)
@@ -563,48 +587,36 @@ class ECG:
 
         return df_raw_fft, cutoff_freq
 
+    @Instrumentation.timed(Instrumentation.NONWEAR, samples="epoch_timestamps")
     def calculate_nonwear(self, epoch_len=15, plot_data=True):
 
         def find_nonwear():
             # First accel check: SD and range below threshold calculations -------------------------------------------
-            print("\nPerforming non-wear detection algorithm...")
-
-            accel_nw = []
-
-            for i in np.arange(0, len(self.accel_x), self.accel_sample_rate * epoch_len):
-                sd_x = np.std(self.accel_x[i:i + self.accel_sample_rate * epoch_len])
-                sd_y = np.std(self.accel_y[i:i + self.accel_sample_rate * epoch_len])
-                sd_z = np.std(self.accel_z[i:i + self.accel_sample_rate * epoch_len])
-
-                axes_below_thresh = int(sd_x <= 3) + int(sd_y <= 3) + int(sd_z <= 3)
-
-                range_x = max(self.accel_x[i:i + self.accel_sample_rate * epoch_len]) - \
-                          min(self.accel_x[i:i + self.accel_sample_rate * epoch_len])
-                range_y = max(self.accel_y[i:i + self.accel_sample_rate * epoch_len]) - \
-                          min(self.accel_y[i:i + self.accel_sample_rate * epoch_len])
-                range_z = max(self.accel_z[i:i + self.accel_sample_rate * epoch_len]) - \
-                          min(self.accel_z[i:i + self.accel_sample_rate * epoch_len])
+            Headless.report("\nPerforming non-wear detection algorithm...")
 
-                axes_below_range = int(range_x <= 50) + int(range_y <= 50) + int(range_z <= 50)
+            accel_features = Nonwear.accel_epoch_features(x=self.accel_x, y=self.accel_y, z=self.accel_z,
+                                                          sample_rate=self.accel_sample_rate, epoch_len=epoch_len)
 
-                if axes_below_range >= 2 or axes_below_thresh >= 2:
-                    accel_nw.append("Nonwear")
-                else:
-                    accel_nw.append("Wear")
+            accel_nw = Nonwear.accel_nonwear_epochs(features=accel_features, sd_thresh=3, range_thresh=50, n_axes=2)
+            accel_nw = ["Nonwear" if i else "Wear" for i in accel_nw]
 
             # Combines accelerometer and ECG non-wear characteristics: epoch-by-epoch ---------------------------------
             df_ecg = pd.DataFrame(list(zip(self.epoch_timestamps, self.epoch_validity,
                                            self.avg_voltage, self.svm, accel_nw)),
                                   columns=["Stamp", "Validity", "VoltRange", "SVM", "AccelNW"])
 
+            # Frequency of 90% cumulative FFT power for every epoch (0 for flat signal)
+            spectral = SpectralFeatures.spectral_features(data=self.raw, sample_rate=self.sample_rate,
+                                                          epoch_len=epoch_len, percent=90)
+            power_cutoffs = np.nan_to_num(np.round(spectral["Cutoff F"], 1), nan=0)
+
             nw = []
             for epoch in df_ecg.itertuples():
                 if epoch.Validity == "Invalid" and epoch.AccelNW == "Nonwear" and epoch.VoltRange <= 400:
 
                     # Confirms using FFT that it's a non-wear period
                     # Gets confused with bad ECG signal during sleep sometimes
-                    fft, power_cutoff = self.run_ecg_fft(start=epoch.Index * self.epoch_len * self.sample_rate,
-                                                         seg_length=epoch_len, show_plot=False)
+                    power_cutoff = power_cutoffs[epoch.Index] if epoch.Index < len(power_cutoffs) else 0
 
                     if power_cutoff >= 50:
                         nw.append("Nonwear")
@@ -615,29 +627,12 @@ class ECG:
 
             # 5-minute windows ----------------------------------------------------------------------------------------
             t0 = datetime.now()
-            final_nw = np.zeros(len(nw))
-            for i in range(len(nw)):
-
-                if final_nw[i] == "Wear" or final_nw[i] == "Nonwear":
-                    pass
-
-                if nw[i:i + 20].count("Nonwear") >= 19:
-                    final_nw[i:i + 20] = 1
-
-                    for j in range(i, len(nw)):
-                        if nw[j] == "Nonwear":
-                            pass
-                        if nw[j] == "Wear":
-                            stop_ind = j
-                            if j > i:
-                                final_nw[i:stop_ind] = 1
-
-                else:
-                    final_nw[i] = 0
+            final_nw = Nonwear.window_nonwear(epoch_nonwear=np.array(nw) == "Nonwear",
+                                              n_epochs=20, n_epochs_thresh=19, end_gap=1)
 
             final_nw = ["Nonwear" if i == 1 else "Wear" for i in final_nw]
             t1 = datetime.now()
-            print("Algorithm time = {} seconds.".format(round((t1 - t0).total_seconds(), 1)))
+            Headless.report("Algorithm time = {} seconds.".format(round((t1 - t0).total_seconds(), 1)))
 
             return final_nw
 
@@ -645,12 +640,17 @@ class ECG:
             final_nw = find_nonwear()
 
         if self.nonwear is not None:
-            print("Data already exists. Using previous data.")
+            Headless.report("Data already exists. Using previous data.")
             final_nw = self.nonwear
 
-        if plot_data:
+        # One row per non-wear period
+        self.nonwear_bouts = Nonwear.find_bouts(status=np.array(final_nw) == "Nonwear",
+                                                timestamps=self.epoch_timestamps[:len(final_nw)])
 
-            print("Generating plot...")
+        # No figure (or manual log read) in headless mode
+        if plot_data and Headless.plots_enabled():
+
+            Headless.report("Generating plot...")
 
             manual_log = pd.read_excel("/Users/kyleweber/Desktop/ECG Non-Wear/OND07_VisuallyInspectedECG_Nonwear.xlsx")
             manual_log = manual_log.loc[manual_log["ID"] == self.subject_id]
@@ -698,22 +698,54 @@ class DetectAllPeaks:
         self.sample_rate = sample_rate
         self.data = data
 
-    def detect_peaks(self):
+    def detect_peaks(self, block_len=None, overlap=5):
+        """Runs peak detection on entire dataset.
+
+        :argument
+        -block_len: if None, runs detection on all data at once. Otherwise, runs detection on blocks of block_len
+                    seconds to limit memory use. Only the R peak indexes are kept in block mode.
+        -overlap: seconds of data added on each side of a block so peaks near block edges are detected properly.
+                  Each peak is kept only by the block whose non-overlapping section contains it.
+        """
+
         t0 = datetime.now()
-        print("\nRunning {} peak detection on entire dataset. Please wait a while...".format(self.algorithm))
+        Headless.report("\nRunning {} peak detection on entire dataset. Please wait a while...".format(self.algorithm))
+
+        detectors = ecgdetectors.Detectors(self.sample_rate)
+
+        if block_len is None:
+            if self.algorithm == "wavelet":
+                self.r_peaks, self.filtered, self.filt_squared = detectors.swt_detector(unfiltered_ecg=self.data)
+
+            if self.algorithm == "Hamilton":
+                self.r_peaks, self.filtered = detectors.hamilton_detector(unfiltered_ecg=self.data)
+
+        if block_len is not None:
+            block_samples = int(block_len * self.sample_rate)
+            overlap_samples = int(overlap * self.sample_rate)
+
+            r_peaks = []
 
-        detectors = Detectors(self.sample_rate)
+            for block_start in range(0, len(self.data), block_samples):
+                data_start = max(block_start - overlap_samples, 0)
+                data_end = min(block_start + block_samples + overlap_samples, len(self.data))
 
-        if self.algorithm == "wavelet":
-            self.r_peaks, self.filtered, self.filt_squared = detectors.swt_detector(unfiltered_ecg=self.data)
+                if self.algorithm == "wavelet":
+                    peaks = detectors.swt_detector(unfiltered_ecg=self.data[data_start:data_end])[0]
 
-        if self.algorithm == "Hamilton":
-            self.r_peaks, self.filtered = detectors.hamilton_detector(unfiltered_ecg=self.data)
+                if self.algorithm == "Hamilton":
+                    peaks = detectors.hamilton_detector(unfiltered_ecg=self.data[data_start:data_end])[0]
+
+                peaks = np.asarray(peaks, dtype="int64") + data_start
+
+                r_peaks.append(peaks[(peaks >= block_start) & (peaks < block_start + block_samples)])
+
+            self.r_peaks = np.concatenate(r_peaks) if len(r_peaks) > 0 else np.zeros(0, dtype="int64")
 
         t1 = datetime.now()
-        proc_time = round((t1-t0).seconds, 1)
+        proc_time = round((t1 - t0).total_seconds(), 1)
 
-        print("Complete. Took {} seconds.".format(proc_time))
+        Headless.report("Complete. Took {} seconds.".format(proc_time))
 
     def plot_all_peaks(self, downsample_ratio=3):
 
@@ -736,7 +768,8 @@ class CheckQuality:
        19(3). 832-838.
     """
 
-    def __init__(self, ecg_object, start_index, template_data='filtered', voltage_thresh=250, epoch_len=15):
+    def __init__(self, ecg_object, start_index, template_data='filtered', voltage_thresh=250, epoch_len=15,
+                 r_peaks=None):
         """Initialization method.
 
         :param
@@ -745,6 +778,8 @@ class CheckQuality:
                       Takes priority over start_index.
         -start_index: index for windowing data; 0 by default
         -epoch_len: window length in seconds over which algorithm is run; 15 seconds by default
+        -r_peaks: R peak indexes already detected for this window (relative to start_index). If None, peak detection
+                  is run on the window. Wavelet data is not available for plot_steps() if r_peaks are given.
         """
 
         self.voltage_thresh = voltage_thresh
@@ -771,6 +806,7 @@ class CheckQuality:
                                 "Accel Counts": None}
 
         # prep_data parameters
+        self.precomputed_peaks = r_peaks
         self.r_peaks = None
         self.r_peaks_index_all = None
         self.rr_sd = None
@@ -826,12 +862,17 @@ class CheckQuality:
         -Determines if there are enough beats in the window to indicate a possible valid period
         """
 
-        # Initializes Detectors class instance with sample rate
-        detectors = Detectors(self.fs)
+        # Uses peaks detected on whole recording if given ------------------------------------------------------------
+        if self.precomputed_peaks is not None:
+            self.r_peaks = [int(i) for i in self.precomputed_peaks]
+
+        if self.precomputed_peaks is None:
+            # Initializes Detectors class instance with sample rate
+            detectors = ecgdetectors.Detectors(self.fs)
 
-        # Runs peak detection on raw data ----------------------------------------------------------------------------
-        # Uses ecgdetectors package -> stationary wavelet transformation + Pan-Tompkins peak detection algorithm
-        self.r_peaks, self.wavelet, self.filt_squared = detectors.swt_detector(unfiltered_ecg=self.filt_data)
+            # Runs peak detection on raw data ------------------------------------------------------------------------
+            # Uses ecgdetectors package -> stationary wavelet transformation + Pan-Tompkins peak detection algorithm
+            self.r_peaks, self.wavelet, self.filt_squared = detectors.swt_detector(unfiltered_ecg=self.filt_data)
 
         # Checks to see if there are enough potential peaks to correspond to correct HR range ------------------------
         # Requires number of beats in window that corresponds to ~40 bpm to continue
@@ -921,7 +962,7 @@ class CheckQuality:
         try:
             self.average_qrs = np.mean(self.ecg_windowed, axis=0)
         except ValueError:
-            print("Failed to calculate mean QRS template.")
+            Headless.report("Failed to calculate mean QRS template.")
 
     def calculate_correlation(self):
         """Method that runs a correlation analysis for each beat and the average QRS template.
@@ -1056,6 +1097,340 @@ class CheckQuality:
         ax4.legend()
 
 
+# --------------------------------------------------------------------------------------------------------------------
+# -------------------------------------------------- Batch Quality Check ---------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+
+
+def batch_rule_check(ecg_object, start_indexes, r_peaks, epoch_len=15, template_data="filtered", voltage_thresh=250,
+                     batch_size=100):
+    """Vectorized version of CheckQuality's prep_data, adaptive_filter, calculate_correlation and apply_rules for
+       many epochs at once. R peaks must already be detected (see DetectAllPeaks). Epochs are processed in batches of
+       batch_size using padded arrays.
+
+       Reproduces CheckQuality's peak removal behaviour (peaks near window edges, RR interval removal, omitted first
+       beat window and removal of final beat window). Beat windows that run past the edges of the epoch are excluded
+       from the QRS template instead of raising an error.
+
+    :argument
+    -ecg_object: ECG or ECGSegment instance
+    -start_indexes: start index of each epoch
+    -r_peaks: list of arrays of R peak indexes for each epoch (relative to that epoch's start index)
+    -epoch_len: window length in seconds
+    -template_data: "filtered" or "raw"; data used for QRS template
+    -voltage_thresh: minimum voltage range for valid period
+    -batch_size: number of epochs processed at once; limits memory use
+
+    :returns
+    -dictionary of arrays with the same keys as CheckQuality.rule_check_dict. Values that CheckQuality leaves as None
+     are NaN. Also contains the values used by ECG.check_quality(): "Epoch HR", "Epoch Voltage Range", "RR SD",
+     "R Peaks" and "Removed Peaks" (lists of arrays of indexes relative to ecg_object)
+    """
+
+    results = []
+
+    for batch_start in range(0, len(start_indexes), batch_size):
+        results.append(_rule_check_batch(ecg_object=ecg_object,
+                                         start_indexes=start_indexes[batch_start:batch_start + batch_size],
+                                         r_peaks=r_peaks[batch_start:batch_start + batch_size],
+                                         epoch_len=epoch_len, template_data=template_data,
+                                         voltage_thresh=voltage_thresh))
+
+    if len(results) == 0:
+        results.append(_rule_check_batch(ecg_object=ecg_object, start_indexes=[], r_peaks=[], epoch_len=epoch_len,
+                                         template_data=template_data, voltage_thresh=voltage_thresh))
+
+    rule_check = {}
+
+    for key in results[0].keys():
+        if key in ["R Peaks", "Removed Peaks"]:
+            rule_check[key] = [peaks for result in results for peaks in result[key]]
+        else:
+            rule_check[key] = np.concatenate([result[key] for result in results])
+
+    return rule_check
+
+
+def _round(values, decimals):
+    """Rounds each value with round() so results match CheckQuality exactly (np.round differs at some halves)."""
+
+    return np.array([round(float(i), decimals) for i in values])
+
+
+def _rule_check_batch(ecg_object, start_indexes, r_peaks, epoch_len, template_data, voltage_thresh):
+    """Runs the Orphanidou rules for one batch of epochs. Called by batch_rule_check()."""
+
+    fs = ecg_object.sample_rate
+    epoch_samples = int(epoch_len * fs)
+    starts = np.asarray(start_indexes, dtype="int64")
+    n_epochs = len(starts)
+
+    signal = ecg_object.raw if template_data == "raw" else ecg_object.filtered
+
+    # Data length in each epoch (final epoch can be short)
+    data_len = np.clip(len(ecg_object.raw) - starts, 0, epoch_samples)
+
+    # Padded array of R peaks ------------------------------------------------------------------------------------
+    n_peaks = np.array([len(p) for p in r_peaks], dtype="int64")
+    max_peaks = max(int(n_peaks.max()) if n_epochs > 0 else 0, 2)
+    col = np.arange(max_peaks)[None, :]
+
+    peaks = np.zeros((n_epochs, max_peaks), dtype="int64")
+    peak_mask = col < n_peaks[:, None]
+    if n_epochs > 0:
+        peaks[peak_mask] = np.concatenate([np.asarray(p, dtype="int64") for p in r_peaks])
+
+    # Enough beats check + HR (prep_data) ------------------------------------------------------------------------
+    enough_beats = (n_peaks >= np.floor(40 / 60 * epoch_len)) & (n_peaks >= 2)
+
+    last_peak = peaks[np.arange(n_epochs), np.clip(n_peaks - 1, 0, None)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hr = np.where(enough_beats, 60 * (n_peaks - 1) / ((last_peak - peaks[:, 0]) / fs), 0)
+
+    # RR intervals in seconds
+    delta_rr = np.where(col[:, :-1] < (n_peaks - 1)[:, None], np.diff(peaks, axis=1) / fs, np.nan)
+
+    with np.errstate(invalid="ignore"):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            median_rr = np.nanmedian(delta_rr, axis=1)
+            rr_sd = np.nanstd(delta_rr, axis=1) * 1000
+
+    median_rr = np.where(enough_beats, np.nan_to_num(median_rr) * fs, 0).astype("int64")
+
+    # Peak removal near window edges ---------------------------------------------------------------------------
+    # CheckQuality pops peaks while enumerating the list, so the peak after each removed peak is skipped
+    # Peaks near the start form a prefix of length n_start; peaks near the end form a suffix starting at end_start
+    edge = (median_rr / 2 + 1)[:, None]
+    n_start = ((peaks < edge) & peak_mask).sum(axis=1)
+    end_start = n_peaks - (((epoch_samples - peaks) < edge) & peak_mask).sum(axis=1)
+
+    suffix_start = np.maximum(end_start, n_start + n_start % 2)
+
+    removed = peak_mask & (((col < n_start[:, None]) & (col % 2 == 0)) |
+                           ((col >= suffix_start[:, None]) & ((col - suffix_start[:, None]) % 2 == 0)))
+    removed &= enough_beats[:, None]
+
+    n_removed_start = (n_start + 1) // 2
+    n_removed_end = np.where(suffix_start < n_peaks, (n_peaks - suffix_start + 1) // 2, 0)
+    n_kept = n_peaks - n_removed_start - n_removed_end
+
+    # RR interval removal uses the list indexes at the time each peak was popped
+    rr_col = col[:, :-1]
+    popped_index = (rr_col < n_removed_start[:, None]) | \
+                   ((rr_col >= (suffix_start - n_removed_start)[:, None]) &
+                    (rr_col < (suffix_start - n_removed_start + n_removed_end)[:, None]))
+    rr_mask = np.where(((n_removed_start + n_removed_end) > 0)[:, None],
+                       (rr_col < n_kept[:, None]) & ~popped_index,
+                       rr_col < (n_peaks - 1)[:, None])
+    delta_rr = np.where(rr_mask, delta_rr, np.nan)
+
+    # Voltage range ----------------------------------------------------------------------------------------------
+    sample_col = np.arange(epoch_samples)[None, :]
+    sample_mask = sample_col < data_len[:, None]
+    sample_index = np.clip(starts[:, None] + sample_col, 0, max(len(ecg_object.raw) - 1, 0))
+
+    raw_windows = np.where(sample_mask, np.asarray(ecg_object.raw)[sample_index], np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        volt_range = np.where(enough_beats, np.nanmax(raw_windows, axis=1) - np.nanmin(raw_windows, axis=1), 0)
+
+    # Kept peaks moved to the front of each row
+    order = np.argsort(~(peak_mask & ~removed), axis=1, kind="stable")
+    kept_peaks = np.take_along_axis(peaks, order, axis=1)
+
+    # Adaptive filter: beat windows of +/- median_rr/2 around each peak -------------------------------------------
+    half_window = median_rr // 2
+    window_len = 2 * half_window
+    max_window = max(int(window_len.max()) if n_epochs > 0 else 0, 1)
+
+    beat_start = kept_peaks - half_window[:, None]
+    complete = (beat_start >= 0) & (kept_peaks + half_window[:, None] <= data_len[:, None])
+
+    # First beat window is omitted. If final beat window is incomplete, final peak is removed and the
+    # final two windows are omitted
+    last_complete = complete[np.arange(n_epochs), np.clip(n_kept - 1, 0, None)]
+    n_used = np.where(last_complete, n_kept, n_kept - 2)
+    used = (col >= 1) & (col < n_used[:, None]) & complete
+
+    final_removed = enough_beats & ~last_complete & (n_kept >= 2)
+    n_kept = np.where(final_removed, n_kept - 1, n_kept)
+
+    window_col = np.arange(max_window)[None, None, :]
+    window_mask = used[:, :, None] & (window_col < window_len[:, None, None])
+    window_index = np.clip(starts[:, None, None] + beat_start[:, :, None] + window_col, 0, max(len(signal) - 1, 0))
+
+    beats = np.where(window_mask, np.asarray(signal)[window_index], 0)
+    n_used_windows = used.sum(axis=1)
+
+    # Calculates correlation between each beat window and the average beat window ---------------------------------
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average_qrs = beats.sum(axis=1) / n_used_windows[:, None]
+
+        beat_mean = beats.sum(axis=2, keepdims=True) / window_len[:, None, None]
+        qrs_mean = (average_qrs * (window_col[:, 0] < window_len[:, None])).sum(axis=1) / window_len
+
+        beat_dev = np.where(window_mask, beats - beat_mean, 0)
+        qrs_dev = np.where(window_mask, average_qrs[:, None, :] - qrs_mean[:, None, None], 0)
+
+        r = (beat_dev * qrs_dev).sum(axis=2) / np.sqrt((beat_dev ** 2).sum(axis=2) * (qrs_dev ** 2).sum(axis=2))
+        r = np.clip(np.abs(r), 0, 1)
+
+        average_r = _round(np.where(used, r, 0).sum(axis=1) / n_used_windows, 3)
+
+    # Applies rules ----------------------------------------------------------------------------------------------
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        max_rr = np.nanmax(delta_rr, axis=1)
+        rr_ratio = max_rr / np.nanmin(delta_rr, axis=1)
+
+    with np.errstate(invalid="ignore"):
+        valid_hr = (hr >= 40) & (hr <= 180)
+        valid_rr = max_rr < 3
+        valid_ratio = rr_ratio < 2.5
+        valid_range = volt_range > voltage_thresh
+        valid_corr = average_r >= .66
+
+    valid_period = enough_beats & valid_hr & valid_rr & valid_ratio & valid_range & valid_corr
+
+    # Values are not calculated by CheckQuality if not enough beats
+    def checked(values, fill=np.nan):
+        return np.where(enough_beats, values, fill)
+
+    rule_check = {"Valid Period": valid_period,
+                  "HR Valid": checked(valid_hr, False).astype(bool), "HR": checked(_round(hr, 1)),
+                  "Max RR Interval Valid": checked(valid_rr, False).astype(bool),
+                  "Max RR Interval": checked(_round(max_rr, 1)),
+                  "RR Ratio Valid": checked(valid_ratio, False).astype(bool),
+                  "RR Ratio": checked(_round(rr_ratio, 1)),
+                  "Voltage Range Valid": checked(valid_range, False).astype(bool),
+                  "Voltage Range": checked(_round(volt_range, 1)),
+                  "Correlation Valid": checked(valid_corr, False).astype(bool), "Correlation": checked(average_r)}
+
+    # Accelerometer data -----------------------------------------------------------------------------------------
+    rule_check["Accel Counts"] = np.full(n_epochs, np.nan)
+    rule_check["Accel Flatline"] = np.full(n_epochs, np.nan)
+
+    if ecg_object.load_accel:
+        accel_starts = (starts / (fs / ecg_object.accel_sample_rate)).astype("int64")
+        epoched = [ecg_object.accel_vm[i:i + ecg_object.accel_sample_rate * epoch_len] for i in accel_starts]
+
+        rule_check["Accel Counts"] = checked(np.array([round(sum(i), 2) for i in epoched]))
+        rule_check["Accel Flatline"] = checked(np.array([max(i) - min(i) <= .05 for i in epoched]))
+        rule_check["Accel SD"] = checked(np.array([np.std(i) for i in epoched]))
+
+    # Values used by ECG.check_quality()
+    rule_check["Epoch HR"] = np.where(valid_period, _round(hr, 2), 0)
+    rule_check["Epoch Voltage Range"] = volt_range
+    rule_check["RR SD"] = np.where(valid_period, rr_sd, 0)
+    rule_check["R Peaks"] = [kept_peaks[i, :n_kept[i]] + starts[i] if valid_period[i] else np.zeros(0, dtype="int64")
+                             for i in range(n_epochs)]
+
+    final_peak = kept_peaks[np.arange(n_epochs), np.clip(n_kept, 0, max_peaks - 1)]
+    rule_check["Removed Peaks"] = [np.append(peaks[i][removed[i]], final_peak[i] if final_removed[i] else [])
+                                   .astype("int64") + starts[i] if valid_period[i] else np.zeros(0, dtype="int64")
+                                   for i in range(n_epochs)]
+
+    return rule_check
+
+
+# --------------------------------------------------------------------------------------------------------------------
+# ------------------------------------------------ Parallel Quality Check --------------------------------------------
+# --------------------------------------------------------------------------------------------------------------------
+
+
+class ECGSegment:
+
+    def __init__(self, ecg_object, start_index, end_index):
+        """Lightweight copy of a section of an ECG object that contains only what CheckQuality needs. Sent to worker
+           processes instead of the full ECG object.
+
+        :argument
+        -ecg_object: ECG class instance
+        -start_index, end_index: indexes of ECG data included in segment
+        """
+
+        self.sample_rate = ecg_object.sample_rate
+        self.raw = ecg_object.raw[start_index:end_index]
+        self.filtered = ecg_object.filtered[start_index:end_index]
+
+        self.load_accel = ecg_object.load_accel
+        self.accel_sample_rate = ecg_object.accel_sample_rate
+        self.accel_vm = None
+
+        if self.load_accel:
+            ratio = ecg_object.sample_rate / ecg_object.accel_sample_rate
+            self.accel_vm = ecg_object.accel_vm[int(start_index / ratio):int(end_index / ratio)]
+
+
+def check_quality_chunk(ecg_object, chunk_start, epoch_len, r_peaks=None, batch_rules=False):
+    """Runs CheckQuality on every epoch in ecg_object. Module-level so it can be run by worker processes.
+
+    :argument
+    -ecg_object: ECG or ECGSegment instance
+    -chunk_start: index of ecg_object's first data point in the full recording. Added to R peak indexes.
+    -epoch_len: window length in seconds
+    -r_peaks: sorted array of R peak indexes relative to ecg_object's first data point. If given, each epoch uses
+              its slice of r_peaks instead of running its own peak detection.
+    -batch_rules: if True (and r_peaks given), all epochs are checked at once with batch_rule_check()
+
+    :returns
+    -dictionary of lists with keys "Validity", "HR", "Voltage Range", "RR SD", "R Peaks"
+    """
+
+    results = {"Validity": [], "HR": [], "Voltage Range": [], "RR SD": [], "R Peaks": []}
+
+    epoch_samples = epoch_len * ecg_object.sample_rate
+
+    if batch_rules and r_peaks is not None:
+        start_indexes = np.arange(0, int(len(ecg_object.raw)), epoch_samples)
+
+        # No data in chunk
+        if len(start_indexes) == 0:
+            return results
+
+        bounds = np.searchsorted(r_peaks, np.append(start_indexes, start_indexes[-1] + epoch_samples))
+        epoch_peaks = [r_peaks[bounds[i]:bounds[i + 1]] - start_indexes[i] for i in range(len(start_indexes))]
+
+        rule_check = batch_rule_check(ecg_object=ecg_object, start_indexes=start_indexes, r_peaks=epoch_peaks,
+                                      epoch_len=epoch_len)
+
+        results["Validity"] = ["Valid" if i else "Invalid" for i in rule_check["Valid Period"]]
+        results["HR"] = [i for i in rule_check["Epoch HR"]]
+        results["Voltage Range"] = [i for i in rule_check["Epoch Voltage Range"]]
+        results["RR SD"] = [i for i in rule_check["RR SD"]]
+        results["R Peaks"] = [int(peak) + chunk_start for peaks in rule_check["R Peaks"] + rule_check["Removed Peaks"]
+                              for peak in peaks]
+
+        return results
+
+    for start_index in range(0, int(len(ecg_object.raw)), epoch_samples):
+
+        epoch_peaks = None
+        if r_peaks is not None:
+            peak_start, peak_end = np.searchsorted(r_peaks, [start_index, start_index + epoch_samples])
+            epoch_peaks = r_peaks[peak_start:peak_end] - start_index
+
+        qc = CheckQuality(ecg_object=ecg_object, start_index=start_index, epoch_len=epoch_len, r_peaks=epoch_peaks)
+
+        results["Voltage Range"].append(qc.volt_range)
+
+        if qc.valid_period:
+            results["Validity"].append("Valid")
+            results["HR"].append(round(qc.hr, 2))
+            results["RR SD"].append(qc.rr_sd)
+
+            results["R Peaks"] += [peak + chunk_start for peak in qc.r_peaks_index_all]
+            results["R Peaks"] += [peak + start_index + chunk_start for peak in qc.removed_peak]
+
+        if not qc.valid_period:
+            results["Validity"].append("Invalid")
+            results["HR"].append(0)
+            results["RR SD"].append(0)
+
+    return results
+
+
 # --------------------------------------------------------------------------------------------------------------------
 # ------------------------------------------------------- Running Code -----------------------------------------------
 # --------------------------------------------------------------------------------------------------------------------
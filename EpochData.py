@@ -1,19 +1,241 @@
 from datetime import datetime
-import math
+from datetime import timedelta
+import numpy as np
 import pandas as pd
+import os
+import EpochTable
+import Headless
+
+
+# ====================================================== EPOCHING ====================================================
+def vector_magnitude(x, y, z, remove_gravity=True, absolute=True, decimals=None):
+    """Calculates vector magnitude for triaxial accelerometer data in one vectorized pass.
+
+    :argument
+    -x, y, z: array-like data for each axis, G
+    -remove_gravity: boolean; subtracts 1G from each value
+    -absolute: boolean; returns absolute values (only relevant if remove_gravity is True)
+    -decimals: number of decimals to round to; None for no rounding
+
+    :returns
+    -vm: numpy array
+    """
+
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    z = np.asarray(z, dtype="float64")
+
+    vm = np.sqrt(np.square(x) + np.square(y) + np.square(z))
+
+    if remove_gravity:
+        vm -= 1
+
+        if absolute:
+            np.abs(vm, out=vm)
+
+    if decimals is not None:
+        vm = np.round(vm, decimals)
+
+    return vm
+
+
+def _epoch_boundaries(n_datapoints, samples_per_epoch):
+    """Returns start indexes of all complete epochs. Used when samples_per_epoch is not an integer."""
+
+    n_epochs = int(np.floor(n_datapoints / samples_per_epoch + 1e-9))
+
+    return np.floor(np.arange(n_epochs + 1) * samples_per_epoch + 1e-9).astype("int64")
+
+
+def epoch_signal(data, sample_rate, epoch_len, correct_padding=False):
+    """Epochs a signal into non-overlapping windows of epoch_len seconds. Incomplete epochs at the end of the data
+       are dropped, as in the original loop-based epoching. Uses a reshape when the number of samples per epoch is
+       an integer and np.add.reduceat otherwise, so any epoch length/sample rate combination is supported.
+
+    :argument
+    -data: array-like signal (e.g. vector magnitude, temperature)
+    -sample_rate: sampling frequency of data, Hz
+    -epoch_len: epoch length in seconds
+    -correct_padding: boolean; sets the sum to 0 for epochs where every value is 1. Files that have been combined are
+                      zero-padded and these values become 1 when gravity-subtracted vector magnitude is calculated
+
+    :returns
+    -dictionary with arrays for "Sum", "Mean", "SD", "Min", "Max", "Padded" (epochs corrected for padding),
+     "SumSq" (sum of squares) and "Count" (data points in each epoch)
+    """
+
+    data = np.asarray(data, dtype="float64")
+    samples_per_epoch = sample_rate * epoch_len
+
+    if samples_per_epoch < 1:
+        raise ValueError("Epoch length of {} seconds is shorter than one sample "
+                         "at {} Hz.".format(epoch_len, sample_rate))
+
+    # Integer number of samples per epoch: reshape into 2D array of epochs
+    if float(samples_per_epoch).is_integer():
+        samples_per_epoch = int(samples_per_epoch)
+        n_epochs = len(data) // samples_per_epoch
+
+        epoched = data[:n_epochs * samples_per_epoch].reshape(n_epochs, samples_per_epoch)
+
+        epoch_sum = epoched.sum(axis=1)
+        epoch_sq_sum = np.square(epoched).sum(axis=1)
+        epoch_min = epoched.min(axis=1) if n_epochs > 0 else np.zeros(0)
+        epoch_max = epoched.max(axis=1) if n_epochs > 0 else np.zeros(0)
+        counts = np.full(n_epochs, samples_per_epoch, dtype="int64")
+
+    # Non-integer number of samples per epoch: epoch boundaries are rounded down
+    if not isinstance(samples_per_epoch, int):
+        bounds = _epoch_boundaries(len(data), samples_per_epoch)
+        starts = bounds[:-1]
+        counts = np.diff(bounds)
+
+        if len(starts) > 0:
+            used = data[:bounds[-1]]
+            epoch_sum = np.add.reduceat(used, starts)
+            epoch_sq_sum = np.add.reduceat(np.square(used), starts)
+            epoch_min = np.minimum.reduceat(used, starts)
+            epoch_max = np.maximum.reduceat(used, starts)
+        if len(starts) == 0:
+            epoch_sum, epoch_sq_sum, epoch_min, epoch_max = np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        epoch_mean = epoch_sum / counts
+        epoch_sd = np.sqrt(np.clip(epoch_sq_sum / counts - np.square(epoch_mean), 0, None))
+
+    # Bug handling: zero-padded regions have a gravity-subtracted VM of 1 for every data point
+    padded = (epoch_sum == counts) & (epoch_min == 1) & (epoch_max == 1)
+
+    if correct_padding:
+        epoch_sum = np.where(padded, 0, epoch_sum)
+
+    return {"Sum": epoch_sum, "Mean": epoch_mean, "SD": epoch_sd,
+            "Min": epoch_min, "Max": epoch_max, "Padded": padded,
+            "SumSq": epoch_sq_sum, "Count": counts}
+
+
+class EpochPyramid:
+
+    def __init__(self, data=None, sample_rate=None, start_time=None, base_len=1, filepath=None):
+        """Base aggregates (sum, sum of squares, min, max, count) of a signal for short epochs, calculated once from
+           raw data. Longer epochs (5 s, 15 s, 60 s, hourly, ...) are combined from these without using the raw
+           data again. Either give data and sample_rate, or filepath of a pyramid saved with save().
+
+        :argument
+        -data: array-like signal (e.g. gravity-subtracted vector magnitude)
+        -sample_rate: sampling frequency of data, Hz
+        -start_time: timestamp of first data point
+        -base_len: base epoch length in seconds. Epoch lengths used later must be a multiple of this.
+        -filepath: .npz file written by save()
+        """
+
+        self.base_len = base_len
+
+        # Timestamps from TimeIndex are np.datetime64; converted so epoch timestamps can be built with timedelta
+        self.start_time = None if start_time is None else pd.Timestamp(start_time).to_pydatetime()
+
+        self.sum = None
+        self.sum_sq = None
+        self.min = None
+        self.max = None
+        self.count = None
+
+        if filepath is not None:
+            self.load(filepath)
+
+        if filepath is None and data is not None:
+            base = epoch_signal(data=data, sample_rate=sample_rate, epoch_len=base_len)
+
+            self.sum, self.sum_sq = base["Sum"], base["SumSq"]
+            self.min, self.max, self.count = base["Min"], base["Max"], base["Count"]
+
+    def __len__(self):
+        return 0 if self.sum is None else len(self.sum)
+
+    def get_epochs(self, epoch_len, correct_padding=False):
+        """Combines base epochs into epochs of epoch_len seconds. Incomplete epochs at the end are dropped.
+
+        :argument
+        -epoch_len: epoch length in seconds; multiple of base_len
+        -correct_padding: boolean; sets the sum to 0 for epochs where every value is 1 (see epoch_signal())
+
+        :returns
+        -dictionary with arrays for "Timestamps", "Sum", "Mean", "SD", "Min", "Max", "Count" and "Padded"
+        """
+
+        n_base = epoch_len / self.base_len
+
+        if not float(n_base).is_integer() or n_base < 1:
+            raise ValueError("Epoch length of {} seconds is not a multiple of the "
+                             "{}-second base epochs.".format(epoch_len, self.base_len))
+
+        n_base = int(n_base)
+        n_epochs = len(self) // n_base
+
+        def combine(values, func):
+            return func(values[:n_epochs * n_base].reshape(n_epochs, n_base), axis=1)
+
+        epoch_sum = combine(self.sum, np.sum)
+        epoch_sq_sum = combine(self.sum_sq, np.sum)
+        epoch_min = combine(self.min, np.min) if n_epochs > 0 else np.zeros(0)
+        epoch_max = combine(self.max, np.max) if n_epochs > 0 else np.zeros(0)
+        counts = combine(self.count, np.sum)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            epoch_mean = epoch_sum / counts
+            epoch_sd = np.sqrt(np.clip(epoch_sq_sum / counts - np.square(epoch_mean), 0, None))
+
+        padded = (epoch_sum == counts) & (epoch_min == 1) & (epoch_max == 1)
+
+        if correct_padding:
+            epoch_sum = np.where(padded, 0, epoch_sum)
+
+        timestamps = None
+        if self.start_time is not None:
+            timestamps = [self.start_time + timedelta(seconds=i * epoch_len) for i in range(n_epochs)]
+
+        return {"Timestamps": timestamps, "Sum": epoch_sum, "Mean": epoch_mean, "SD": epoch_sd,
+                "Min": epoch_min, "Max": epoch_max, "Count": counts, "Padded": padded}
+
+    def save(self, filepath):
+        """Writes base aggregates to .npz file."""
+
+        np.savez_compressed(filepath, sum=self.sum, sum_sq=self.sum_sq, min=self.min, max=self.max,
+                            count=self.count, base_len=self.base_len,
+                            start_time="" if self.start_time is None else pd.Timestamp(self.start_time).isoformat())
+
+        Headless.report("-Epoch pyramid saved to {}".format(filepath))
+
+    def load(self, filepath):
+        """Reads base aggregates from .npz file written by save()."""
+
+        with np.load(filepath) as file:
+            self.sum, self.sum_sq = file["sum"], file["sum_sq"]
+            self.min, self.max, self.count = file["min"], file["max"], file["count"]
+            self.base_len = file["base_len"].item()
+
+            start_time = str(file["start_time"])
+            self.start_time = None if start_time == "" else pd.Timestamp(start_time).to_pydatetime()
+
+
+def get_pyramid_filepath(folder, raw_filename):
+    """Filename of a device's epoch pyramid in folder."""
+
+    return os.path.join(folder, os.path.basename(raw_filename).split(".")[0] + "_EpochPyramid.npz")
 
 
 class EpochAccel:
 
     def __init__(self, raw_data=None, raw_filename=None, proc_filepath=None, accel_type=None,
                  remove_baseline=False, from_processed=True,
-                 processed_folder=None, accel_only=False, epoch_len=15):
+                 processed_folder=None, accel_only=False, epoch_len=15, save_pyramid=False):
 
         self.epoch_len = epoch_len
         self.remove_baseline = remove_baseline
         self.from_processed = from_processed
         self.accel_only = accel_only
         self.processed_folder = processed_folder
+        self.save_pyramid = save_pyramid  # writes epoch pyramid to processed_folder when epoching from raw
         self.raw_filename = raw_filename
         self.proc_filepath = proc_filepath
 
@@ -25,6 +247,9 @@ class EpochAccel:
         self.svm = []
         self.timestamps = None
 
+        # 1-second aggregates of vector magnitude; any epoch length can be derived from these
+        self.pyramid = None
+
         # GENEActiv: ankle only
         self.pred_speed = None
         self.pred_mets = None
@@ -34,6 +259,10 @@ class EpochAccel:
         if not self.from_processed and raw_data is not None:
             self.epoch_from_raw(raw_data=raw_data)
 
+        # Loads epoch pyramid saved with processed data
+        if self.from_processed and self.processed_folder is not None and self.raw_filename is not None:
+            self.load_pyramid()
+
         # Loads epoched data from existing file
         if self.from_processed and accel_type == "wrist":
             self.epoch_from_processed_wrist()
@@ -42,44 +271,54 @@ class EpochAccel:
 
         # Removes bias from SVM by subtracting minimum value
         if self.remove_baseline and min(self.svm) != 0.0:
-            print("\n" + "Removing bias from SVM calculations...")
+            Headless.report("\n" + "Removing bias from SVM calculations...")
             self.svm = [i - min(self.svm) for i in self.svm]
-            print("Complete. Bias removed.")
+            Headless.report("Complete. Bias removed.")
 
     def epoch_from_raw(self, raw_data):
         """Epochs accelerometer data into specified epoch length using raw data."""
 
         # Calculates epochs if from_processed is False
-        print("\n" + "Epoching using raw data...")
+        Headless.report("\n" + "Epoching using raw data...")
 
         self.timestamps = raw_data.timestamps[::self.epoch_len * raw_data.sample_rate]
 
         # Calculates gravity-subtracted vector magnitude
-        raw_data.vm = [round(abs(math.sqrt(math.pow(raw_data.x[i], 2) + math.pow(raw_data.y[i], 2) +
-                                           math.pow(raw_data.z[i], 2)) - 1), 5) for i in range(len(raw_data.x))]
+        raw_data.vm = vector_magnitude(x=raw_data.x, y=raw_data.y, z=raw_data.z,
+                                       remove_gravity=True, absolute=True, decimals=5)
+
+        # Calculates 1-second aggregates once; written with the processed data if save_pyramid
+        self.pyramid = EpochPyramid(data=raw_data.vm, sample_rate=raw_data.sample_rate,
+                                    start_time=raw_data.timestamps[0] if len(raw_data.timestamps) > 0 else None)
+
+        if self.save_pyramid and self.processed_folder is not None and self.raw_filename is not None:
+            self.pyramid.save(get_pyramid_filepath(folder=self.processed_folder, raw_filename=self.raw_filename))
 
         # Calculates activity counts
-        for i in range(0, len(raw_data.vm), int(raw_data.sample_rate * self.epoch_len)):
+        # Bug handling: when we combine multiple EDF files they are zero-padded
+        # When vector magnitude is calculated, it is 1
+        # Any epoch where every value is 1 becomes 0
+        if float(self.epoch_len).is_integer():
+            epoched = self.pyramid.get_epochs(epoch_len=self.epoch_len, correct_padding=True)
+        else:
+            epoched = epoch_signal(data=raw_data.vm, sample_rate=raw_data.sample_rate, epoch_len=self.epoch_len,
+                                   correct_padding=True)
 
-            if i + self.epoch_len * raw_data.sample_rate > len(raw_data.vm):
-                break
+        self.svm = [i for i in np.round(epoched["Sum"], 5)]
 
-            vm_sum = sum(raw_data.vm[i:i + self.epoch_len * raw_data.sample_rate])
+        Headless.report("Epoching complete.")
 
-            # Bug handling: when we combine multiple EDF files they are zero-padded
-            # When vector magnitude is calculated, it is 1
-            # Any epoch where the values were all the epoch length * sampling rate (i.e. a VM of 1 for each data point)
-            # becomes 0
-            if vm_sum == self.epoch_len * raw_data.sample_rate:
-                vm_sum = 0
+    def load_pyramid(self):
+        """Loads epoch pyramid from processed_folder if one has been saved."""
 
-            self.svm.append(round(vm_sum, 5))
+        filepath = get_pyramid_filepath(folder=self.processed_folder, raw_filename=self.raw_filename)
 
-        print("Epoching complete.")
+        if os.path.exists(filepath):
+            self.pyramid = EpochPyramid(filepath=filepath)
 
     def epoch_from_processed(self):
 
-        print("\n" + "Importing processed accelerometer from {}.".format(self.processed_folder))
+        Headless.report("\n" + "Importing processed accelerometer from {}.".format(self.processed_folder))
 
         # Wrist accelerometer ----------------------------------------------------------------------------------------
         if "Wrist" in self.proc_filename:
@@ -133,21 +372,23 @@ class EpochAccel:
             self.pred_speed = [float(i) for i in df_ankle["PredictedSpeed"]]
             self.intensity_cat = [int(i) for i in df_ankle["IntensityCategory"]]
 
-        print("Complete.")
+        Headless.report("Complete.")
 
     def epoch_from_processed_wrist(self):
 
-        df = pd.read_csv(self.proc_filepath, usecols=["Timestamps", "Wrist_SVM"])
-        self.timestamps = [i for i in pd.to_datetime(df["Timestamps"])]
-        self.svm = [i for i in df["Wrist_SVM"]]
+        df = EpochTable.read_epoch_file(self.proc_filepath, columns=["Timestamps", "Wrist_SVM"],
+                                        schema=EpochTable.SUBJECT_SCHEMA)
+        self.timestamps = df["Timestamps"].tolist()
+        self.svm = df["Wrist_SVM"].tolist()
 
     def epoch_from_processed_ankle(self):
 
-        df = pd.read_csv(self.proc_filepath, usecols=["Timestamps", "Ankle_SVM", "Ankle_Intensity",
-                                                      "Ankle_Speed", "Ankle_METs"])
+        df = EpochTable.read_epoch_file(self.proc_filepath, columns=["Timestamps", "Ankle_SVM", "Ankle_Intensity",
+                                                                     "Ankle_Speed", "Ankle_METs"],
+                                        schema=EpochTable.SUBJECT_SCHEMA)
         # self.epoch_len = int((self.timestamps.iloc[1] - self.timestamps.iloc[0]).seconds())
-        self.timestamps = [i for i in pd.to_datetime(df["Timestamps"])]
-        self.svm = [i for i in df["Ankle_SVM"]]
-        self.pred_mets = [i for i in df["Ankle_METs"]]
-        self.pred_speed = [i for i in df["Ankle_Speed"]]
-        self.intensity_cat = [i for i in df["Ankle_Intensity"]]
\ No newline at end of file
+        self.timestamps = df["Timestamps"].tolist()
+        self.svm = df["Ankle_SVM"].tolist()
+        self.pred_mets = df["Ankle_METs"].tolist()
+        self.pred_speed = df["Ankle_Speed"].tolist()
+        self.intensity_cat = [None if pd.isna(i) else int(i) for i in df["Ankle_Intensity"]]
\ No newline at end of file
@@ -0,0 +1,287 @@
+"""Columnar builder for epoch-by-epoch dataframes. Each column is preallocated as a typed array of the table's length
+   (aligned on a shared epoch index) and filled from whatever data is available, so missing devices cost one array of
+   NaN instead of a list of None objects:
+
+   -"timestamp": datetime64[ns]; missing epochs are NaT
+   -"float": float32; missing epochs are NaN
+   -"category": intensity category (see IntensityClassification); stored as int8 with -1 for missing/invalid epochs
+    while building and returned as nullable Int8 with <NA> for those epochs, so files keep empty values there
+   -"mask": bool; missing epochs are False
+   -list of labels: pd.Categorical of string labels (stored as int8 codes while building); missing epochs are NaN
+
+   SUBJECT_SCHEMA and ACCEL_SCHEMA give the columns and kinds used by Subject.create_epoch_df and
+   AccelSubject.create_epoch_df so every analysis reads the same types, including from .csv (see apply_schema()).
+
+   Epoch files are written as Parquet by default (write_epoch_file()/read_epoch_file()), which keeps these types and
+   reads only the requested columns. CSV is kept as an export format, and is written instead of Parquet/Feather if
+   pyarrow is not installed.
+"""
+
+import os
+import importlib.util
+import numpy as np
+import pandas as pd
+from IntensityClassification import INVALID
+import Headless
+
+FLOAT_DTYPE = "float32"
+
+VALIDITY_LABELS = ["Valid", "Invalid"]  # ECG epoch validity: 0 = valid, 1 = invalid
+SLEEP_LABELS = ["Awake", "Napping", "Asleep"]  # SleepData status: 0, 1, 2
+NONWEAR_LABELS = ["Wear", "Nonwear"]  # Nonwear status: 0, 1
+
+SUBJECT_SCHEMA = {"Timestamps": "timestamp",
+                  "Wrist_SVM": "float", "Wrist_Intensity": "category",
+                  "Ankle_SVM": "float", "Ankle_Intensity": "category",
+                  "Ankle_Speed": "float", "Ankle_METs": "float",
+                  "HR": "float", "%HRR": "float", "HR_Intensity": "category",
+                  "ECG_Validity": VALIDITY_LABELS, "Sleep_Status": SLEEP_LABELS, "Nonwear_Status": NONWEAR_LABELS}
+
+ACCEL_SCHEMA = {"Timestamp": "timestamp"}
+ACCEL_SCHEMA.update({"{}_{}".format(device, measure): "float" for device in ["LW", "RW", "LA", "RA"]
+                     for measure in ["SVM", "AVM", "Temp"]})
+
+
+def label_codes(values, labels):
+    """Converts status codes (0, 1, ...) or string labels to int8 codes into labels. None/NaN/unknown values are -1.
+
+    :argument
+    -values: list/array of codes or strings
+    -labels: list of category names; code i is labels[i]
+    """
+
+    values = np.asarray([np.nan if i is None else i for i in values]) if isinstance(values, list) \
+        else np.asarray(values)
+
+    if values.dtype.kind in "OUS":
+        return pd.Categorical(values, categories=labels).codes.astype("int8")
+
+    codes = values.astype("float64")
+
+    codes[~((codes >= 0) & (codes < len(labels)))] = -1
+
+    return np.nan_to_num(codes, nan=-1).astype("int8")
+
+
+class EpochTable:
+
+    def __init__(self, n_epochs, schema=None):
+        """Preallocates every column in schema with missing values.
+
+        :argument
+        -n_epochs: number of rows
+        -schema: dictionary of column name: kind ("timestamp", "float", "category", "mask" or list of labels).
+                 Columns are added in this order.
+        """
+
+        self.n_epochs = n_epochs
+        self.schema = {}
+        self.columns = {}
+
+        for name, kind in ({} if schema is None else schema).items():
+            self.add_column(name, kind)
+
+    def add_column(self, name, kind):
+        """Adds an empty column of the given kind."""
+
+        if isinstance(kind, (list, tuple)):
+            self.columns[name] = np.full(self.n_epochs, -1, dtype="int8")
+        elif kind == "timestamp":
+            self.columns[name] = np.full(self.n_epochs, np.datetime64("NaT"), dtype="datetime64[ns]")
+        elif kind == "float":
+            self.columns[name] = np.full(self.n_epochs, np.nan, dtype=FLOAT_DTYPE)
+        elif kind == "category":
+            self.columns[name] = np.full(self.n_epochs, INVALID, dtype="int8")
+        elif kind == "mask":
+            self.columns[name] = np.zeros(self.n_epochs, dtype=bool)
+        else:
+            raise ValueError("Unknown column kind '{}' for column '{}'.".format(kind, name))
+
+        self.schema[name] = kind
+
+    def fill(self, name, values):
+        """Copies values into column name starting at the first epoch. Extra values are ignored; epochs without a
+           value keep their missing value. Does nothing if values is None.
+        """
+
+        if values is None:
+            return
+
+        kind = self.schema[name]
+
+        if isinstance(kind, (list, tuple)):
+            values = label_codes(values, kind)
+        elif kind == "timestamp":
+            values = pd.DatetimeIndex(values).values
+        elif kind in ["float", "category"]:
+            values = np.array([np.nan if i is None else i for i in values], dtype="float64") \
+                if isinstance(values, list) else np.asarray(values, dtype="float64")
+
+            if kind == "category":
+                values = np.nan_to_num(values, nan=INVALID)
+        else:
+            values = np.asarray(values, dtype=bool)
+
+        n = min(len(values), self.n_epochs)
+        self.columns[name][:n] = values[:n]
+
+    def to_dataframe(self):
+        """Returns table as a dataframe. Label columns are pd.Categorical; category columns are nullable Int8 with
+           <NA> for missing/invalid epochs.
+        """
+
+        data = {}
+
+        for name, values in self.columns.items():
+            kind = self.schema[name]
+
+            if isinstance(kind, (list, tuple)):
+                data[name] = pd.Categorical.from_codes(values, categories=kind)
+            elif kind == "category":
+                data[name] = pd.arrays.IntegerArray(values.copy(), mask=values == INVALID)
+            else:
+                data[name] = values
+
+        return pd.DataFrame(data)
+
+
+def apply_schema(df, schema):
+    """Converts columns of a dataframe (e.g. read from .csv) to the types in schema. Columns not in df are skipped."""
+
+    table = EpochTable(n_epochs=df.shape[0])
+
+    for name, kind in schema.items():
+        if name in df.columns:
+            table.add_column(name, kind)
+            table.fill(name, df[name].values)
+
+    for name in df.columns:
+        if name not in table.columns:
+            table.columns[name] = df[name].values
+            table.schema[name] = None
+
+    return table.to_dataframe()[list(df.columns)]
+
+
+# ================================================ EPOCH FILE I/O ====================================================
+
+# File extension for each format. Parquet and Feather keep dtypes and categoricals and require pyarrow.
+FILE_EXTENSIONS = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}
+
+
+def get_file_format(filepath):
+    """Returns file format from file extension ("parquet", "feather" or "csv")."""
+
+    for file_format, extension in FILE_EXTENSIONS.items():
+        if filepath.lower().endswith(extension):
+            return file_format
+
+    raise ValueError("Unsupported epoch file type: {}".format(filepath))
+
+
+def find_epoch_file(base_filepath, formats=("parquet", "feather", "csv")):
+    """Returns the first existing file of base_filepath (no extension) + extension, checking formats in order.
+       Returns the path for the first format if no file exists.
+    """
+
+    for file_format in formats:
+        if os.path.exists(base_filepath + FILE_EXTENSIONS[file_format]):
+            return base_filepath + FILE_EXTENSIONS[file_format]
+
+    return base_filepath + FILE_EXTENSIONS[formats[0]]
+
+
+def format_available(file_format):
+    """Whether a package that writes file_format is installed (Parquet: pyarrow or fastparquet; Feather: pyarrow)."""
+
+    if file_format == "parquet":
+        return importlib.util.find_spec("pyarrow") is not None or importlib.util.find_spec("fastparquet") is not None
+    if file_format == "feather":
+        return importlib.util.find_spec("pyarrow") is not None
+
+    return True
+
+
+def write_epoch_file(df, filepath, float_format=None):
+    """Writes epoch dataframe in the format given by the file extension. CSV is written as an export (types are
+       restored with apply_schema() when read). Writes .csv instead (with a warning) if no Parquet/Feather engine is
+       installed.
+
+    :argument
+    -df: dataframe (e.g. from EpochTable.to_dataframe())
+    -filepath: full pathway ending in .parquet, .feather or .csv
+    -float_format: number format for .csv files
+
+    :returns
+    -pathway of file that was written
+    """
+
+    file_format = get_file_format(filepath)
+
+    if not format_available(file_format):
+        csv_filepath = os.path.splitext(filepath)[0] + FILE_EXTENSIONS["csv"]
+
+        Headless.report("-Warning: no {} engine installed (requires pyarrow). "
+                        "Writing {} instead.".format(file_format, os.path.basename(csv_filepath)), force=True)
+
+        filepath, file_format = csv_filepath, "csv"
+
+    if file_format == "parquet":
+        df.to_parquet(filepath, index=False)
+    if file_format == "feather":
+        df.reset_index(drop=True).to_feather(filepath)
+    if file_format == "csv":
+        df.to_csv(filepath, index=False, float_format=float_format)
+
+    return filepath
+
+
+def read_epoch_file(filepath, columns=None, schema=None):
+    """Reads epoch file written with write_epoch_file(). Only reads the given columns. Columns of .csv files are
+       converted to the types in schema; Parquet and Feather files keep the types they were written with.
+
+    :argument
+    -filepath: full pathway to .parquet, .feather or .csv file
+    -columns: list of columns to read. All columns if None.
+    -schema: schema used for .csv files (e.g. SUBJECT_SCHEMA)
+
+    :returns
+    -dataframe
+    """
+
+    file_format = get_file_format(filepath)
+
+    if file_format == "parquet":
+        return pd.read_parquet(filepath, columns=columns)
+    if file_format == "feather":
+        return pd.read_feather(filepath, columns=columns)
+
+    df = pd.read_csv(filepath, usecols=columns)
+
+    return apply_schema(df, schema) if schema is not None else df
+
+
+def _read_epoch_file(args):
+    """Runs read_epoch_file() for [filepath, columns, schema]."""
+
+    return read_epoch_file(*args)
+
+
+def read_epoch_files(filepaths, columns=None, schema=None, pool=None):
+    """Reads epoch files for a cohort.
+
+    :argument
+    -filepaths: list of file pathways
+    -columns: list of columns to read from every file. All columns if None.
+    -schema: schema used for .csv files
+    -pool: executor or multiprocessing.Pool; files are read with pool.map() if given
+
+    :returns
+    -dictionary of filepath: dataframe
+    """
+
+    tasks = [[filepath, columns, schema] for filepath in filepaths]
+
+    dfs = list(pool.map(_read_epoch_file, tasks) if pool is not None else map(_read_epoch_file, tasks))
+
+    return dict(zip(filepaths, dfs))
@@ -1,7 +1,96 @@
-from scipy.signal import butter, lfilter, filtfilt
+from functools import lru_cache
+import numpy as np
+from scipy.signal import butter, lfilter, filtfilt, sosfiltfilt
 
+# Default number of samples filtered at once in block-wise mode (see filter_signal)
+BLOCK_LEN = 2 ** 20
 
-def filter_signal(data, filter_type, low_f=None, high_f=None, sample_f=None, filter_order=2):
+
+@lru_cache(maxsize=128)
+def design_filter(filter_type, low_f=None, high_f=None, sample_f=None, filter_order=2, output="sos"):
+    """Designs Butterworth filter. Designs are cached by their arguments so repeated calls (e.g. each axis of each
+       device) do not redesign the filter. Returned arrays are shared between calls and should not be modified.
+
+    :argument
+    -filter_type: "lowpass", "highpass" or "bandpass"
+    -low_f, high_f: filter cut-offs, Hz. Lowpass uses low_f; highpass uses high_f.
+    -sample_f: sampling frequency, Hz
+    -filter_order: order of filter; integer
+    -output: "sos" for second-order sections or "ba" for numerator/denominator
+
+    :returns
+    -sos array or (b, a)
+    """
+
+    nyquist_freq = 0.5 * sample_f
+
+    if filter_type == "lowpass":
+        wn = low_f / nyquist_freq
+    elif filter_type == "highpass":
+        wn = high_f / nyquist_freq
+    elif filter_type == "bandpass":
+        wn = [low_f / nyquist_freq, high_f / nyquist_freq]
+    else:
+        raise ValueError("filter_type must be 'lowpass', 'highpass' or 'bandpass', not '{}'.".format(filter_type))
+
+    return butter(N=filter_order, Wn=wn, btype=filter_type, output=output)
+
+
+def settling_samples(sos, tolerance=1e-12):
+    """Number of samples for the filter's impulse response to decay below tolerance, calculated from the largest
+       pole magnitude. Used as padding between blocks so block-wise output matches the one-shot filter.
+    """
+
+    poles = np.concatenate([np.roots(section[3:]) for section in sos])
+    radius = np.abs(poles).max() if len(poles) > 0 else 0
+
+    if radius <= 0:
+        return 1
+
+    return int(np.ceil(np.log(tolerance) / np.log(radius)))
+
+
+def blockwise_filtfilt(sos, data, block_len=BLOCK_LEN, pad_len=None):
+    """Zero-phase filtering of data in blocks. Each block is filtered with pad_len samples of data on either side
+       (overlap), then the padding is discarded, so memory use depends on block_len rather than the data length.
+       Edges of the recording are padded the same way as sosfiltfilt.
+
+    :argument
+    -sos: second-order sections from design_filter()
+    -data: 1D array, or 2D array of shape (n_channels, n_samples); filtered along the last axis
+    -block_len: number of output samples per block
+    -pad_len: number of overlapping samples on either side of each block. Calculated from the filter if None
+              (see settling_samples()).
+
+    :returns
+    -filtered data as float64 array
+    """
+
+    data = np.asarray(data)
+    n = data.shape[-1]
+
+    pad_len = settling_samples(sos) if pad_len is None else pad_len
+
+    # Whole signal fits in one block
+    if n <= block_len + 2 * pad_len:
+        return sosfiltfilt(sos, data)
+
+    filtered_data = np.empty(data.shape, dtype="float64")
+
+    for start in range(0, n, block_len):
+        end = min(start + block_len, n)
+
+        seg_start = max(start - pad_len, 0)
+        seg_end = min(end + pad_len, n)
+
+        segment = sosfiltfilt(sos, data[..., seg_start:seg_end])
+        filtered_data[..., start:end] = segment[..., start - seg_start:end - seg_start]
+
+    return filtered_data
+
+
+def filter_signal(data, filter_type, low_f=None, high_f=None, sample_f=None, filter_order=2, method="ba",
+                  block_len=None, pad_len=None):
     """Function that creates bandpass filter to ECG data.
 
     Required arguments:
@@ -10,29 +99,51 @@ def filter_signal(data, filter_type, low_f=None, high_f=None, sample_f=None, fil
     -low_f, high_f: filter cut-offs, Hz
     -sample_f: sampling frequency, Hz
     -filter_order: order of filter; integer
-    """
 
-    nyquist_freq = 0.5 * sample_f
+    Optional arguments:
+    -method: "ba" runs filtfilt with (b, a) coefficients; "sos" runs sosfiltfilt with second-order sections, which
+             stays numerically stable for high-order bandpass filters
+    -block_len: if given, filters data in blocks of block_len samples using second-order sections (see
+                blockwise_filtfilt()) to limit memory use on long recordings
+    -pad_len: number of overlapping samples between blocks; calculated from the filter if None
+    """
 
-    if filter_type == "lowpass":
-        low = low_f / nyquist_freq
-        b, a = butter(N=filter_order, Wn=low, btype="lowpass")
-        # filtered_data = lfilter(b, a, data)
-        filtered_data = filtfilt(b, a, x=data)
+    if block_len is not None:
+        sos = design_filter(filter_type=filter_type, low_f=low_f, high_f=high_f, sample_f=sample_f,
+                            filter_order=filter_order, output="sos")
 
-    if filter_type == "highpass":
-        high = high_f / nyquist_freq
+        return blockwise_filtfilt(sos=sos, data=data, block_len=block_len, pad_len=pad_len)
 
-        b, a = butter(N=filter_order, Wn=high, btype="highpass")
-        # filtered_data = lfilter(b, a, data)
-        filtered_data = filtfilt(b, a, x=data)
+    if method == "sos":
+        sos = design_filter(filter_type=filter_type, low_f=low_f, high_f=high_f, sample_f=sample_f,
+                            filter_order=filter_order, output="sos")
 
-    if filter_type == "bandpass":
-        low = low_f / nyquist_freq
-        high = high_f / nyquist_freq
+        return sosfiltfilt(sos, x=data)
 
-        b, a = butter(N=filter_order, Wn=[low, high], btype="bandpass")
-        # filtered_data = lfilter(b, a, data)
-        filtered_data = filtfilt(b, a, x=data)
+    b, a = design_filter(filter_type=filter_type, low_f=low_f, high_f=high_f, sample_f=sample_f,
+                         filter_order=filter_order, output="ba")
+    # filtered_data = lfilter(b, a, data)
+    filtered_data = filtfilt(b, a, x=data)
 
     return filtered_data
+
+
+def filter_signals(data, filter_type, low_f=None, high_f=None, sample_f=None, filter_order=2, method="sos",
+                   block_len=None, pad_len=None):
+    """Filters several channels (e.g. x, y and z axes of one device) with one call along the last axis.
+
+    :argument
+    -data: array of shape (n_channels, n_samples), or list of equal-length channels
+    -other arguments: see filter_signal()
+
+    :returns
+    -float64 array of shape (n_channels, n_samples)
+    """
+
+    data = np.asarray(data, dtype="float64")
+
+    if data.ndim != 2:
+        raise ValueError("data must have shape (n_channels, n_samples), not {}.".format(data.shape))
+
+    return filter_signal(data=data, filter_type=filter_type, low_f=low_f, high_f=high_f, sample_f=sample_f,
+                         filter_order=filter_order, method=method, block_len=block_len, pad_len=pad_len)
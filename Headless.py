@@ -0,0 +1,93 @@
+"""Pipeline-wide headless mode for batch runs. Processing modules send progress messages through report() and check
+   plots_enabled() before building figures.
+
+   -Normal mode: report() prints the message, as before.
+   -Headless mode: no figures are built, nothing is printed, messages are logged to the "WearablesProcessing" logger
+    and passed to an optional progress callback at most once every min_interval seconds.
+
+   Usage:
+   Headless.set_headless(True, progress_callback=lambda update: queue.put(update), min_interval=5)
+"""
+
+import time
+import logging
+from datetime import datetime
+from contextlib import contextmanager
+
+logger = logging.getLogger("WearablesProcessing")
+
+_settings = {"Headless": False, "Callback": None, "Min interval": 1.0, "Last update": None}
+
+
+def set_headless(headless=True, progress_callback=None, min_interval=1.0):
+    """Turns headless mode on or off for the current process.
+
+    :argument
+    -headless: boolean
+    -progress_callback: function called with a dictionary ("Message", "Stage", "Fraction", "Time") in headless mode
+    -min_interval: minimum number of seconds between progress callbacks
+    """
+
+    _settings["Headless"] = headless
+    _settings["Callback"] = progress_callback
+    _settings["Min interval"] = min_interval
+    _settings["Last update"] = None
+
+
+def is_headless():
+    """Whether headless mode is on."""
+
+    return _settings["Headless"]
+
+
+def plots_enabled():
+    """Whether figures should be built (False in headless mode)."""
+
+    return not _settings["Headless"]
+
+
+def report(message="", stage=None, fraction=None, force=False):
+    """Reports progress. Prints message in normal mode; logs it and passes it to the progress callback (rate-limited)
+       in headless mode.
+
+    :argument
+    -message: text that would otherwise be printed
+    -stage: optional name of processing stage
+    -fraction: optional fraction of stage completed (0-1)
+    -force: boolean; sends to callback even if the last update was less than min_interval seconds ago
+    """
+
+    if not _settings["Headless"]:
+        print(message)
+        return
+
+    message = str(message).strip()
+
+    if message == "":
+        return
+
+    logger.info(message, extra={"stage": stage, "fraction": fraction})
+
+    callback = _settings["Callback"]
+    if callback is None:
+        return
+
+    now = time.perf_counter()
+    last_update = _settings["Last update"]
+
+    if force or last_update is None or now - last_update >= _settings["Min interval"]:
+        _settings["Last update"] = now
+        callback({"Message": message, "Stage": stage, "Fraction": fraction, "Time": datetime.now()})
+
+
+@contextmanager
+def headless_mode(progress_callback=None, min_interval=1.0):
+    """Runs the code inside a with block in headless mode, then restores the previous settings."""
+
+    previous = dict(_settings)
+    set_headless(True, progress_callback=progress_callback, min_interval=min_interval)
+
+    try:
+        yield
+    finally:
+        _settings.update(previous)
@@ -0,0 +1,101 @@
+"""Import-time check for the core processing path (EDF import, epoching, ECG quality check, batch processing). Each
+   module is imported in a new Python process (cold import) and the import time is compared with a budget. Also checks
+   that plotting and statistics packages, which should only load on first use (see LazyImport), were not imported.
+
+   Run from the repository folder: python ImportBenchmark.py
+   Exits with status 1 if any module is over budget, loads a deferred package or fails to import.
+"""
+
+import os
+import sys
+import json
+import subprocess
+import pandas as pd
+
+# Modules used by headless batch workers
+CORE_MODULES = ["Filtering", "EpochData", "Nonwear", "SleepData", "ImportEDF", "ECG", "Subject", "BatchRunner"]
+
+# Packages that must not be imported by CORE_MODULES. scipy.stats is not included: scipy.signal (filtering) imports it.
+DEFERRED_PACKAGES = ["matplotlib", "ecgdetectors", "progressbar", "pingouin", "sklearn", "statsmodels", "seaborn"]
+
+# Maximum cold import time for each module, seconds
+IMPORT_BUDGET = 3.0
+
+# Code run in the new process
+_TIMER = """import json, sys, time
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+print(json.dumps({{"Seconds": t1 - t0, "Loaded": [name for name in {deferred} if name in sys.modules]}}))
+"""
+
+
+def time_import(module, deferred=None):
+    """Imports module in a new Python process.
+
+    :argument
+    -module: module name
+    -deferred: list of package names checked in sys.modules after importing
+
+    :returns
+    -dictionary: "Seconds" (import time; None if import failed), "Loaded" (deferred packages that were imported),
+     "Error" (last line of the traceback; None if import succeeded)
+    """
+
+    deferred = DEFERRED_PACKAGES if deferred is None else deferred
+
+    result = subprocess.run([sys.executable, "-c", _TIMER.format(module=module, deferred=deferred)],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+
+    if result.returncode != 0:
+        error = result.stderr.strip().split("\n")[-1] if result.stderr.strip() else "Exit code {}".format(
+            result.returncode)
+
+        return {"Seconds": None, "Loaded": [], "Error": error}
+
+    output = json.loads(result.stdout.strip().split("\n")[-1])
+    output["Error"] = None
+
+    return output
+
+
+def check_imports(modules=None, budget=IMPORT_BUDGET, repeats=3, deferred=None):
+    """Times cold import of each module (fastest of repeats) and compares it with budget.
+
+    :argument
+    -modules: list of module names. Uses CORE_MODULES if None.
+    -budget: maximum import time, seconds
+    -repeats: number of times each module is imported
+    -deferred: packages that must not be imported. Uses DEFERRED_PACKAGES if None.
+
+    :returns
+    -dataframe with one row per module: "Module", "Seconds", "Deferred loaded", "Error", "Passed"
+    """
+
+    modules = CORE_MODULES if modules is None else modules
+
+    rows = []
+
+    for module in modules:
+        results = [time_import(module=module, deferred=deferred) for i in range(repeats)]
+        times = [i["Seconds"] for i in results if i["Seconds"] is not None]
+
+        seconds = min(times) if len(times) > 0 else None
+        loaded = sorted(set(name for i in results for name in i["Loaded"]))
+        error = results[-1]["Error"]
+
+        rows.append({"Module": module, "Seconds": round(seconds, 3) if seconds is not None else None,
+                     "Deferred loaded": ", ".join(loaded), "Error": error,
+                     "Passed": error is None and seconds <= budget and len(loaded) == 0})
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+
+    df = check_imports()
+
+    print("\nCold import times (budget = {} seconds):".format(IMPORT_BUDGET))
+    print(df.to_string(index=False))
+
+    sys.exit(0 if df["Passed"].all() else 1)
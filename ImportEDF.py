@@ -1,21 +1,33 @@
 import pyedflib
 from datetime import datetime
 from datetime import timedelta
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
 import Filtering
-import matplotlib.dates as mdates
+from TimeIndex import TimeIndex
+import SignalCache
+import IntervalMarking
+import Headless
+import Instrumentation
+from LazyImport import lazy_import
+
+# Plotting packages are imported on first use
+plt = lazy_import("matplotlib.pyplot")
+mdates = lazy_import("matplotlib.dates")
 
 
 class GENEActiv:
 
-    def __init__(self, filepath, load_raw, start_offset=0, end_offset=0):
+    def __init__(self, filepath, load_raw, start_offset=0, end_offset=0, cache_dir=None, memmap=False,
+                 instrumentation=None):
 
         self.filepath = filepath
+        self.cache_dir = cache_dir
+        self.memmap = memmap
         self.start_offset = start_offset
         self.end_offset = end_offset
         self.load_raw = load_raw
+        self.instrumentation = instrumentation  # StageTimer of the object that imports the file
 
         # Accelerometer data
         self.x = None
@@ -33,24 +45,25 @@ class GENEActiv:
         if self.load_raw:
             self.import_file()
 
+    @Instrumentation.timed(Instrumentation.IMPORT, samples="x")
     def import_file(self):
 
         t0 = datetime.now()  # Gets current time
 
-        print("Importing {}...".format(self.filepath))
+        Headless.report("Importing {}...".format(self.filepath))
 
         # READS IN ACCELEROMETER DATA ================================================================================
-        file = pyedflib.EdfReader(self.filepath)
+        file = SignalCache.open_edf(self.filepath, cache_dir=self.cache_dir, memmap=self.memmap)
 
         if self.end_offset != 0:
-            print("Importing file from index {} to {}...".format(self.start_offset, self.end_offset))
+            Headless.report("Importing file from index {} to {}...".format(self.start_offset, self.end_offset))
 
             self.x = file.readSignal(chn=0, start=self.start_offset, n=self.end_offset)
             self.y = file.readSignal(chn=1, start=self.start_offset, n=self.end_offset)
             self.z = file.readSignal(chn=2, start=self.start_offset, n=self.end_offset)
 
         if self.end_offset == 0:
-            print("Importing file from index {} to the end...".format(self.start_offset))
+            Headless.report("Importing file from index {} to the end...".format(self.start_offset))
 
             self.x = file.readSignal(chn=0, start=self.start_offset)
             self.y = file.readSignal(chn=1, start=self.start_offset)
@@ -65,31 +78,74 @@ class GENEActiv:
         self.starttime = file.getStartdatetime() + timedelta(seconds=self.start_offset/self.sample_rate)
         self.file_dur = round(file.getFileDuration() / 3600, 3)  # Seconds --> hours
 
-        # TIMESTAMP GENERATION ========================================================================================
-        t0_stamp = datetime.now()
+        # TIMESTAMPS ==================================================================================================
+        # Calculated from index when needed instead of being stored for every data point
+        self.timestamps = TimeIndex(starttime=self.starttime, sample_rate=self.sample_rate, n_samples=len(self.x))
 
-        print("\n" + "Creating timestamps...")
+        t1 = datetime.now()
+        proc_time = (t1 - t0).total_seconds()
+        Headless.report("Import complete ({} seconds).".format(round(proc_time, 2)))
 
-        end_time = self.starttime + timedelta(seconds=len(self.x) / self.sample_rate)
-        self.timestamps = np.asarray(pd.date_range(start=self.starttime, end=end_time, periods=len(self.x)))
+    def stream_file(self, block_len=3600, epoch_len=15):
+        """Generator that reads the file in fixed-size blocks instead of loading the whole collection into memory.
+           Block length is rounded down to a whole number of epochs so epoching can be run block-by-block.
+           Respects start_offset and end_offset. Does not require load_raw to be True.
 
-        t1_stamp = datetime.now()
-        stamp_time = (t1_stamp-t0_stamp).seconds
-        print("Complete ({} seconds).".format(round(stamp_time, 2)))
+        :argument
+        -block_len: duration of each block in seconds
+        -epoch_len: epoch length in seconds that blocks are aligned to
 
-        t1 = datetime.now()
-        proc_time = (t1 - t0).seconds
-        print("Import complete ({} seconds).".format(round(proc_time, 2)))
+        :returns (yields)
+        -dictionary with keys "Index" (data index of first sample relative to start_offset), "Timestamp" (start time
+         of block), "x", "y", "z" and "vm" (gravity-subtracted vector magnitude; negative values become zero)
+        """
+
+        file = SignalCache.open_edf(self.filepath, cache_dir=self.cache_dir, memmap=self.memmap)
+
+        self.sample_rate = file.getSampleFrequencies()[1]
+        self.starttime = file.getStartdatetime() + timedelta(seconds=self.start_offset/self.sample_rate)
+        self.file_dur = round(file.getFileDuration() / 3600, 3)
+
+        epoch_samples = int(epoch_len * self.sample_rate)
+        block_samples = max(int(block_len / epoch_len), 1) * epoch_samples
+
+        # Total number of samples to read: end_offset is a sample count, as in import_file()
+        n_samples = file.getNSamples()[0] - self.start_offset
+        if self.end_offset != 0:
+            n_samples = min(n_samples, self.end_offset)
+
+        Headless.report("Streaming {} in blocks of {} samples...".format(self.filepath, block_samples))
+
+        try:
+            for block_start in range(0, n_samples, block_samples):
+                n = min(block_samples, n_samples - block_start)
+
+                x = file.readSignal(chn=0, start=self.start_offset + block_start, n=n)
+                y = file.readSignal(chn=1, start=self.start_offset + block_start, n=n)
+                z = file.readSignal(chn=2, start=self.start_offset + block_start, n=n)
+
+                vm = np.sqrt(np.square(np.array([x, y, z])).sum(axis=0)) - 1
+                vm[vm < 0] = 0
+
+                yield {"Index": block_start,
+                       "Timestamp": self.starttime + timedelta(seconds=block_start / self.sample_rate),
+                       "x": x, "y": y, "z": z, "vm": vm}
+        finally:
+            file.close()
 
 
 class GENEActivTemperature:
 
-    def __init__(self, filepath, from_processed=False, start_offset=0, end_offset=0):
+    def __init__(self, filepath, from_processed=False, start_offset=0, end_offset=0, cache_dir=None, memmap=False,
+                 instrumentation=None):
 
         self.filepath = filepath
+        self.cache_dir = cache_dir
+        self.memmap = memmap
         self.start_offset = start_offset
         self.end_offset = end_offset
         self.from_processed = from_processed
+        self.instrumentation = instrumentation  # StageTimer of the object that imports the file
 
         # Accelerometer data
         self.temperature = None
@@ -104,14 +160,15 @@ class GENEActivTemperature:
         if not self.from_processed and self.filepath is not None:
             self.import_file()
 
+    @Instrumentation.timed(Instrumentation.IMPORT, samples="temperature")
     def import_file(self):
 
         t0 = datetime.now()  # Gets current time
 
-        print("Importing {}...".format(self.filepath))
+        Headless.report("Importing {}...".format(self.filepath))
 
         # READS IN ACCELEROMETER DATA ================================================================================
-        file = pyedflib.EdfReader(self.filepath)
+        file = SignalCache.open_edf(self.filepath, cache_dir=self.cache_dir, memmap=self.memmap)
 
         self.temperature = file.readSignal(chn=0)
 
@@ -122,28 +179,23 @@ class GENEActivTemperature:
         self.starttime = file.getStartdatetime() + timedelta(seconds=self.start_offset/self.sample_rate)
         self.file_dur = round(file.getFileDuration() / 3600, 3)  # Seconds --> hours
 
-        # TIMESTAMP GENERATION ========================================================================================
-        t0_stamp = datetime.now()
-
-        print("\n" + "Creating timestamps...")
-
-        end_time = self.starttime + timedelta(seconds=len(self.temperature) * 4 / self.sample_rate)
-        self.timestamps = np.asarray(pd.date_range(start=self.starttime, end=end_time, periods=len(self.temperature)))
-
-        t1_stamp = datetime.now()
-        stamp_time = (t1_stamp-t0_stamp).seconds
-        print("Complete ({} seconds).".format(round(stamp_time, 2)))
+        # TIMESTAMPS ==================================================================================================
+        # One temperature reading every 4 sample periods
+        self.timestamps = TimeIndex(starttime=self.starttime, sample_rate=self.sample_rate / 4,
+                                    n_samples=len(self.temperature))
 
         t1 = datetime.now()
-        proc_time = (t1 - t0).seconds
-        print("Import complete ({} seconds).".format(round(proc_time, 2)))
+        proc_time = (t1 - t0).total_seconds()
+        Headless.report("Import complete ({} seconds).".format(round(proc_time, 2)))
 
 
 class GENEActivLight:
 
-    def __init__(self, filepath, from_processed=False, start_offset=0, end_offset=0):
+    def __init__(self, filepath, from_processed=False, start_offset=0, end_offset=0, cache_dir=None, memmap=False):
 
         self.filepath = filepath
+        self.cache_dir = cache_dir
+        self.memmap = memmap
         self.from_processed = from_processed
         self.start_offset = start_offset
         self.end_offset = end_offset
@@ -160,10 +212,10 @@ class GENEActivLight:
 
         t0 = datetime.now()  # Gets current time
 
-        print("Importing {}...".format(self.filepath))
+        Headless.report("Importing {}...".format(self.filepath))
 
         # READS IN ACCELEROMETER DATA ================================================================================
-        file = pyedflib.EdfReader(self.filepath)
+        file = SignalCache.open_edf(self.filepath, cache_dir=self.cache_dir, memmap=self.memmap)
 
         self.light = file.readSignal(chn=0)
 
@@ -174,17 +226,8 @@ class GENEActivLight:
         self.starttime = file.getStartdatetime() + timedelta(seconds=self.start_offset/self.sample_rate)
         self.file_dur = round(file.getFileDuration() / 3600, 3)  # Seconds --> hours
 
-        # TIMESTAMP GENERATION ========================================================================================
-        t0_stamp = datetime.now()
-
-        print("\n" + "Creating timestamps...")
-
-        end_time = self.starttime + timedelta(seconds=len(self.light) / self.sample_rate)
-        self.timestamps = np.asarray(pd.date_range(start=self.starttime, end=end_time, periods=len(self.light)))
-
-        t1_stamp = datetime.now()
-        stamp_time = (t1_stamp-t0_stamp).seconds
-        print("Complete ({} seconds).".format(round(stamp_time, 2)))
+        # TIMESTAMPS ==================================================================================================
+        self.timestamps = TimeIndex(starttime=self.starttime, sample_rate=self.sample_rate, n_samples=len(self.light))
 
         # DATA EPOCHING ===============================================================================================
         self.light_avg = [sum(self.light[i:i+15*self.sample_rate])/(15 * self.sample_rate) for
@@ -192,21 +235,26 @@ class GENEActivLight:
         self.epoch_timestamps = self.timestamps[::self.sample_rate * 15]
 
         t1 = datetime.now()
-        proc_time = (t1 - t0).seconds
-        print("Import complete ({} seconds).".format(round(proc_time, 2)))
+        proc_time = (t1 - t0).total_seconds()
+        Headless.report("Import complete ({} seconds).".format(round(proc_time, 2)))
 
 
 class Bittium:
 
     def __init__(self, filepath, start_offset=0, end_offset=0, epoch_len=15, load_accel=False,
-                 low_f=1, high_f=30, f_type="bandpass"):
+                 low_f=1, high_f=30, f_type="bandpass", cache_dir=None, memmap=False, instrumentation=None):
 
         self.filepath = filepath
+        self.cache_dir = cache_dir
+        self.memmap = memmap
         self.start_offset = start_offset
         self.end_offset = end_offset
         self.epoch_len = epoch_len
         self.load_accel = load_accel
 
+        # Import and filter stages are recorded here (see Instrumentation)
+        self.instrumentation = Instrumentation.StageTimer() if instrumentation is None else instrumentation
+
         # Filter details
         self.low_f = low_f
         self.high_f = high_f
@@ -233,22 +281,23 @@ class Bittium:
         # RUNS METHODS
         self.import_file()
 
+    @Instrumentation.timed(Instrumentation.IMPORT, samples="raw")
     def import_file(self):
         """Method that loads voltage channel, sample rate, starttime, and file duration.
         Creates timestamp for each data point."""
 
         t0 = datetime.now()
 
-        print("\n" + "Importing {}...".format(self.filepath))
+        Headless.report("\n" + "Importing {}...".format(self.filepath))
 
-        file = pyedflib.EdfReader(self.filepath)
+        file = SignalCache.open_edf(self.filepath, cache_dir=self.cache_dir, memmap=self.memmap)
 
         self.sample_rate = file.getSampleFrequencies()[0]
         self.accel_sample_rate = file.getSampleFrequencies()[1]
 
         # READS IN ECG DATA ===========================================================================================
         if self.end_offset == 0:
-            print("Importing file from index {} to the end...".format(self.start_offset))
+            Headless.report("Importing file from index {} to the end...".format(self.start_offset))
             self.raw = file.readSignal(chn=0, start=self.start_offset)
 
             if self.load_accel:
@@ -260,8 +309,8 @@ class Bittium:
                                                           self.accel_sample_rate / self.sample_rate))
 
         if self.end_offset != 0:
-            print("Importing file from index {} to {}...".format(self.start_offset,
-                                                                 self.start_offset + self.end_offset))
+            Headless.report("Importing file from index {} to {}...".format(self.start_offset,
+                                                                           self.start_offset + self.end_offset))
             self.raw = file.readSignal(chn=0, start=self.start_offset, n=self.end_offset)
 
             if self.load_accel:
@@ -283,32 +332,24 @@ class Bittium:
             self.vm = (np.sqrt(np.square(np.array([self.x, self.y, self.z])).sum(axis=0)) - 1000) / 1000
             self.vm[self.vm < 0] = 0
 
-        print("ECG data import complete.")
+        Headless.report("ECG data import complete.")
 
         self.starttime = file.getStartdatetime() + timedelta(seconds=self.start_offset/self.sample_rate)
         self.file_dur = round(file.getFileDuration() / 3600, 3)
 
-        # Data filtering
-        self.filtered = Filtering.filter_signal(data=self.raw, low_f=self.low_f, high_f=self.high_f,
-                                                filter_type=self.f_type, sample_f=self.sample_rate, filter_order=3)
-
-        # TIMESTAMP GENERATION ========================================================================================
-        t0_stamp = datetime.now()
+        # Data filtering: block-wise zero-phase filter limits memory use on multi-day files
+        with self.instrumentation.stage(Instrumentation.FILTER, n_samples=len(self.raw), source="Bittium"):
+            self.filtered = Filtering.filter_signal(data=self.raw, low_f=self.low_f, high_f=self.high_f,
+                                                    filter_type=self.f_type, sample_f=self.sample_rate,
+                                                    filter_order=3, block_len=Filtering.BLOCK_LEN)
 
-        print("\n" + "Creating timestamps...")
-
-        # Timestamps
-        end_time = self.starttime + timedelta(seconds=len(self.raw)/self.sample_rate)
-        self.timestamps = np.asarray(pd.date_range(start=self.starttime, end=end_time, periods=len(self.raw)))
+        # TIMESTAMPS ==================================================================================================
+        self.timestamps = TimeIndex(starttime=self.starttime, sample_rate=self.sample_rate, n_samples=len(self.raw))
         self.epoch_timestamps = self.timestamps[::self.epoch_len * self.sample_rate]
 
-        t1_stamp = datetime.now()
-        stamp_time = (t1_stamp - t0_stamp).seconds
-        print("Complete ({} seconds).".format(round(stamp_time, 2)))
-
         t1 = datetime.now()
-        proc_time = (t1 - t0).seconds
-        print("\n" + "Import complete ({} seconds).".format(round(proc_time, 2)))
+        proc_time = (t1 - t0).total_seconds()
+        Headless.report("\n" + "Import complete ({} seconds).".format(round(proc_time, 2)))
 
 
 def check_file(filepath, print_summary=True):
@@ -324,11 +365,11 @@ def check_file(filepath, print_summary=True):
     end_time = start_time + timedelta(seconds=edf_file.getFileDuration())
 
     if print_summary:
-        print("\n", filepath)
-        print("-Sample rate: {}Hz".format(edf_file.getSampleFrequency(0)))
-        print("-Start time: ", start_time)
-        print("-End time:", end_time)
-        print("-Duration: {} hours".format(round(duration/3600, 2)))
+        Headless.report("\n {}".format(filepath))
+        Headless.report("-Sample rate: {}Hz".format(edf_file.getSampleFrequency(0)))
+        Headless.report("-Start time:  {}".format(start_time))
+        Headless.report("-End time: {}".format(end_time))
+        Headless.report("-Duration: {} hours".format(round(duration/3600, 2)))
 
     return start_time, end_time, edf_file.getSampleFrequency(0), duration
 
@@ -350,23 +391,28 @@ def import_subject(id):
 
     accel.svm = [sum(accel.vm[i:i+accel.sample_rate*15]) for i in range(0, len(accel.vm), 15 * accel.sample_rate)]
 
-    fig, (ax1, ax2, ax3) = plt.subplots(3, sharex='col', figsize=(10, 7))
-    plt.suptitle(id)
-    plt.subplots_adjust(bottom=.12)
-    ax1.plot(accel.timestamps[::accel.sample_rate * 15], accel.svm, color='black')
-    ax1.set_ylabel("Counts")
-
-    for row in nw.itertuples():
-        ax1.fill_between(x=[row.start_time, row.end_time], y1=0, y2=max(accel.svm), color='red', alpha=.5)
-
-    ax2.plot(temp.timestamps, temp.temperature, color='red')
-    ax2.set_ylabel("Degrees")
-    ax3.plot(light.epoch_timestamps, light.light_avg, color='orange')
-    ax3.set_ylabel("Avg Lux")
-
-    xfmt = mdates.DateFormatter("%Y-%m-%d %H:%M:%S")
-    ax3.xaxis.set_major_formatter(xfmt)
-    plt.xticks(rotation=45, fontsize=6)
+    # Figure is skipped in headless mode
+    if Headless.plots_enabled():
+        fig, (ax1, ax2, ax3) = plt.subplots(3, sharex='col', figsize=(10, 7))
+        plt.suptitle(id)
+        plt.subplots_adjust(bottom=.12)
+        epoch_stamps = np.asarray(accel.timestamps[::accel.sample_rate * 15])
+        ax1.plot(epoch_stamps, accel.svm, color='black')
+        ax1.set_ylabel("Counts")
+
+        # Shades epochs inside any gold standard non-wear period
+        nw_status = IntervalMarking.mark_time_intervals(timestamps=epoch_stamps, start_times=nw["start_time"],
+                                                        stop_times=nw["end_time"], inclusive=True)
+        ax1.fill_between(x=epoch_stamps, y1=0, y2=max(accel.svm), where=nw_status, color='red', alpha=.5)
+
+        ax2.plot(temp.timestamps, temp.temperature, color='red')
+        ax2.set_ylabel("Degrees")
+        ax3.plot(light.epoch_timestamps, light.light_avg, color='orange')
+        ax3.set_ylabel("Avg Lux")
+
+        xfmt = mdates.DateFormatter("%Y-%m-%d %H:%M:%S")
+        ax3.xaxis.set_major_formatter(xfmt)
+        plt.xticks(rotation=45, fontsize=6)
 
     return accel, light, temp, nw
 
@@ -0,0 +1,262 @@
+"""Per-stage timing and memory instrumentation for Subject, AccelSubject and ECG pipelines. Each object has a
+   StageTimer (self.instrumentation) that records one row per processing stage:
+
+   -"Wall time": elapsed seconds (perf_counter; not truncated to whole seconds)
+   -"Self time": wall time excluding stages nested inside this one, so summed self times do not double count
+   -"CPU time": CPU seconds used by this process and by finished child processes (e.g. quality check workers)
+   -"Peak RSS (MB)": highest resident memory of the process so far, at the end of the stage
+   -"RSS increase (MB)": how much the stage raised the peak RSS
+   -"Samples", "Samples/s": number of data points processed (raw samples, or epochs for epoched data) and throughput
+
+   Standard stage names are in STAGES. Reports from several subjects are combined with aggregate().
+
+   Usage:
+   with subject.instrumentation.stage(Instrumentation.FILTER, n_samples=len(data), source="ECG"):
+       filtered = Filtering.filter_signal(...)
+
+   subject.instrumentation.to_dataframe()
+"""
+
+import sys
+import json
+import time
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+import pandas as pd
+
+try:
+    import resource  # not available on Windows; peak RSS and child CPU time are then not recorded
+except ImportError:
+    resource = None
+
+# Standard stage names
+IMPORT = "Import"
+CROP = "Crop"
+FILTER = "Filter"
+EPOCH = "Epoch"
+QC = "QC"
+NONWEAR = "Nonwear"
+MODELS = "Models"
+WRITE = "Write"
+
+STAGES = [IMPORT, CROP, FILTER, EPOCH, QC, NONWEAR, MODELS, WRITE]
+
+
+def peak_rss_mb():
+    """Highest resident set size of the current process so far, MB. None if not available."""
+
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return max_rss / 1024 ** 2 if sys.platform == "darwin" else max_rss / 1024
+
+
+def cpu_seconds():
+    """CPU time of the current process plus finished child processes, seconds."""
+
+    if resource is None:
+        return time.process_time()
+
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class StageTimer:
+
+    def __init__(self, name=None):
+        """Records timing and memory use of processing stages.
+
+        :argument
+        -name: name of the object being processed (e.g. subject ID); included in reports
+        """
+
+        self.name = name
+        self.records = []
+
+        self._open = []  # records of stages currently running (innermost last)
+
+    @contextmanager
+    def stage(self, stage, n_samples=None, source=None):
+        """Times the code inside a with block as one stage. Yields the stage's record (dictionary); "Samples" can be
+           set inside the block if the number of data points is only known once the data is loaded.
+
+        :argument
+        -stage: stage name (see STAGES)
+        -n_samples: number of data points processed
+        -source: object or device the stage belongs to (e.g. "ECG", "Wrist")
+        """
+
+        record = {"Source": source, "Stage": stage, "Depth": len(self._open), "Start": datetime.now(),
+                  "Wall time": None, "Self time": None, "CPU time": None,
+                  "Peak RSS (MB)": None, "RSS increase (MB)": None, "Samples": n_samples, "Samples/s": None}
+
+        self._open.append(record)
+
+        rss_start = peak_rss_mb()
+        cpu_start = cpu_seconds()
+        t0 = time.perf_counter()
+
+        try:
+            yield record
+        finally:
+            wall_time = time.perf_counter() - t0
+
+            record["Wall time"] = wall_time
+            record["CPU time"] = cpu_seconds() - cpu_start
+            record["Peak RSS (MB)"] = peak_rss_mb()
+
+            if rss_start is not None:
+                record["RSS increase (MB)"] = record["Peak RSS (MB)"] - rss_start
+
+            if record["Samples"] is not None and wall_time > 0:
+                record["Samples/s"] = record["Samples"] / wall_time
+
+            self._open.pop()
+
+            # Time of nested stages is subtracted from their parent's self time
+            child_time = sum([i["Wall time"] for i in self.records if i.get("_parent") is record])
+            record["Self time"] = wall_time - child_time
+
+            if len(self._open) > 0:
+                record["_parent"] = self._open[-1]
+
+            self.records.append(record)
+
+    def total(self, column="Self time"):
+        """Sum of column over all stages. Self time sums to the time spent inside any stage."""
+
+        return sum([i[column] for i in self.records if i[column] is not None])
+
+    def to_dataframe(self):
+        """Returns one row per stage, in the order stages finished."""
+
+        columns = ["Source", "Stage", "Depth", "Start", "Wall time", "Self time", "CPU time",
+                   "Peak RSS (MB)", "RSS increase (MB)", "Samples", "Samples/s"]
+
+        return pd.DataFrame([{key: i[key] for key in columns} for i in self.records], columns=columns)
+
+    def summary(self):
+        """Returns time, memory and samples for each stage name, summed over sources (self time, so nested stages
+           are not counted twice).
+        """
+
+        df = self.to_dataframe()
+
+        if df.shape[0] == 0:
+            return pd.DataFrame(columns=["Self time", "CPU time", "Peak RSS (MB)", "Samples", "Samples/s"])
+
+        summary = df.groupby("Stage", sort=False).agg({"Self time": "sum", "CPU time": "sum",
+                                                       "Peak RSS (MB)": "max", "Samples": "sum"})
+        summary["Samples/s"] = summary["Samples"].where(summary["Samples"] > 0) / summary["Self time"]
+
+        return summary
+
+    def to_dict(self):
+        """Returns report as a dictionary that can be written as JSON or sent between processes."""
+
+        stages = []
+        for record in self.records:
+            row = {key: value for key, value in record.items() if not key.startswith("_")}
+            row["Start"] = record["Start"].isoformat()
+            stages.append(row)
+
+        peak_rss = [i["Peak RSS (MB)"] for i in self.records if i["Peak RSS (MB)"] is not None]
+
+        return {"Name": self.name, "Total time": self.total(), "Peak RSS (MB)": max(peak_rss) if peak_rss else None,
+                "Stages": stages}
+
+    def to_json(self, filepath=None):
+        """Returns report as a JSON string. Also writes it to filepath if given."""
+
+        output = json.dumps(self.to_dict(), indent=2, default=str)
+
+        if filepath is not None:
+            with open(filepath, "w") as file:
+                file.write(output)
+
+        return output
+
+
+def timed(stage, source=None, samples=None):
+    """Method decorator that times the whole method as one stage using self.instrumentation. Methods of objects
+       without a StageTimer run untimed.
+
+    :argument
+    -stage: stage name (see STAGES)
+    -source: source name for the record. Uses the class name if None.
+    -samples: name of an attribute of self whose length is the number of samples processed, read after the method
+              runs (e.g. "raw")
+    """
+
+    def decorator(method):
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            timer = getattr(self, "instrumentation", None)
+
+            if timer is None:
+                return method(self, *args, **kwargs)
+
+            with timer.stage(stage, source=type(self).__name__ if source is None else source) as record:
+                output = method(self, *args, **kwargs)
+
+                data = getattr(self, samples, None) if samples is not None else None
+                record["Samples"] = len(data) if data is not None else None
+
+            return output
+
+        return wrapper
+
+    return decorator
+
+
+def aggregate(reports):
+    """Combines stage reports from several subjects (e.g. a cohort run).
+
+    :argument
+    -reports: list of StageTimer objects or dictionaries from StageTimer.to_dict(). Each report counts as one
+              subject, whatever its name (reports may be unnamed or share a name).
+
+    :returns
+    -dataframe with one row per stage: number of subjects, mean/median/max/total self time (seconds), total CPU time,
+     maximum peak RSS (MB), total samples and overall samples/s
+    """
+
+    rows = []
+
+    for report_index, report in enumerate(reports):
+        report = report.to_dict() if isinstance(report, StageTimer) else report
+
+        for record in report["Stages"]:
+            rows.append({"Report": report_index, "Stage": record["Stage"], "Self time": record["Self time"],
+                         "CPU time": record["CPU time"], "Peak RSS (MB)": record["Peak RSS (MB)"],
+                         "Samples": record["Samples"]})
+
+    columns = ["N subjects", "Mean time", "Median time", "Max time", "Total time", "CPU time", "Peak RSS (MB)",
+               "Samples", "Samples/s"]
+
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.DataFrame(rows)
+
+    # One value per report and stage (e.g. import of several devices)
+    per_subject = df.groupby(["Stage", "Report"], sort=False).agg({"Self time": "sum", "CPU time": "sum",
+                                                                   "Peak RSS (MB)": "max", "Samples": "sum"})
+
+    grouped = per_subject.groupby(level="Stage", sort=False)
+
+    summary = pd.DataFrame({"N subjects": grouped.size(),
+                            "Mean time": grouped["Self time"].mean(), "Median time": grouped["Self time"].median(),
+                            "Max time": grouped["Self time"].max(), "Total time": grouped["Self time"].sum(),
+                            "CPU time": grouped["CPU time"].sum(), "Peak RSS (MB)": grouped["Peak RSS (MB)"].max(),
+                            "Samples": grouped["Samples"].sum()})
+
+    summary["Samples/s"] = summary["Samples"].where(summary["Samples"] > 0) / summary["Total time"]
+
+    return summary[columns]
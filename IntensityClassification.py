@@ -0,0 +1,121 @@
+"""Epoch-by-epoch intensity classification shared by the wrist, ankle and heart rate models. Values are binned with
+   np.digitize into int8 categories (0 = sedentary, 1 = light, 2 = moderate, 3 = vigorous; -1 = invalid epoch) and
+   totals are counted with np.bincount.
+
+   Cut-points are dictionaries of the lower limit of each category: {"Light": x, "Moderate": y, "Vigorous": z}.
+"""
+
+import numpy as np
+import Headless
+
+CATEGORIES = ["Sedentary", "Light", "Moderate", "Vigorous"]
+INVALID = -1
+
+# Lower limits of each category
+HRR_CUTPOINTS = {"Light": 30, "Moderate": 40, "Vigorous": 60}  # %HRR
+METS_CUTPOINTS = {"Light": 1.5, "Moderate": 3.0, "Vigorous": 6.0}  # METs, ACSM
+
+
+def powell_cutpoints(sample_rate, epoch_len=15, dominant=False):
+    """Powell et al. (2017) wrist cut-points scaled to sampling rate and epoch length.
+
+    :argument
+    -sample_rate: accelerometer sampling rate, Hz (cut-points were developed at 30Hz)
+    -epoch_len: epoch length in seconds (cut-points were developed with 15-second epochs)
+    -dominant: boolean; dominant wrist cut-points if True, non-dominant if False
+    """
+
+    scale = sample_rate / 30 * epoch_len / 15
+
+    if dominant:
+        return {"Light": 51 * scale, "Moderate": 68 * scale, "Vigorous": 142 * scale}
+
+    return {"Light": 47 * scale, "Moderate": 64 * scale, "Vigorous": 157 * scale}
+
+
+def to_array(values):
+    """Converts list that can contain None to float array where None is NaN."""
+
+    return np.array([np.nan if i is None else i for i in values], dtype="float64") \
+        if isinstance(values, list) else np.asarray(values, dtype="float64")
+
+
+def classify(values, cutpoints, invalid=None):
+    """Categorizes each value using cut-points. Category i contains cutpoint[i - 1] <= value < cutpoint[i].
+
+    :argument
+    -values: epoch data. None/NaN values are invalid.
+    -cutpoints: dictionary of lower limits ({"Light": x, "Moderate": y, "Vigorous": z}) or sorted list
+    -invalid: optional boolean array; True for epochs that are set as invalid (e.g. invalid ECG)
+
+    :returns
+    -int8 array of categories; -1 for invalid epochs
+    """
+
+    values = to_array(values)
+    limits = list(cutpoints.values()) if isinstance(cutpoints, dict) else list(cutpoints)
+
+    mask = np.isnan(values)
+    if invalid is not None:
+        mask |= np.asarray(invalid, dtype=bool)
+
+    categories = np.full(len(values), INVALID, dtype="int8")
+
+    if not mask.all():
+        categories[~mask] = np.digitize(values[~mask], limits, right=False)
+
+    return categories
+
+
+def count_categories(categories, n_categories=4):
+    """Number of epochs in each category (invalid epochs not counted)."""
+
+    categories = np.asarray(categories)
+
+    return np.bincount(categories[categories >= 0], minlength=n_categories)[:n_categories]
+
+
+def intensity_totals(categories, epoch_len, n_epochs=None):
+    """Time in each category in minutes and as a proportion of n_epochs.
+
+    :argument
+    -categories: array from classify()
+    -epoch_len: epoch length in seconds
+    -n_epochs: denominator for proportions. Uses number of epochs if None.
+
+    :returns
+    -dictionary: "Sedentary", "Sedentary%", "Light", "Light%", ...
+    """
+
+    counts = count_categories(categories)
+    n_epochs = len(categories) if n_epochs is None else n_epochs
+
+    totals = {}
+    for name, count in zip(CATEGORIES, counts):
+        totals[name] = count / (60 / epoch_len)
+        totals[name + "%"] = round(count / n_epochs, 3) if n_epochs > 0 else 0
+
+    return totals
+
+
+def to_list(categories):
+    """Converts categories to list of int where invalid epochs are None."""
+
+    return [None if i == INVALID else int(i) for i in categories]
+
+
+def to_labels(categories, invalid_label=None):
+    """Converts categories to list of category names where invalid epochs are invalid_label."""
+
+    labels = np.array(CATEGORIES + [invalid_label], dtype=object)
+
+    # Invalid (-1) indexes the last label
+    return list(labels[np.asarray(categories)])
+
+
+def print_totals(title, totals):
+    """Prints minutes and percent of time in each category."""
+
+    Headless.report("\n" + title)
+    for name in CATEGORIES:
+        Headless.report("-{}: {} minutes ({}%)".format(name, totals[name], round(totals[name + "%"] * 100, 3)))
@@ -0,0 +1,79 @@
+"""Marks which epochs fall inside a set of time intervals (e.g. non-wear log removals, sleep periods).
+   Interval edges are located with np.searchsorted and filled with a difference array, so marking is
+   O(n log m) instead of comparing every epoch to every interval.
+"""
+
+import numpy as np
+
+
+def to_int64(timestamps):
+    """Converts timestamps (list of datetime/pd.Timestamp, pd.Series, TimeIndex or datetime64 array) to int64
+       nanoseconds. Missing values (NaT) become the minimum int64 value.
+    """
+
+    return np.asarray(timestamps, dtype="datetime64[ns]").astype("int64")
+
+
+def mark_index_intervals(n, starts, stops):
+    """Returns boolean array of length n that is True for indexes in any interval [start, stop) (same as setting
+       array[start:stop] for each interval). Intervals can overlap.
+
+    :argument
+    -n: length of output
+    -starts, stops: arrays of interval start and stop indexes
+    """
+
+    starts = np.clip(np.asarray(starts, dtype="int64"), 0, n)
+    stops = np.clip(np.asarray(stops, dtype="int64"), 0, n)
+
+    # Empty or reversed intervals are ignored
+    valid = stops > starts
+
+    # Difference array: +1 where an interval starts, -1 where it ends
+    diff = np.zeros(n + 1, dtype="int64")
+    np.add.at(diff, starts[valid], 1)
+    np.add.at(diff, stops[valid], -1)
+
+    return np.cumsum(diff[:-1]) > 0
+
+
+def mark_time_intervals(timestamps, start_times, stop_times, inclusive=True):
+    """Returns boolean array with one value per timestamp that is True for timestamps in any interval. Timestamps
+       must be sorted.
+
+    :argument
+    -timestamps: epoch timestamps
+    -start_times, stop_times: interval start and stop times
+    -inclusive: if True, timestamps equal to stop time are included (start <= timestamp <= stop).
+                If False, start <= timestamp < stop
+    """
+
+    times = to_int64(timestamps)
+    starts = to_int64(start_times)
+    stops = to_int64(stop_times)
+
+    index_starts = np.searchsorted(times, starts, side="left")
+    index_stops = np.searchsorted(times, stops, side="right" if inclusive else "left")
+
+    return mark_index_intervals(n=len(times), starts=index_starts, stops=index_stops)
+
+
+def intervals_to_status(n, intervals, fill=0):
+    """Creates status array from several sets of index intervals. Later sets overwrite earlier ones where they
+       overlap.
+
+    :argument
+    -n: length of output
+    -intervals: list of [value, starts, stops] with index intervals [start, stop)
+    -fill: value for indexes not in any interval
+
+    :returns
+    -numpy array
+    """
+
+    status = np.full(n, fill, dtype="float64")
+
+    for value, starts, stops in intervals:
+        status[mark_index_intervals(n=n, starts=starts, stops=stops)] = value
+
+    return status
@@ -0,0 +1,78 @@
+"""Deferred imports for plotting and statistics packages (matplotlib, scipy.stats, ecgdetectors, pingouin, sklearn,
+   statsmodels, seaborn). A module is only imported the first time one of its attributes is used, so importing the
+   processing modules (EDF import, epoching, quality check) does not pay for packages that are only needed for plots
+   or statistics. This matters for batch workers, which import the pipeline again in every process.
+
+   Usage:
+   plt = lazy_import("matplotlib.pyplot")
+   plt.plot(...)  # matplotlib.pyplot is imported here
+"""
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+
+    def __init__(self, name, on_load=None):
+        """Placeholder for module name that imports it on first attribute access.
+
+        :argument
+        -name: full module name (e.g. "matplotlib.pyplot")
+        -on_load: optional function called with the module after it is imported
+        """
+
+        super().__init__(name)
+        self.__dict__["_module"] = None
+        self.__dict__["_on_load"] = on_load
+
+    def _load(self):
+
+        if self.__dict__["_module"] is None:
+            module = importlib.import_module(self.__name__)
+
+            if self.__dict__["_on_load"] is not None:
+                self.__dict__["_on_load"](module)
+
+            self.__dict__["_module"] = module
+
+        return self.__dict__["_module"]
+
+    def __getattr__(self, attr):
+
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+
+        return dir(self._load())
+
+    def __repr__(self):
+
+        state = "loaded" if self.__dict__["_module"] is not None else "not loaded"
+
+        return "<lazy module '{}' ({})>".format(self.__name__, state)
+
+
+def lazy_import(name, on_load=None):
+    """Returns module name if it has already been imported, otherwise a LazyModule that imports it when first used.
+       Missing packages raise ImportError on first use instead of at import time.
+
+    :argument
+    -name: full module name
+    -on_load: optional function called with the module once it is imported (e.g. to register converters)
+    """
+
+    if name in sys.modules:
+        if on_load is not None:
+            on_load(sys.modules[name])
+
+        return sys.modules[name]
+
+    return LazyModule(name, on_load=on_load)
+
+
+def is_loaded(name):
+    """Whether module name has actually been imported."""
+
+    return name in sys.modules
@@ -0,0 +1,188 @@
+import numpy as np
+import os
+from datetime import datetime
+from datetime import timedelta
+
+
+class EDFChannel:
+
+    def __init__(self, records, label, sample_rate, physical_min, physical_max, digital_min, digital_max, n_samples):
+        """One channel of a memory-mapped EDF file. Data is stored as the strided int16 view into the file's data
+           records and converted to physical units only for the data points that are indexed.
+
+        :argument
+        -records: int16 array view of shape (number of data records, samples per record)
+        -label: channel label
+        -sample_rate: Hz
+        -physical_min, physical_max, digital_min, digital_max: scaling values from EDF header
+        -n_samples: number of data points in channel
+        """
+
+        self.records = records
+        self.label = label
+        self.sample_rate = sample_rate
+        self.n_samples = n_samples
+        self.samples_per_record = records.shape[1]
+
+        # physical = gain * (digital + offset), as in pyedflib
+        self.gain = (physical_max - physical_min) / (digital_max - digital_min)
+        self.offset = physical_max / self.gain - digital_max
+
+    def __len__(self):
+        return self.n_samples
+
+    def digital(self, start=0, stop=None):
+        """Returns int16 data from index start to stop. Only touches the data records that contain this section."""
+
+        stop = self.n_samples if stop is None else min(stop, self.n_samples)
+        start = min(max(start, 0), stop)
+
+        first_record = start // self.samples_per_record
+        last_record = (stop - 1) // self.samples_per_record + 1 if stop > start else first_record
+
+        # Copies only the records needed (channel data is not contiguous in the file)
+        data = self.records[first_record:last_record].reshape(-1)
+
+        return data[start - first_record * self.samples_per_record:stop - first_record * self.samples_per_record]
+
+    def physical(self, start=0, stop=None):
+        """Returns data from index start to stop in physical units (float64)."""
+
+        return self.gain * (self.digital(start=start, stop=stop).astype("float64") + self.offset)
+
+    def __getitem__(self, item):
+
+        if isinstance(item, slice) and item.step in [None, 1]:
+            start, stop, step = item.indices(self.n_samples)
+            return self.physical(start=start, stop=stop)
+
+        index = np.arange(self.n_samples)[item]
+        records, samples = np.divmod(index, self.samples_per_record)
+
+        return self.gain * (self.records[records, samples].astype("float64") + self.offset)
+
+
+class MemmapEDF:
+
+    def __init__(self, filepath):
+        """EDF reader that memory-maps the data records instead of decoding the whole file. Reading a window of data
+           only reads the pages of the file that contain it. Has the same methods as pyedflib.EdfReader used by
+           ImportEDF, so it can be used in its place (see SignalCache.open_edf).
+
+        :argument
+        -filepath: full pathway to EDF file
+        """
+
+        self.filepath = filepath
+
+        self.header = self.read_header()
+        self.signals_in_file = self.header["Number of signals"]
+
+        self.data = np.memmap(self.filepath, dtype="<i2", mode="r", offset=self.header["Header bytes"],
+                              shape=(self.header["Number of records"], self.header["Record samples"]))
+
+        self.channels = []
+
+        column = 0
+        for chn in range(self.signals_in_file):
+            n = self.header["Samples per record"][chn]
+
+            # Strided view: no data is read until indexed
+            self.channels.append(EDFChannel(records=self.data[:, column:column + n],
+                                            label=self.header["Signal labels"][chn],
+                                            sample_rate=self.header["Sample rates"][chn],
+                                            physical_min=self.header["Physical min"][chn],
+                                            physical_max=self.header["Physical max"][chn],
+                                            digital_min=self.header["Digital min"][chn],
+                                            digital_max=self.header["Digital max"][chn],
+                                            n_samples=n * self.header["Number of records"]))
+            column += n
+
+    def read_header(self):
+        """Reads fixed-width ASCII EDF header."""
+
+        with open(self.filepath, "rb") as file:
+            fixed = file.read(256).decode("latin-1")
+            n_signals = int(fixed[252:256])
+            signal_header = file.read(256 * n_signals).decode("latin-1")
+
+        def fields(start, width):
+            """Returns one field for each signal."""
+            offset = start * n_signals
+            return [signal_header[offset + i * width:offset + (i + 1) * width].strip() for i in range(n_signals)]
+
+        # Start date: dd.mm.yy, years 85-99 are 1900s
+        day, month, year = [int(i) for i in fixed[168:176].split(".")]
+        hour, minute, second = [int(i) for i in fixed[176:184].split(".")]
+        year += 1900 if year >= 85 else 2000
+
+        header_bytes = int(fixed[184:192])
+        record_duration = float(fixed[244:252])
+        samples_per_record = [int(i) for i in fields(216, 8)]
+        record_samples = sum(samples_per_record)
+
+        # Number of records is -1 if file was not closed properly
+        n_records = int(fixed[236:244])
+        if n_records < 0:
+            n_records = (os.path.getsize(self.filepath) - header_bytes) // (2 * record_samples)
+
+        sample_rates = [i / record_duration for i in samples_per_record]
+
+        return {"Start time": datetime(year, month, day, hour, minute, second),
+                "Header bytes": header_bytes,
+                "Number of records": n_records,
+                "Record duration": record_duration,
+                "Number of signals": n_signals,
+                "Signal labels": fields(0, 16),
+                "Physical dimension": fields(96, 8),
+                "Physical min": [float(i) for i in fields(104, 8)],
+                "Physical max": [float(i) for i in fields(112, 8)],
+                "Digital min": [int(i) for i in fields(120, 8)],
+                "Digital max": [int(i) for i in fields(128, 8)],
+                "Samples per record": samples_per_record,
+                "Record samples": record_samples,
+                "Sample rates": [int(i) if float(i).is_integer() else i for i in sample_rates]}
+
+    def get_index(self, chn, timestamp):
+        """Returns index in channel chn of the data point at timestamp."""
+
+        seconds = (timestamp - self.getStartdatetime()).total_seconds()
+
+        return int(seconds * self.channels[chn].sample_rate)
+
+    def read_window(self, chn, start_time, stop_time):
+        """Returns physical data for channel chn between two timestamps."""
+
+        return self.channels[chn].physical(start=max(self.get_index(chn, start_time), 0),
+                                           stop=max(self.get_index(chn, stop_time), 0))
+
+    # pyedflib.EdfReader methods used by ImportEDF ---------------------------------------------------------------
+    def readSignal(self, chn, start=0, n=None):
+        """Returns n data points from channel chn starting at index start. Reads to the end of file if n is None."""
+
+        return self.channels[chn].physical(start=start, stop=None if n is None else start + n)
+
+    def getSampleFrequencies(self):
+        return np.array(self.header["Sample rates"])
+
+    def getSampleFrequency(self, chn):
+        return self.header["Sample rates"][chn]
+
+    def getSignalLabels(self):
+        return self.header["Signal labels"]
+
+    def getStartdatetime(self):
+        return self.header["Start time"]
+
+    def getFileDuration(self):
+        return self.header["Number of records"] * self.header["Record duration"]
+
+    def getNSamples(self):
+        return np.array([len(i) for i in self.channels])
+
+    def getEndDatetime(self):
+        return self.getStartdatetime() + timedelta(seconds=self.getFileDuration())
+
+    def close(self):
+        self.channels = []
+        self.data = None
@@ -1,15 +1,19 @@
 import LocateParticipants
 from Subject import Subject
 import pandas as pd
-from statsmodels.stats.anova import AnovaRM
-from statsmodels.stats.multicomp import (pairwise_tukeyhsd, MultiComparison)
-import statsmodels.stats.power as smp
-from matplotlib import pyplot as plt
 import numpy as np
 import scipy
 import os
-import seaborn as sns
-import pingouin as pg
+from BatchRunner import BatchRunner
+from LazyImport import lazy_import
+
+# Statistics and plotting packages are imported on first use
+anova = lazy_import("statsmodels.stats.anova")  # anova.AnovaRM
+multicomp = lazy_import("statsmodels.stats.multicomp")  # multicomp.pairwise_tukeyhsd, multicomp.MultiComparison
+smp = lazy_import("statsmodels.stats.power")
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+pg = lazy_import("pingouin")
 
 
 usable_subjs = LocateParticipants.SubjectSubset(check_file="/Users/kyleweber/Desktop/Data/OND07/Tabular Data/"
@@ -64,3 +68,39 @@ def loop_subjects_standalone(subj_list):
 
         except:
             pass
+
+
+def loop_subjects_batch(subj_list, output_dir, n_workers=4, timeout=3600, overwrite=False):
+    """Runs every participant in subj_list with BatchRunner. Returns BatchRunner object with report
+       (status, errors and stage timings for each participant).
+    """
+
+    runner = BatchRunner(participant_list=subj_list,
+                         subject_kwargs=dict(
+                             # What data to load in
+                             load_ecg=True, load_ankle=True, load_wrist=True,
+                             load_raw_ecg=False, load_raw_ankle=False, load_raw_wrist=False,
+                             from_processed=True,
+
+                             # Model parameters
+                             rest_hr_window=60,
+                             n_epochs_rest_hr=30,
+                             hracc_threshold=30,
+                             epoch_len=15,
+
+                             # Data files
+                             raw_edf_folder="/Users/kyleweber/Desktop/Data/OND07/EDF/",
+                             treadmill_log_file="/Users/kyleweber/Desktop/Data/OND07/Tabular Data/Treadmill_Log.csv",
+                             demographics_file="/Users/kyleweber/Desktop/Data/OND07/Tabular Data/"
+                                               "Demographics_Data.csv",
+                             sleeplog_file="/Users/kyleweber/Desktop/Data/OND07/Tabular Data/SleepLogs_All.csv",
+                             output_dir="/Users/kyleweber/Desktop/Data/OND07/Processed Data/",
+                             processed_folder="/Users/kyleweber/Desktop/Data/OND07/Processed Data/Model Output/",
+                             write_results=False),
+                         output_dir=output_dir, n_workers=n_workers, timeout=timeout, overwrite=overwrite)
+
+    runner.run()
+
+    print(runner.summarize_timings())
+
+    return runner
@@ -1,14 +1,17 @@
 import os
 import numpy as np
 import pandas as pd
+import IntervalMarking
+import EpochData
+import Headless
 
 
 class NonwearLog:
 
     def __init__(self, subject_object):
 
-        print("")
-        print("=================================== ACCELEROMETER NONWEAR DATA ======================================")
+        Headless.report("")
+        Headless.report("============================== ACCELEROMETER NONWEAR DATA =================================")
 
         self.subject_object = subject_object
         self.subject_id = subject_object.subject_id
@@ -77,7 +80,7 @@ class NonwearLog:
 
             self.nonwear_dict["Number of Removals"] = self.nonwear_log.shape[0]
 
-            print("\nNon-wear log data imported. Found {} removals.".format(self.nonwear_log.shape[0]))
+            Headless.report("\nNon-wear log data imported. Found {} removals.".format(self.nonwear_log.shape[0]))
 
         """if self.file_loc is None or not os.path.exists(self.file_loc):
             
@@ -90,28 +93,27 @@ class NonwearLog:
         if self.file_loc is None or (self.file_loc is not None and not os.path.exists(self.file_loc)):
             self.status = np.zeros(self.subject_object.data_len)  # Pretends participant did not remove device
         if self.file_loc is not None and not os.path.exists(self.file_loc):
-            print("Non-wear log filepath is not valid.")
+            Headless.report("Non-wear log filepath is not valid.")
 
     def mark_nonwear_epochs(self):
         """Creates a list of len(epoch_timestamps) where worn is coded as 0 and non-wear coded as 1"""
 
         if self.file_loc is None or not os.path.exists(self.file_loc):
-            print("\nNo log found. Skipping non-wear epoch marking...")
+            Headless.report("\nNo log found. Skipping non-wear epoch marking...")
             return None
 
-        print("\nMarking non-wear epochs...")
+        Headless.report("\nMarking non-wear epochs...")
 
-        # Puts pd.df data into list --> mucho faster
-        off_stamps = [i for i in self.nonwear_log["DEVICEOFF"]]
-        on_stamps = [i for i in self.nonwear_log["DEVICEON"]]
+        # Epochs where DEVICEOFF <= timestamp <= DEVICEON for any removal
+        nonwear_mask = IntervalMarking.mark_time_intervals(timestamps=self.epoch_timestamps,
+                                                           start_times=self.nonwear_log["DEVICEOFF"],
+                                                           stop_times=self.nonwear_log["DEVICEON"], inclusive=True)
 
         # Creates list of 0s corresponding to each epoch
         epoch_list = np.zeros(self.subject_object.data_len)
 
-        for i, epoch_stamp in enumerate(self.epoch_timestamps):
-            for off, on in zip(off_stamps, on_stamps):
-                if off <= epoch_stamp <= on:
-                    epoch_list[i] = 1
+        n_epochs = min(len(nonwear_mask), len(epoch_list))
+        epoch_list[:n_epochs] = nonwear_mask[:n_epochs]
 
         self.status = epoch_list
 
@@ -120,5 +122,128 @@ class NonwearLog:
                                              (60 / self.subject_object.epoch_len) /
                                              len(self.status), 2)
 
-        print("Complete. Found {} hours, {} minutes of "
-              "non-wear time.".format(np.floor(self.nonwear_dict["Minutes"]/60), self.nonwear_dict["Minutes"] % 60))
+        Headless.report("Complete. Found {} hours, {} minutes of "
+                        "non-wear time.".format(np.floor(self.nonwear_dict["Minutes"]/60),
+                                                self.nonwear_dict["Minutes"] % 60))
+
+
+# ===================================== ACCELEROMETER NON-WEAR DETECTION ==============================================
+def accel_epoch_features(x, y, z, sample_rate, epoch_len=15):
+    """Calculates SD and range of each accelerometer axis for every epoch in one pass over the data.
+
+    :argument
+    -x, y, z: raw accelerometer data for each axis
+    -sample_rate: accelerometer sampling rate, Hz
+    -epoch_len: epoch length in seconds
+
+    :returns
+    -dictionary with arrays for "SD_X", "SD_Y", "SD_Z", "Range_X", "Range_Y", "Range_Z" and "AvgSD"
+    """
+
+    features = {}
+
+    for axis, data in zip(["X", "Y", "Z"], [x, y, z]):
+        epoched = EpochData.epoch_signal(data=data, sample_rate=sample_rate, epoch_len=epoch_len)
+
+        features["SD_" + axis] = epoched["SD"]
+        features["Range_" + axis] = epoched["Max"] - epoched["Min"]
+
+    features["AvgSD"] = (features["SD_X"] + features["SD_Y"] + features["SD_Z"]) / 3
+
+    return features
+
+
+def accel_nonwear_epochs(features, sd_thresh=3, range_thresh=50, avg_sd_thresh=None, n_axes=2):
+    """Flags epochs as non-wear from accelerometer SD and range.
+
+    :argument
+    -features: dictionary from accel_epoch_features()
+    -sd_thresh: SD threshold for each axis. None to not use.
+    -range_thresh: range threshold for each axis (mG). None to not use.
+    -avg_sd_thresh: threshold for SD averaged across axes. None to not use.
+    -n_axes: number of axes that need to be below sd_thresh or range_thresh
+
+    :returns
+    -boolean array; True for non-wear epochs
+    """
+
+    nonwear = np.zeros(len(features["AvgSD"]), dtype=bool)
+
+    if sd_thresh is not None:
+        axes_below_sd = sum([(features["SD_" + axis] <= sd_thresh).astype(int) for axis in ["X", "Y", "Z"]])
+        nonwear |= axes_below_sd >= n_axes
+
+    if range_thresh is not None:
+        axes_below_range = sum([(features["Range_" + axis] <= range_thresh).astype(int) for axis in ["X", "Y", "Z"]])
+        nonwear |= axes_below_range >= n_axes
+
+    if avg_sd_thresh is not None:
+        nonwear |= features["AvgSD"] <= avg_sd_thresh
+
+    return nonwear
+
+
+def window_nonwear(epoch_nonwear, n_epochs, n_epochs_thresh, end_gap=1):
+    """Applies the "N of M epochs" rule: every window of n_epochs that contains at least n_epochs_thresh non-wear
+       epochs is marked as non-wear. Each window is then extended until the first epoch that is followed by end_gap
+       wear epochs. Window counts are calculated with cumulative sums so run time is linear in the number of epochs.
+
+    :argument
+    -epoch_nonwear: boolean array of epoch-by-epoch non-wear
+    -n_epochs: window length in epochs
+    -n_epochs_thresh: number of non-wear epochs required in window
+    -end_gap: number of consecutive wear epochs that ends a non-wear period (1: ends at first wear epoch)
+
+    :returns
+    -boolean array; True for non-wear epochs
+    """
+
+    epoch_nonwear = np.asarray(epoch_nonwear, dtype=bool)
+    n = len(epoch_nonwear)
+    index = np.arange(n)
+
+    cumulative = np.concatenate([[0], np.cumsum(epoch_nonwear)])
+
+    # Number of non-wear epochs in window starting at each epoch (shorter windows at end of data)
+    window_count = cumulative[np.minimum(index + n_epochs, n)] - cumulative[index]
+    starts = index[window_count >= n_epochs_thresh]
+
+    # Epochs where no non-wear occurs in the next end_gap epochs
+    ahead_count = cumulative[np.minimum(index + end_gap, n)] - cumulative[index]
+    wear_ahead = index[ahead_count == 0]
+
+    # First such epoch at or after each window start
+    ends = np.append(wear_ahead, n)[np.searchsorted(wear_ahead, starts, side="left")]
+
+    return IntervalMarking.mark_index_intervals(n=n, starts=np.concatenate([starts, starts]),
+                                                stops=np.concatenate([starts + n_epochs, ends]))
+
+
+def find_bouts(status, timestamps=None):
+    """Run-length encodes non-wear status into bouts.
+
+    :argument
+    -status: boolean array; True for non-wear epochs
+    -timestamps: epoch timestamps. If given, start and end times are included.
+
+    :returns
+    -DataFrame with one row per bout: start_index, end_index (exclusive), n_epochs, and start_time/end_time
+    """
+
+    status = np.asarray(status, dtype=bool).astype("int8")
+
+    edges = np.diff(np.concatenate([[0], status, [0]]))
+    start_index = np.where(edges == 1)[0]
+    end_index = np.where(edges == -1)[0]
+
+    bouts = pd.DataFrame({"start_index": start_index, "end_index": end_index, "n_epochs": end_index - start_index})
+
+    if timestamps is not None:
+        timestamps = np.asarray(timestamps)
+
+        bouts["start_time"] = timestamps[start_index]
+
+        # end_time is the first wear epoch (last epoch if non-wear continues to end of data)
+        bouts["end_time"] = timestamps[np.minimum(end_index, len(timestamps) - 1)]
+
+    return bouts
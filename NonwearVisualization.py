@@ -208,7 +208,7 @@ class Data:
         # Left ankle -------------------------------------------------------------------------------------------------
         if os.path.exists(self.filename_blank.format("LAnkle")):
             la = GENEActiv(filepath=self.filename_blank.format("LAnkle"),
-                           load_raw=True, start_offset=start_index, end_offset=stop_index)
+                           load_raw=True, start_offset=start_index, end_offset=stop_index, memmap=True)
             la_time = la.timestamps
             lax = la.x
             lay = la.y
@@ -240,7 +240,7 @@ class Data:
         # Right ankle -------------------------------------------------------------------------------------------------
         if os.path.exists(self.filename_blank.format("RAnkle")):
             ra = GENEActiv(filepath=self.filename_blank.format("RAnkle"),
-                           load_raw=True, start_offset=start_index, end_offset=stop_index)
+                           load_raw=True, start_offset=start_index, end_offset=stop_index, memmap=True)
             ra_time = ra.timestamps
             rax = ra.x
             ray = ra.y
@@ -272,7 +272,7 @@ class Data:
         # Left wrist --------------------------------------------------------------------------------------------------
         if os.path.exists(self.filename_blank.format("LWrist")):
             lw = GENEActiv(filepath=self.filename_blank.format("LWrist"),
-                           load_raw=True, start_offset=start_index, end_offset=stop_index)
+                           load_raw=True, start_offset=start_index, end_offset=stop_index, memmap=True)
             lw_time = lw.timestamps
             lwx = lw.x
             lwy = lw.y
@@ -304,7 +304,7 @@ class Data:
         # Right wrist -------------------------------------------------------------------------------------------------
         if os.path.exists(self.filename_blank.format("RWrist")):
             rw = GENEActiv(filepath=self.filename_blank.format("RWrist"),
-                           load_raw=True, start_offset=start_index, end_offset=stop_index)
+                           load_raw=True, start_offset=start_index, end_offset=stop_index, memmap=True)
             rw_time = rw.timestamps
             rwx = rw.x
             rwy = rw.y
@@ -0,0 +1,137 @@
+"""Tests every combination of threshold values for a rule-based classifier at once. Each feature is compared with its
+   whole grid of thresholds as a boolean array, the arrays are broadcast against each other to count how many
+   conditions each data point meets for every combination, and performance is calculated with NumPy.
+
+   A "positive" is the class the rules detect (e.g. non-wear).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def condition_matrix(values, thresholds, direction="below"):
+    """Compares every value with every threshold.
+
+    :argument
+    -values: array of feature values (one per data point)
+    -thresholds: array of thresholds
+    -direction: "below" if the condition is met when value <= threshold; "above" if met when value >= threshold.
+                Missing values (NaN) always meet the condition, as in GoldStandardReview.recalculate_nonwear.
+
+    :returns
+    -boolean array of shape (len(thresholds), len(values))
+    """
+
+    values = np.asarray(values, dtype="float64")[None, :]
+    thresholds = np.asarray(thresholds, dtype="float64")[:, None]
+
+    if direction == "below":
+        return ~(values > thresholds)
+    if direction == "above":
+        return ~(values < thresholds)
+
+    raise ValueError("direction must be 'below' or 'above', not '{}'.".format(direction))
+
+
+def _count_outcomes(args):
+    """Counts true/false positives/negatives for every threshold combination. Runs in a worker when a pool is used.
+
+    :argument
+    -args: [list of condition matrices, boolean labels, number of conditions required]
+
+    :returns
+    -tp, fp: arrays with one axis per condition matrix
+    """
+
+    conditions, labels, n_conditions = args
+
+    n_grids = len(conditions)
+    shape = [len(i) for i in conditions]
+
+    # Number of conditions met for every combination and data point
+    n_met = np.zeros(shape + [len(labels)], dtype="int8")
+
+    for axis, condition in enumerate(conditions):
+        n_met += condition.reshape([1] * axis + [shape[axis]] + [1] * (n_grids - axis - 1) + [len(labels)])
+
+    positive = n_met >= n_conditions
+
+    tp = (positive & labels).sum(axis=-1)
+    fp = (positive & ~labels).sum(axis=-1)
+
+    return tp, fp
+
+
+def performance_metrics(tp, fp, fn, tn):
+    """Calculates performance for arrays of outcome counts. Rounding matches
+       GoldStandardReview.recalculate_nonwear.
+
+    :returns
+    -dictionary of arrays: "% Accuracy", "Sensitivity", "Specificity", "AUC", "Distance", "Youden"
+    """
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sens = tp / (tp + fn)
+        spec = tn / (tn + fp)
+
+    # AUC of a binary classifier is the mean of sensitivity and specificity
+    auc = (sens + spec) / 2
+
+    sens = np.round(sens, 3)
+    spec = np.round(spec, 3)
+
+    return {"% Accuracy": np.round(100 * (tp + tn) / (tp + fp + fn + tn), 1),
+            "Sensitivity": sens, "Specificity": spec,
+            "AUC": np.round(auc, 3),
+            "Distance": np.sqrt((1 - sens) ** 2 + (1 - spec) ** 2),
+            "Youden": np.round(sens + spec - 1, 1)}
+
+
+def sweep(features, labels, grids, n_conditions, chunk_size=None, pool=None):
+    """Calculates classifier performance for every combination of thresholds in grids. A data point is classified
+       as positive if it meets at least n_conditions conditions.
+
+    :argument
+    -features: dictionary (or DataFrame) of feature name: values
+    -labels: boolean array of gold standard; True for positives
+    -grids: list of [feature name, thresholds, direction] (see condition_matrix())
+    -n_conditions: number of conditions required to be classified as positive
+    -chunk_size: number of thresholds from the first grid processed at once. Lower values use less memory: each
+                 chunk needs chunk_size * (number of other combinations) * (number of data points) bytes.
+                 All at once if None.
+    -pool: executor or multiprocessing.Pool; chunks are processed with pool.map() if given
+
+    :returns
+    -DataFrame with one row per combination, ranked by Youden's index then distance to perfect performance
+    """
+
+    labels = np.asarray(labels, dtype=bool)
+
+    conditions = [condition_matrix(values=features[name], thresholds=thresholds, direction=direction)
+                  for name, thresholds, direction in grids]
+
+    chunk_size = len(grids[0][1]) if chunk_size is None else chunk_size
+
+    tasks = [[[conditions[0][i:i + chunk_size]] + conditions[1:], labels, n_conditions]
+             for i in range(0, len(grids[0][1]), chunk_size)]
+
+    results = list(pool.map(_count_outcomes, tasks) if pool is not None else map(_count_outcomes, tasks))
+
+    tp = np.concatenate([i[0] for i in results]).ravel()
+    fp = np.concatenate([i[1] for i in results]).ravel()
+    fn = labels.sum() - tp
+    tn = (~labels).sum() - fp
+
+    # Threshold values for each combination, in the same order as the counts
+    thresholds = np.meshgrid(*[np.asarray(i[1]) for i in grids], indexing="ij")
+
+    df = pd.DataFrame({name: values.ravel() for (name, _, _), values in zip(grids, thresholds)})
+    df.insert(0, "N conditions", n_conditions)
+
+    for key, values in performance_metrics(tp=tp, fp=fp, fn=fn, tn=tn).items():
+        df[key] = values
+
+    df = df.sort_values(by=["Youden", "Distance"], ascending=[False, True], kind="mergesort").reset_index(drop=True)
+    df.insert(0, "Rank", np.arange(1, df.shape[0] + 1))
+
+    return df
@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from Filtering import filter_signal
+from Filtering import filter_signals, BLOCK_LEN
 import matplotlib.dates as mdates
 from datetime import timedelta
 import math
@@ -104,65 +104,21 @@ class Data:
     def filter_accels(self, low_f=0.05, high_f=15, filter_type="lowpass"):
         print("\nFiltering data...")
 
-        # Left ankle
-        if self.df_la is not None:
-            print("-Left ankle")
-            self.df_la["x_filt"] = filter_signal(data=self.df_la["x"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_la["y_filt"] = filter_signal(data=self.df_la["y"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_la["z_filt"] = filter_signal(data=self.df_la["z"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-
-        # Right ankle
-        if self.df_ra is not None:
-            print("-Right ankle")
-            self.df_ra["x_filt"] = filter_signal(data=self.df_ra["x"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_ra["y_filt"] = filter_signal(data=self.df_ra["y"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_ra["z_filt"] = filter_signal(data=self.df_ra["z"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-
-        # Left wrist
-        if self.df_lw is not None:
-            print("-Left wrist")
-            self.df_lw["x_filt"] = filter_signal(data=self.df_lw["x"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_lw["y_filt"] = filter_signal(data=self.df_lw["y"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_lw["z_filt"] = filter_signal(data=self.df_lw["z"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.fs)
-
-        # Right wrist 1
-        if self.df_rw_d is not None:
-            print("-Right wrist #1")
-            self.df_rw_d["x_filt"] = filter_signal(data=self.df_rw_d["x"], filter_type=filter_type,
-                                                   low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_rw_d["y_filt"] = filter_signal(data=self.df_rw_d["y"], filter_type=filter_type,
-                                                   low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_rw_d["z_filt"] = filter_signal(data=self.df_rw_d["z"], filter_type=filter_type,
-                                                   low_f=low_f, high_f=high_f, sample_f=self.fs)
-
-        # Right wrist 2
-        if self.df_rw_p is not None:
-            print("-Right wrist #2")
-            self.df_rw_p["x_filt"] = filter_signal(data=self.df_rw_p["x"], filter_type=filter_type,
-                                                   low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_rw_p["y_filt"] = filter_signal(data=self.df_rw_p["y"], filter_type=filter_type,
-                                                   low_f=low_f, high_f=high_f, sample_f=self.fs)
-            self.df_rw_p["z_filt"] = filter_signal(data=self.df_rw_p["z"], filter_type=filter_type,
-                                                   low_f=low_f, high_f=high_f, sample_f=self.fs)
-
-        # Bittium Faros
-        if self.df_bf is not None:
-            print("-Bittium Faros")
-            self.df_bf["x_filt"] = filter_signal(data=self.df_bf["x"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.bf_fs)
-            self.df_bf["y_filt"] = filter_signal(data=self.df_bf["y"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.bf_fs)
-            self.df_bf["z_filt"] = filter_signal(data=self.df_bf["z"], filter_type=filter_type,
-                                                 low_f=low_f, high_f=high_f, sample_f=self.bf_fs)
+        for device, df, sample_f in [["Left ankle", self.df_la, self.fs],
+                                     ["Right ankle", self.df_ra, self.fs],
+                                     ["Left wrist", self.df_lw, self.fs],
+                                     ["Right wrist #1", self.df_rw_d, self.fs],
+                                     ["Right wrist #2", self.df_rw_p, self.fs],
+                                     ["Bittium Faros", self.df_bf, self.bf_fs]]:
+            if df is None:
+                continue
+
+            print("-" + device)
+
+            # Filters all three axes at once; block-wise zero-phase filter limits memory use on multi-day files
+            df[["x_filt", "y_filt", "z_filt"]] = filter_signals(data=df[["x", "y", "z"]].values.T,
+                                                                filter_type=filter_type, low_f=low_f, high_f=high_f,
+                                                                sample_f=sample_f, block_len=BLOCK_LEN).T
 
         print("Complete.")
 
@@ -3,7 +3,7 @@ import pandas as pd
 import numpy as np
 import matplotlib.dates as mdates
 from ImportEDF import GENEActiv
-from Filtering import filter_signal
+from Filtering import filter_signals
 
 xfmt = mdates.DateFormatter("%Y/%m/%d\n%H:%M:%S")
 
@@ -34,29 +34,12 @@ class Data:
 
         print("\nFiltering data...")
 
-        # Left ankle
-        self.la.x_filt = filter_signal(data=self.la.x, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.la.sample_rate)
-        self.la.y_filt = filter_signal(data=self.la.y, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.la.sample_rate)
-        self.la.z_filt = filter_signal(data=self.la.z, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.la.sample_rate)
-
-        # Left wrist
-        self.lw.x_filt = filter_signal(data=self.lw.x, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.lw.sample_rate)
-        self.lw.y_filt = filter_signal(data=self.lw.y, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.lw.sample_rate)
-        self.lw.z_filt = filter_signal(data=self.lw.z, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.lw.sample_rate)
-
-        # Right wrist
-        self.rw.x_filt = filter_signal(data=self.rw.x, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.rw.sample_rate)
-        self.rw.y_filt = filter_signal(data=self.rw.y, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.rw.sample_rate)
-        self.rw.z_filt = filter_signal(data=self.rw.z, filter_type=filter_type,
-                                       low_f=low_f, high_f=high_f, sample_f=self.rw.sample_rate)
+        # Filters x, y and z of each device in one call
+        for device in [self.la, self.lw, self.rw]:
+            device.x_filt, device.y_filt, device.z_filt = filter_signals(data=[device.x, device.y, device.z],
+                                                                         filter_type=filter_type,
+                                                                         low_f=low_f, high_f=high_f,
+                                                                         sample_f=device.sample_rate)
 
         print("Complete.")
 
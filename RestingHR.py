@@ -0,0 +1,101 @@
+"""Rolling-window resting heart rate. The rolling average is calculated from cumulative sums, with a count of invalid
+   epochs in each window so windows containing invalid HR are excluded, and the lowest windows are found with
+   np.partition instead of sorting. Run time is linear in the number of epochs.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def rolling_mean(values, window_len):
+    """Forward rolling mean: value at i is the mean of values[i:i + window_len] (shorter windows at the end of the
+       data). Windows containing an invalid value (None, NaN or 0) are NaN.
+
+    :argument
+    -values: epoch HR
+    -window_len: window length in epochs
+
+    :returns
+    -numpy array
+    """
+
+    values = np.array([np.nan if i is None else i for i in values], dtype="float64")
+    n = len(values)
+
+    invalid = np.isnan(values) | (values == 0)
+
+    cumulative = np.concatenate([[0], np.cumsum(np.where(invalid, 0, values))])
+    invalid_count = np.concatenate([[0], np.cumsum(invalid)])
+
+    index = np.arange(n)
+    stop = np.minimum(index + max(window_len, 1), n)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = (cumulative[stop] - cumulative[index]) / (stop - index)
+
+    means[invalid_count[stop] - invalid_count[index] > 0] = np.nan
+
+    return means
+
+
+def lowest_n_mean(values, n):
+    """Mean of the n lowest values, ignoring NaN. NaN if fewer than n values."""
+
+    values = np.asarray(values, dtype="float64")
+    values = values[~np.isnan(values)]
+
+    if len(values) < n or n < 1:
+        return np.nan
+
+    return np.partition(values, n - 1)[:n].mean()
+
+
+def resting_hr(epoch_hr, epoch_len=15, window_size=60, n_windows=30, sleep_status=None, timestamps=None):
+    """Calculates resting HR as the average of the n_windows lowest rolling averages. Uses only awake epochs if
+       sleep_status is given. Also calculates resting HR for each day if timestamps are given.
+
+    :argument
+    -epoch_hr: HR for each epoch; invalid epochs are None, NaN or 0
+    -epoch_len: epoch length in seconds
+    -window_size: length of rolling average window in seconds
+    -n_windows: number of lowest windows averaged
+    -sleep_status: optional list where 0 is awake for each epoch (Sleep.status). Other epochs are excluded.
+    -timestamps: optional epoch timestamps used for daily resting HR
+
+    :returns
+    -dictionary: "Rolling HR" (array), "Used" (boolean array of windows available for resting HR), "Resting HR",
+     "Daily" (dataframe of date and resting HR; None without timestamps)
+    """
+
+    rolling_hr = rolling_mean(values=epoch_hr, window_len=int(window_size / epoch_len))
+
+    used = ~np.isnan(rolling_hr)
+
+    if sleep_status is not None:
+        awake = np.zeros(len(rolling_hr), dtype=bool)
+
+        n = min(len(sleep_status), len(rolling_hr))
+        awake[:n] = np.asarray(sleep_status[:n]) == 0
+
+        used &= awake
+
+    output = {"Rolling HR": rolling_hr, "Used": used,
+              "Resting HR": lowest_n_mean(values=rolling_hr[used], n=n_windows), "Daily": None}
+
+    if timestamps is not None:
+        n = min(len(timestamps), len(rolling_hr))
+        dates = pd.DatetimeIndex(timestamps[:n]).date
+
+        unique_dates, date_index = np.unique(dates, return_inverse=True)
+
+        # Groups windows by date with one sort
+        values = np.where(used[:n], rolling_hr[:n], np.nan)[np.argsort(date_index, kind="stable")]
+        groups = np.split(values, np.cumsum(np.bincount(date_index, minlength=len(unique_dates)))[:-1])
+
+        daily = [lowest_n_mean(values=group, n=n_windows) for group in groups]
+
+        output["Daily"] = pd.DataFrame({"Date": unique_dates, "Resting HR": daily,
+                                        "Windows": np.bincount(date_index[used[:n]],
+                                                               minlength=len(unique_dates))})
+
+    return output
@@ -3,18 +3,19 @@ import Nonwear
 import SleepData
 import os
 import csv
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
 from datetime import datetime
-import scipy.stats
 import pandas as pd
 import numpy as np
 import warnings
 from pandas.plotting import register_matplotlib_converters
+from LazyImport import lazy_import
 
-register_matplotlib_converters()
 warnings.filterwarnings("ignore")
 
+# Plotting packages are imported on first use so processing starts immediately
+plt = lazy_import("matplotlib.pyplot", on_load=lambda module: register_matplotlib_converters())
+mdates = lazy_import("matplotlib.dates")
+
 x = Subject(
     subject_id=3028,
     study_code="OND07",
@@ -0,0 +1,260 @@
+"""On-disk cache for decoded EDF signals. The first time a file is read, every channel is decoded with pyedflib and
+   written to the cache directory as a .npy file along with a .json file containing the header details (start time,
+   sample rates, channel labels, duration). Later reads memory-map the .npy files instead of decoding the EDF.
+
+   Usage:
+   -Call enable_cache(cache_dir) once at the top of a script to cache every file read by ImportEDF, or
+   -Pass cache_dir to an ImportEDF class, or
+   -Call open_edf(filepath, cache_dir) anywhere pyedflib.EdfReader(filepath) is used to read signals.
+"""
+
+import pyedflib
+from MemmapEDF import MemmapEDF
+import Headless
+import numpy as np
+import os
+import json
+import hashlib
+import shutil
+from datetime import datetime
+from datetime import timedelta
+
+# Used by open_edf() when cache_dir is not given. Set with enable_cache()
+default_cache_dir = None
+default_max_size_gb = 20
+default_use_hash = False
+
+
+def enable_cache(cache_dir, max_size_gb=20, use_hash=False):
+    """Turns on caching for all EDF files opened with open_edf(), including every ImportEDF class.
+
+    :argument
+    -cache_dir: folder where cached signals are stored. Created if it does not exist.
+    -max_size_gb: cache size limit in GB. Least recently used files are removed when exceeded.
+    -use_hash: boolean; if True, files are identified by a hash of their contents instead of file size and
+               modification time. Slower, but survives files being copied or touched.
+    """
+
+    global default_cache_dir, default_max_size_gb, default_use_hash
+
+    default_cache_dir = cache_dir
+    default_max_size_gb = max_size_gb
+    default_use_hash = use_hash
+
+
+def disable_cache():
+    """Turns off caching set by enable_cache()."""
+
+    global default_cache_dir
+
+    default_cache_dir = None
+
+
+def open_edf(filepath, cache_dir=None, max_size_gb=None, use_hash=None, memmap=False):
+    """Opens an EDF file. Returns a CachedEDF if caching is on (cache_dir given or enable_cache() called), a
+       MemmapEDF if memmap is True, and a pyedflib.EdfReader otherwise. All have the same methods for reading signals
+       and header details. Use memmap=True when only a small section of a file is read.
+    """
+
+    cache_dir = default_cache_dir if cache_dir is None else cache_dir
+
+    if cache_dir is None and memmap:
+        return MemmapEDF(filepath)
+
+    if cache_dir is None:
+        return pyedflib.EdfReader(filepath)
+
+    cache = SignalCache(cache_dir=cache_dir,
+                        max_size_gb=default_max_size_gb if max_size_gb is None else max_size_gb,
+                        use_hash=default_use_hash if use_hash is None else use_hash)
+
+    return cache.open(filepath)
+
+
+class SignalCache:
+
+    def __init__(self, cache_dir, max_size_gb=20, use_hash=False):
+        """Folder of cached EDF signals. Each cached file has one .npy file per channel and a .json header file.
+
+        :argument
+        -cache_dir: folder where cached signals are stored
+        -max_size_gb: cache size limit in GB
+        -use_hash: boolean; identifies files by content hash instead of file size and modification time
+        """
+
+        self.cache_dir = cache_dir
+        self.max_size_gb = max_size_gb
+        self.use_hash = use_hash
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def get_key(self, filepath):
+        """Returns the cache key for a file. Changes if the file is modified."""
+
+        if self.use_hash:
+            file_hash = hashlib.sha1()
+
+            with open(filepath, "rb") as file:
+                for block in iter(lambda: file.read(2 ** 24), b""):
+                    file_hash.update(block)
+
+            return file_hash.hexdigest()
+
+        stats = os.stat(filepath)
+        file_id = "{}_{}_{}".format(os.path.abspath(filepath), stats.st_size, stats.st_mtime_ns)
+
+        return hashlib.sha1(file_id.encode()).hexdigest()
+
+    def entry_folder(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def open(self, filepath):
+        """Returns a CachedEDF for filepath. Decodes and caches the file first if it is not already cached."""
+
+        key = self.get_key(filepath)
+
+        if not os.path.exists(os.path.join(self.entry_folder(key), "header.json")):
+            self.write(filepath=filepath, key=key)
+            self.evict(keep=key)
+
+        return CachedEDF(folder=self.entry_folder(key))
+
+    def write(self, filepath, key):
+        """Decodes every channel in filepath and writes it to the cache."""
+
+        t0 = datetime.now()
+        Headless.report("Caching {}...".format(filepath))
+
+        folder = self.entry_folder(key)
+        temp_folder = folder + "_incomplete"
+
+        if os.path.exists(temp_folder):
+            shutil.rmtree(temp_folder)
+        os.makedirs(temp_folder)
+
+        file = pyedflib.EdfReader(filepath)
+
+        try:
+            header = {"Filepath": os.path.abspath(filepath),
+                      "Start time": file.getStartdatetime().isoformat(),
+                      "File duration": file.getFileDuration(),
+                      "Sample rates": [int(i) if float(i).is_integer() else float(i)
+                                       for i in file.getSampleFrequencies()],
+                      "Signal labels": [i for i in file.getSignalLabels()],
+                      "Cached": datetime.now().isoformat()}
+
+            for chn in range(file.signals_in_file):
+                np.save(os.path.join(temp_folder, "chn{}.npy".format(chn)), file.readSignal(chn))
+
+        finally:
+            file.close()
+
+        with open(os.path.join(temp_folder, "header.json"), "w") as header_file:
+            json.dump(header, header_file)
+
+        # Folder only gets its final name once complete so interrupted writes are never read
+        if os.path.exists(folder):
+            shutil.rmtree(folder)
+        os.rename(temp_folder, folder)
+
+        t1 = datetime.now()
+        Headless.report("Cached ({} seconds).".format(round((t1 - t0).total_seconds(), 1)))
+
+    def get_size(self, key):
+        """Size of a cached file in bytes."""
+
+        folder = self.entry_folder(key)
+
+        return sum([os.path.getsize(os.path.join(folder, i)) for i in os.listdir(folder)])
+
+    def evict(self, keep=None):
+        """Removes least recently used files until the cache is under max_size_gb. Never removes key keep."""
+
+        entries = []
+
+        for key in os.listdir(self.cache_dir):
+            header_file = os.path.join(self.entry_folder(key), "header.json")
+
+            if os.path.exists(header_file):
+                entries.append([os.path.getmtime(header_file), key, self.get_size(key)])
+
+        total_size = sum([i[2] for i in entries])
+
+        # Oldest access first
+        for last_used, key, size in sorted(entries):
+            if total_size <= self.max_size_gb * 1e9:
+                break
+
+            if key == keep:
+                continue
+
+            Headless.report("-Removing {} from cache (last used {}).".format(key, datetime.fromtimestamp(last_used)))
+            shutil.rmtree(self.entry_folder(key))
+            total_size -= size
+
+    def clear(self):
+        """Removes every file from the cache."""
+
+        for key in os.listdir(self.cache_dir):
+            shutil.rmtree(self.entry_folder(key))
+
+
+class CachedEDF:
+
+    def __init__(self, folder):
+        """Reads signals from a cached file. Has the same methods as pyedflib.EdfReader used by ImportEDF.
+
+        :argument
+        -folder: cache folder for one EDF file
+        """
+
+        self.folder = folder
+
+        with open(os.path.join(self.folder, "header.json"), "r") as header_file:
+            self.header = json.load(header_file)
+
+        # Updates modification time of header so eviction is least recently used
+        os.utime(os.path.join(self.folder, "header.json"))
+
+        self.signals_in_file = len(self.header["Signal labels"])
+
+        # Memory-maps every channel now so the file stays readable if it is later evicted from the cache
+        # Copy-on-write: changes to the data are never written to the cache
+        self.channels = [np.load(os.path.join(self.folder, "chn{}.npy".format(chn)), mmap_mode="c")
+                         for chn in range(self.signals_in_file)]
+
+    def get_channel(self, chn):
+        return self.channels[chn]
+
+    def readSignal(self, chn, start=0, n=None):
+        """Returns n data points from channel chn starting at index start. Reads to the end of file if n is None."""
+
+        data = self.get_channel(chn)
+        end = len(data) if n is None else min(start + n, len(data))
+
+        return data[start:end]
+
+    def getSampleFrequencies(self):
+        return np.array(self.header["Sample rates"])
+
+    def getSampleFrequency(self, chn):
+        return self.header["Sample rates"][chn]
+
+    def getSignalLabels(self):
+        return self.header["Signal labels"]
+
+    def getStartdatetime(self):
+        return datetime.fromisoformat(self.header["Start time"])
+
+    def getFileDuration(self):
+        return self.header["File duration"]
+
+    def getNSamples(self):
+        return np.array([len(self.get_channel(chn)) for chn in range(self.signals_in_file)])
+
+    def getEndDatetime(self):
+        return self.getStartdatetime() + timedelta(seconds=self.getFileDuration())
+
+    def close(self):
+        self.channels = []
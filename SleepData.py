@@ -3,6 +3,8 @@ import pandas as pd
 from datetime import datetime
 from datetime import timedelta
 import os
+import IntervalMarking
+import Headless
 
 
 class Sleep:
@@ -17,8 +19,8 @@ class Sleep:
 
     def __init__(self, subject_object):
 
-        print()
-        print("========================================= SLEEP LOG DATA ===========================================")
+        Headless.report()
+        Headless.report("==================================== SLEEP LOG DATA ======================================")
 
         self.file_loc = subject_object.sleeplog_file
         self.subject_object = subject_object
@@ -133,7 +135,7 @@ class Sleep:
         """Creates a list of len(epoch_timestamps) where awake is coded as 0, naps coded as 1, and
            overnight sleep coded as 2"""
 
-        print("\nMarking epochs as asleep or awake...")
+        Headless.report("\nMarking epochs as asleep or awake...")
 
         # Creates list of 0s corresponding to each epoch
         epoch_list = np.zeros(self.subject_object.data_len + 1)
@@ -152,13 +154,17 @@ class Sleep:
                     nap_indexes.append(int(val))
 
         # Sets sections of epoch_list to correct values ---------------------------------------------------------------
-        for start, stop in zip(overnight_indexes[::2], overnight_indexes[1::2]):
-            epoch_list[start:stop] = 2
+        # Naps are marked after overnight sleep so they take priority where they overlap
+        n_overnight = len(overnight_indexes) // 2
+        n_naps = len(nap_indexes) // 2
 
-        for start, stop in zip(nap_indexes[::2], nap_indexes[1::2]):
-            epoch_list[start:stop] = 1
+        epoch_list = IntervalMarking.intervals_to_status(n=len(epoch_list),
+                                                         intervals=[[2, overnight_indexes[:2 * n_overnight:2],
+                                                                     overnight_indexes[1:2 * n_overnight:2]],
+                                                                    [1, nap_indexes[:2 * n_naps:2],
+                                                                     nap_indexes[1:2 * n_naps:2]]])
 
-        print("Done.")
+        Headless.report("Done.")
 
         return epoch_list
 
@@ -199,18 +205,18 @@ class Sleep:
                                           len([i for i in nap_durations if i != "N/A"]), 1) if
                   len([j for j in nap_durations if j != "N/A"]) > 0 else 0}
 
-        print("\n" + "SLEEP REPORT")
+        Headless.report("\n" + "SLEEP REPORT")
 
-        print("-Total time asleep: {} minutes ({}%)".format(report["SleepDuration"], report["Sleep%"]))
+        Headless.report("-Total time asleep: {} minutes ({}%)".format(report["SleepDuration"], report["Sleep%"]))
 
-        print("\n" + "-Total overnight sleep: {} minutes ({}%)".format(report["OvernightSleepDuration"],
-                                                                       report["OvernightSleep%"]))
-        print("-Overnight sleep durations: {} minutes".format(report["OvernightSleepDurations"][:-1]))
-        print("-Average overnight sleep duration: {} minutes".format(report["AvgSleepDuration"]))
+        Headless.report("\n" + "-Total overnight sleep: {} minutes ({}%)".format(report["OvernightSleepDuration"],
+                                                                                 report["OvernightSleep%"]))
+        Headless.report("-Overnight sleep durations: {} minutes".format(report["OvernightSleepDurations"][:-1]))
+        Headless.report("-Average overnight sleep duration: {} minutes".format(report["AvgSleepDuration"]))
 
-        print("\n" + "-Total napping time: {} minutes ({}%)".format(report["NapDuration"], report["Nap%"]))
-        print("-Nap durations: {} minutes".format(report["NapDurations"]))
-        print("-Average nap duration: {} minutes".format(report["AvgNapDuration"]))
+        Headless.report("\n" + "-Total napping time: {} minutes ({}%)".format(report["NapDuration"], report["Nap%"]))
+        Headless.report("-Nap durations: {} minutes".format(report["NapDurations"]))
+        Headless.report("-Average nap duration: {} minutes".format(report["AvgNapDuration"]))
 
         # Updates values data df
         self.data["NIGHT_DURATION"] = sleep_durations
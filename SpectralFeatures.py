@@ -0,0 +1,133 @@
+"""Batched FFT features for every epoch in a recording. The signal is reshaped into an (n_epochs, epoch_samples)
+   matrix and a single rfft is run along axis 1, so no per-epoch DataFrames are created.
+
+   Spectra use the same scaling and frequency axis as the run_ecg_fft/run_accel_fft methods (power = |FFT| / N,
+   N // 2 frequencies from 0 Hz to the Nyquist frequency) so features match the values they return.
+"""
+
+import numpy as np
+import scipy.fft
+
+
+def epoch_matrix(data, sample_rate, epoch_len=15):
+    """Reshapes data into a 2D array with one row per epoch. Incomplete epochs at the end of the data are dropped.
+
+    :argument
+    -data: array-like signal
+    -sample_rate: sampling frequency of data, Hz
+    -epoch_len: epoch length in seconds
+
+    :returns
+    -numpy array of shape (n_epochs, epoch_len * sample_rate)
+    """
+
+    epoch_samples = sample_rate * epoch_len
+
+    if not float(epoch_samples).is_integer() or epoch_samples < 2:
+        raise ValueError("Epoch length of {} seconds at {} Hz is not a whole number of "
+                         "samples.".format(epoch_len, sample_rate))
+
+    epoch_samples = int(epoch_samples)
+    data = np.asarray(data, dtype="float64")
+    n_epochs = len(data) // epoch_samples
+
+    return data[:n_epochs * epoch_samples].reshape(n_epochs, epoch_samples)
+
+
+def epoch_spectra(epochs, sample_rate):
+    """Runs one FFT along axis 1 of an epoch matrix.
+
+    :argument
+    -epochs: array from epoch_matrix()
+    -sample_rate: sampling frequency of data, Hz
+
+    :returns
+    -frequencies: array of N // 2 frequencies
+    -power: array of shape (n_epochs, N // 2)
+    """
+
+    n = epochs.shape[1]
+
+    frequencies = np.linspace(0.0, sample_rate / 2, n // 2)
+    power = np.abs(scipy.fft.rfft(epochs, axis=1)[:, :n // 2]) / n
+
+    return frequencies, power
+
+
+def dominant_frequency(frequencies, power, min_f=0):
+    """Frequency with the highest power in each epoch, ignoring frequencies below min_f (Hz)."""
+
+    use = frequencies >= min_f
+
+    return frequencies[use][np.argmax(power[:, use], axis=1)]
+
+
+def cumulative_power_cutoff(frequencies, power, percent=90):
+    """Lowest frequency at which cumulative power reaches percent of the epoch's total power. NaN for epochs with
+       no power (flat signal).
+    """
+
+    cumulative = np.cumsum(power, axis=1)
+    total = cumulative[:, -1:]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        reached = cumulative / total >= percent / 100
+
+    cutoff = frequencies[np.argmax(reached, axis=1)]
+
+    return np.where(reached.any(axis=1), cutoff, np.nan)
+
+
+def band_power(frequencies, power, bands):
+    """Sum of power in each frequency band for each epoch.
+
+    :argument
+    -bands: dictionary of band name: [low, high] frequency (Hz); low <= f < high
+
+    :returns
+    -dictionary of band name: array
+    """
+
+    return {name: power[:, (frequencies >= low) & (frequencies < high)].sum(axis=1)
+            for name, (low, high) in bands.items()}
+
+
+def spectral_features(data, sample_rate, epoch_len=15, percent=90, bands=None, min_f=0, batch_size=1000):
+    """Calculates spectral features for every epoch in data. Epochs are processed in batches of batch_size to limit
+       memory use on long recordings.
+
+    :argument
+    -data: array-like signal
+    -sample_rate: sampling frequency of data, Hz
+    -epoch_len: epoch length in seconds
+    -percent: percent of cumulative power used for "Cutoff F"
+    -bands: dictionary of band name: [low, high] frequency (Hz). None for no band powers.
+    -min_f: lowest frequency considered for "Dominant F"
+    -batch_size: number of epochs in each FFT
+
+    :returns
+    -dictionary with arrays for "Dominant F", "Cutoff F" and each band in bands, one value per complete epoch, and
+     "Frequency" (frequencies of the spectra)
+    """
+
+    epochs = epoch_matrix(data=data, sample_rate=sample_rate, epoch_len=epoch_len)
+    bands = {} if bands is None else bands
+
+    output = {"Dominant F": [], "Cutoff F": []}
+    output.update({name: [] for name in bands.keys()})
+
+    frequencies = np.linspace(0.0, sample_rate / 2, epochs.shape[1] // 2)
+
+    for start in range(0, epochs.shape[0], batch_size):
+        frequencies, power = epoch_spectra(epochs=epochs[start:start + batch_size], sample_rate=sample_rate)
+
+        output["Dominant F"].append(dominant_frequency(frequencies=frequencies, power=power, min_f=min_f))
+        output["Cutoff F"].append(cumulative_power_cutoff(frequencies=frequencies, power=power, percent=percent))
+
+        for name, values in band_power(frequencies=frequencies, power=power, bands=bands).items():
+            output[name].append(values)
+
+    output = {key: np.concatenate(values) if len(values) > 0 else np.zeros(0) for key, values in output.items()}
+    output["Frequency"] = frequencies
+
+    return output
@@ -10,18 +10,23 @@ import ImportEDF
 import DeviceSync
 import ECG
 import Accelerometer
+import EpochTable
+import Headless
+import Instrumentation
+from LazyImport import lazy_import
 
 import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime
-import matplotlib.dates as mdates
 import warnings
 from pandas.plotting import register_matplotlib_converters
-register_matplotlib_converters()
 warnings.filterwarnings("ignore")
 
+# Plotting packages are imported on first use; pandas' datetime converters are registered once pyplot is loaded
+plt = lazy_import("matplotlib.pyplot", on_load=lambda module: register_matplotlib_converters())
+mdates = lazy_import("matplotlib.dates")
+
 
 # Gets Desktop pathway; used as default write directory
 try:
@@ -42,18 +47,21 @@ class Subject:
                  output_dir=desktop_path, processed_folder=None,
                  write_results=False, treadmill_log_file=None,
                  nonwear_log_file=None, sleeplog_file=None,
-                 demographics_file=None):
+                 demographics_file=None, epoch_file_format="parquet"):
 
-        print()
-        print("========================================= SUBJECT #{} "
-              "=============================================".format(subject_id))
-        print()
+        Headless.report()
+        Headless.report("========================================= SUBJECT #{} "
+                        "=============================================".format(subject_id))
+        Headless.report()
 
         # ============================================== DEFAULT VALUES ===============================================
 
         # Model objects
         self.wrist, self.ankle, self.ecg, self.hr_acc = None, None, None, None
 
+        # Time and memory of each processing stage, shared with device objects (see Instrumentation)
+        self.instrumentation = Instrumentation.StageTimer(name=subject_id)
+
         self.subject_id = subject_id  # 4-digit ID code
         self.raw_edf_folder = raw_edf_folder  # Folder where raw EDF files are stored
 
@@ -73,6 +81,7 @@ class Subject:
         self.write_results = write_results  # Whether to write results to CSV
 
         self.epoch_df = None
+        self.epoch_file_format = epoch_file_format  # "parquet", "feather" or "csv"; see EpochTable.write_epoch_file
 
         if self.from_processed:  # overrides write_results if reading from processed
             self.write_results = False
@@ -176,15 +185,17 @@ class Subject:
                 self.ecg_filepath = self.raw_edf_folder + self.ecg_filename
 
             if self.from_processed:
-                self.proc_filename = "OND07_WTL_{}_{}_EpochData.csv".format(self.subject_id, self.session_num)
-                self.proc_filepath = self.processed_folder + self.proc_filename
+                # Uses Parquet/Feather file if available, otherwise .csv
+                base_filename = "OND07_WTL_{}_{}_EpochData".format(self.subject_id, self.session_num)
+                self.proc_filepath = EpochTable.find_epoch_file(self.processed_folder + base_filename)
+                self.proc_filename = self.proc_filepath.split("/")[-1]
 
     # to cut
     def get_edf_filepaths(self):
         """Retrieves EDF filenames associated with current subject."""
 
         if self.load_raw_wrist + self.load_raw_ankle + self.load_raw_ecg >= 1:
-            print("Checking {} for EDF files...".format(self.raw_edf_folder))
+            Headless.report("Checking {} for EDF files...".format(self.raw_edf_folder))
 
         # Default values to return if no file(s) found
         # wrist_filename, wrist_temperature_filename, ankle_filename, ecg_filename = None, None, None, None
@@ -197,7 +208,7 @@ class Subject:
 
         # Returns Nones if no files found
         if len(subject_file_list) == 0:
-            print("-No files found for this subject ID.")
+            Headless.report("-No files found for this subject ID.")
 
             self.load_raw_wrist, self.load_raw_ankle, self.load_raw_ecg = False, False, False
 
@@ -218,12 +229,12 @@ class Subject:
             if len(wrist_filenames) == 1:
                 self.wrist_filepath = wrist_filenames[0]
             if len(wrist_filenames) == 0:
-                print("-Could not find the correct wrist accelerometer file.")
+                Headless.report("-Could not find the correct wrist accelerometer file.")
                 self.wrist_filepath = None
                 self.load_wrist = False
 
             if self.wrist_filepath is not None:
-                print("-Found {}".format(self.wrist_filepath.split("/")[-1]))
+                Headless.report("-Found {}".format(self.wrist_filepath.split("/")[-1]))
 
             if len(wrist_temperature_filenames) == 2:
                 self.wrist_temperature_filepath = [i for i in wrist_temperature_filenames if
@@ -231,11 +242,11 @@ class Subject:
             if len(wrist_temperature_filenames) == 1:
                 self.wrist_temperature_filepath = wrist_temperature_filenames[0]
             if len(wrist_temperature_filenames) == 0:
-                print("-Could not find the correct wrist temperature file.")
+                Headless.report("-Could not find the correct wrist temperature file.")
                 self.wrist_temperature_filepath = None
 
             if self.wrist_temperature_filepath is not None:
-                print("-Found {}".format(self.wrist_temperature_filepath.split("/")[-1]))
+                Headless.report("-Found {}".format(self.wrist_temperature_filepath.split("/")[-1]))
 
         # Loads ankle data --------------------------------------------------------------------------------------------
         if self.load_ankle and self.load_raw_ankle:
@@ -247,25 +258,25 @@ class Subject:
             if len(ankle_filenames) == 1:
                 self.ankle_filepath = ankle_filenames[0]
             if len(ankle_filenames) == 0:
-                print("-Could not find the correct ankle accelerometer file.")
+                Headless.report("-Could not find the correct ankle accelerometer file.")
                 self.ankle_filepath = None
                 self.load_ankle = None
 
             if self.ankle_filepath is not None:
-                print("-Found {}".format(self.ankle_filepath.split("/")[-1]))
+                Headless.report("-Found {}".format(self.ankle_filepath.split("/")[-1]))
 
         # Loads ECG data --------------------------------------------------------------------------------------------
         if self.load_ecg and self.load_raw_ecg:
             ecg_filename = [self.raw_edf_folder + i for i in subject_file_list if "BF" in i]
 
             if len([self.raw_edf_folder + i for i in subject_file_list if "BF" in i]) == 0:
-                print("-Could not find the correct ECG file.")
+                Headless.report("-Could not find the correct ECG file.")
                 self.ecg_filepath = None
                 self.load_ecg = None
 
             if len(ecg_filename) == 1:
                 self.ecg_filepath = ecg_filename[0]
-                print("-Found {}".format(self.ecg_filepath.split("/")[-1]))
+                Headless.report("-Found {}".format(self.ecg_filepath.split("/")[-1]))
 
         # Sets filenames from file pathways --------------------------------------------------------------------------
         if self.wrist_filepath is not None:
@@ -286,7 +297,7 @@ class Subject:
         """if not self.from_processed:
             return None
 
-        print("\nChecking {} for processed files...".format(self.processed_folder))
+        Headless.report("\nChecking {} for processed files...".format(self.processed_folder))
 
         subject_file_list = [i for i in os.listdir(self.processed_folder) if
                              ("csv" in i or "CSV" in i)
@@ -295,7 +306,7 @@ class Subject:
 
         # Returns Nones if no files found
         if len(subject_file_list) == 0:
-            print("-No processed files found for this subject ID.")
+            Headless.report("-No processed files found for this subject ID.")
 
             # Sets from_processed to False if no files found
             self.from_processed = False
@@ -318,12 +329,12 @@ class Subject:
             if len(wrist_filenames) == 1:
                 self.wrist_proc_filepath = wrist_filenames[0]
             if len(wrist_filenames) == 0:
-                print("-Could not find the correct wrist accelerometer file.")
+                Headless.report("-Could not find the correct wrist accelerometer file.")
                 self.wrist_proc_filepath = None
                 self.load_raw_wrist = False
 
             if self.wrist_proc_filepath is not None:
-                print("-Found {}".format(self.wrist_proc_filepath.split("/")[-1]))
+                Headless.report("-Found {}".format(self.wrist_proc_filepath.split("/")[-1]))
 
             # Selects correct wrist temperature file
             if len(wrist_temperature_filenames) == 2:
@@ -337,11 +348,11 @@ class Subject:
             if len(wrist_temperature_filenames) == 1:
                 self.wrist_temp_proc_filepath = wrist_temperature_filenames[0]
             if len(wrist_temperature_filenames) == 0:
-                print("-Could not find the correct wrist temperature file.")
+                Headless.report("-Could not find the correct wrist temperature file.")
                 self.wrist_temp_proc_filepath = None
 
             if self.wrist_temp_proc_filepath is not None:
-                print("-Found {}".format(self.wrist_temp_proc_filepath.split("/")[-1]))
+                Headless.report("-Found {}".format(self.wrist_temp_proc_filepath.split("/")[-1]))
 
         # Loads ankle data --------------------------------------------------------------------------------------------
         if self.load_ankle:
@@ -358,25 +369,25 @@ class Subject:
             if len(ankle_filenames) == 1:
                 self.ankle_proc_filepath = ankle_filenames[0]
             if len(ankle_filenames) == 0:
-                print("-Could not find the correct ankle accelerometer file.")
+                Headless.report("-Could not find the correct ankle accelerometer file.")
                 self.ankle_proc_filepath = None
                 self.load_raw_ankle = False
 
             if self.ankle_proc_filepath is not None:
-                print("-Found {}".format(self.ankle_proc_filepath.split("/")[-1]))
+                Headless.report("-Found {}".format(self.ankle_proc_filepath.split("/")[-1]))
 
         # Loads ECG data --------------------------------------------------------------------------------------------
         if self.load_ecg:
             ecg_filename = [self.processed_folder + i for i in subject_file_list if "BF" in i]
 
             if len([self.processed_folder + i for i in subject_file_list if "BF" in i]) == 0:
-                print("-Could not find the correct ECG file.")
+                Headless.report("-Could not find the correct ECG file.")
                 self.ecg_proc_filepath = None
                 self.load_ecg = False
 
             if len(ecg_filename) == 1:
                 self.ecg_proc_filepath = ecg_filename[0]
-                print("-Found {}".format(self.ecg_proc_filepath.split("/")[-1]))
+                Headless.report("-Found {}".format(self.ecg_proc_filepath.split("/")[-1]))
 
             # If mulitple data collection files found
             if len(ecg_filename) > 1:
@@ -402,14 +413,14 @@ class Subject:
         -demos_dict: dictionary containing demographics information
         """
 
-        print("\nChecking for demographics information...")
+        Headless.report("\nChecking for demographics information...")
 
         # Check to ensure file exists ---------------------------------------------------------------------------------
         if self.demographics_file is None:
-            print("-No demographics file input.")
+            Headless.report("-No demographics file input.")
             return None
         if not os.path.exists(self.demographics_file):
-            print("-Demographics file does not exist.")
+            Headless.report("-Demographics file does not exist.")
             return None
 
         # Loads correct demographics format: xlsx or csv --------------------------------------------------------------
@@ -425,7 +436,7 @@ class Subject:
             data_row = data.iloc[i]
             if str(self.subject_id) == data_row["SUBJECT"].split("_")[2]:
 
-                print("-Demographics information found for subject {}.".format(self.subject_id))
+                Headless.report("-Demographics information found for subject {}.".format(self.subject_id))
 
                 # Sets resting VO2 according to Kwan et al. (2004) values based on age/sex
                 missing_value = False
@@ -433,31 +444,31 @@ class Subject:
                 try:
                     self.demographics["Age"] = int(data_row["AGE"])
                 except ValueError:
-                    print("-No age was found. Default is 40 years.")
+                    Headless.report("-No age was found. Default is 40 years.")
                     missing_value = True
 
                 try:
                     self.demographics["Sex"] = data_row["SEX"]
                 except ValueError:
-                    print("-No sex was specified.")
+                    Headless.report("-No sex was specified.")
                     missing_value = True
 
                 try:
                     self.demographics["Weight"] = int(data_row["WEIGHT"])
                 except ValueError:
-                    print("-No weight was specified. Default is 1kg.")
+                    Headless.report("-No weight was specified. Default is 1kg.")
                     missing_value = True
 
                 try:
                     self.demographics["Height"] = int(data_row["HEIGHT"])
                 except ValueError:
-                    print("-No height was specified. Default is 1.00 m.")
+                    Headless.report("-No height was specified. Default is 1.00 m.")
                     missing_value = True
 
                 try:
                     self.demographics["Hand"] = data_row["HANDEDNESS"]
                 except ValueError:
-                    print("-No handedness was specified. Default is right-handed.")
+                    Headless.report("-No handedness was specified. Default is right-handed.")
                     missing_value = True
 
                 if self.demographics["Age"] < 65 and self.demographics["Sex"] == "Male":
@@ -476,11 +487,12 @@ class Subject:
                     self.demographics["RestVO2"] = rvo2
 
                 if not missing_value:
-                    print("-No demographics data are missing.")
+                    Headless.report("-No demographics data are missing.")
 
         if "BMI" not in self.demographics.keys():
             self.demographics["BMI"] = 1
 
+    @Instrumentation.timed(Instrumentation.CROP)
     def crop_files(self):
         """Method that checks timestamps from all EDF files and determines how many data points to crop off start/end
            of files so all device data starts and stops at the same time.
@@ -492,23 +504,23 @@ class Subject:
         end_dict = {"Ankle": 0, "Wrist": 0, "ECG": 0}
 
         if not self.crop_file_start and not self.crop_file_end:
-            print("\nData files are not being cropped.")
+            Headless.report("\nData files are not being cropped.")
 
         # Data cropping ===============================================================================================
         if self.crop_file_start or self.crop_file_end:
-            print("\n------------------------------------------------------------------------------------------------")
-            print("Checking file start/end times to perform file crop...")
+            Headless.report("\n--------------------------------------------------------------------------------------")
+            Headless.report("Checking file start/end times to perform file crop...")
 
             # Skips procedure if reading data from processed (already cropped) ---------------------------------------
             if self.load_raw_wrist + self.load_raw_ankle + self.load_raw_ecg == 0:
-                print("\nNo raw data are being imported. Skipping file crop.")
+                Headless.report("\nNo raw data are being imported. Skipping file crop.")
                 return None
 
             # Performs procedure if reading from raw -----------------------------------------------------------------
             if self.load_wrist + self.load_raw_ankle + self.load_raw_ecg >= 1:
 
                 # File summaries
-                print("\nRaw EDF file summaries:")
+                Headless.report("\nRaw EDF file summaries:")
                 ankle_start, ankle_end, ankle_fs = ImportEDF.check_file(self.ankle_filepath, print_summary=True)
                 wrist_start, wrist_end, wrist_fs = ImportEDF.check_file(self.wrist_filepath, print_summary=True)
                 ecg_start, ecg_end, ecg_fs = ImportEDF.check_file(self.ecg_filepath, print_summary=True)
@@ -538,24 +550,24 @@ class Subject:
 
                 # Updates dictionaries -------------------------------------------------------------------------------
                 if self.crop_file_start:
-                    print("Cropping start of files.")
+                    Headless.report("Cropping start of files.")
                     self.offset_dict["AnkleStart"] = start_dict["Ankle"]
                     self.offset_dict["WristStart"] = start_dict["Wrist"]
                     self.offset_dict["ECGStart"] = start_dict["ECG"]
 
-                    print("-Start indexes: ankle = {}, wrist = {}, ECG = {}".format(self.offset_dict["AnkleStart"],
-                                                                                    self.offset_dict["WristStart"],
-                                                                                    self.offset_dict["ECGStart"]))
+                    Headless.report("-Start indexes: ankle = {}, wrist = {}, "
+                                    "ECG = {}".format(self.offset_dict["AnkleStart"], self.offset_dict["WristStart"],
+                                                      self.offset_dict["ECGStart"]))
                 if self.crop_file_end:
-                    print("Cropping end of files.")
+                    Headless.report("Cropping end of files.")
                     self.offset_dict["AnkleEnd"] = end_dict["Ankle"]
                     self.offset_dict["WristEnd"] = end_dict["Wrist"]
                     self.offset_dict["ECGEnd"] = end_dict["ECG"]
 
-                    print("-Data points to be read: ankle = {}, "
-                          "wrist = {}, ECG = {}".format(self.offset_dict["AnkleEnd"],
-                                                        self.offset_dict["WristEnd"],
-                                                        self.offset_dict["ECGEnd"]))
+                    Headless.report("-Data points to be read: ankle = {}, "
+                                    "wrist = {}, ECG = {}".format(self.offset_dict["AnkleEnd"],
+                                                                  self.offset_dict["WristEnd"],
+                                                                  self.offset_dict["ECGEnd"]))
 
     def get_data_len(self):
 
@@ -593,7 +605,7 @@ class Subject:
                                start_offset=self.offset_dict["ECGStart"], end_offset=self.offset_dict["ECGEnd"],
                                age=self.demographics["Age"],
                                rest_hr_window=self.rest_hr_window, n_epochs_rest=self.n_epochs_rest_hr,
-                               output_dir=self.output_dir)
+                               output_dir=self.output_dir, instrumentation=self.instrumentation)
 
         # Objects from Accelerometer script ---------------------------------------------------------------------------
 
@@ -612,7 +624,9 @@ class Subject:
                                              end_offset=self.offset_dict["WristEnd"],
                                              ecg_object=self.ecg,
                                              output_dir=self.output_dir,
-                                             processed_folder=self.processed_folder)
+                                             processed_folder=self.processed_folder,
+                                             write_results=self.write_results,
+                                             instrumentation=self.instrumentation)
 
         # Ankle accelerometer
         # if self.load_ankle and (self.ankle_filepath is not None or self.ankle_proc_filepath is not None):
@@ -635,17 +649,19 @@ class Subject:
                                              remove_baseline=self.remove_epoch_baseline,
                                              processed_folder=self.processed_folder,
                                              treadmill_log_file=self.treadmill_log_file,
-                                             write_results=self.write_results)
+                                             write_results=self.write_results,
+                                             instrumentation=self.instrumentation)
 
         # No files
         if self.ankle_filepath is None and self.wrist_filepath is None and self.ecg_filepath is None and \
             self.ankle_proc_filepath is None and self.wrist_proc_filepath is None and self.ecg_proc_filepath is None:
-            print("No files were imported.")
+            Headless.report("No files were imported.")
             return None
 
+    @Instrumentation.timed(Instrumentation.EPOCH)
     def create_epoch_df(self, write_file=False):
 
-        print("\nCreating dataframe of all epoched data...")
+        Headless.report("\nCreating dataframe of all epoched data...")
 
         # Determines length of longest device data
         max_list = []
@@ -668,93 +684,61 @@ class Subject:
 
         max_len = max(max_list)
 
-        # Default lists of None
-        timestamps = [None for i in range(max_len)]
-        wrist_svm = [None for i in range(max_len)]
-        wrist_intensity_cat = [None for i in range(max_len)]
-        ankle_svm = [None for i in range(max_len)]
-        ankle_intensity_cat = [None for i in range(max_len)]
-        ankle_pred_mets = [None for i in range(max_len)]
-        ankle_pred_speed = [None for i in range(max_len)]
-        epoch_hr = [None for i in range(max_len)]
-        hrr = [None for i in range(max_len)]
-        hr_intensity = [None for i in range(max_len)]
-        ecg_validity = [None for i in range(max_len)]
-        sleep_status = [None for i in range(max_len)]
-        nonwear_status = [None for i in range(max_len)]
-
-        if not self.load_ankle and self.load_wrist:
-            timestamps = self.wrist.epoch.timestamps
-
-            wrist_svm = self.wrist.epoch.svm
-            wrist_intensity_cat = self.wrist.model.epoch_intensity
-
-            ankle_svm = [None for i in range(len(self.wrist.epoch.svm))]
-            ankle_intensity_cat = [None for i in range(len(self.wrist.epoch.svm))]
-            ankle_pred_mets = [None for i in range(len(self.wrist.epoch.svm))]
-            ankle_pred_speed = [None for i in range(len(self.wrist.epoch.svm))]
-
-        if not self.load_wrist and self.load_ankle:
-            timestamps = self.ankle.epoch.timestamps
-
-            ankle_svm = self.ankle.epoch.svm
-            ankle_intensity_cat = self.ankle.model.epoch_intensity
-            ankle_pred_mets = self.ankle.model.predicted_mets
-            ankle_pred_speed = self.ankle.model.linear_speed
-
-        if self.load_wrist and self.load_ankle:
-            timestamps = self.wrist.epoch.timestamps
-
-            wrist_svm = self.wrist.epoch.svm
-            wrist_intensity_cat = self.wrist.model.epoch_intensity
-
-            ankle_svm = self.ankle.epoch.svm
-            ankle_intensity_cat = self.ankle.model.epoch_intensity
-            ankle_pred_mets = self.ankle.model.predicted_mets
-            ankle_pred_speed = self.ankle.model.linear_speed
+        table = EpochTable.EpochTable(n_epochs=max_len, schema=EpochTable.SUBJECT_SCHEMA)
+
+        if self.load_wrist:
+            table.fill("Timestamps", self.wrist.epoch.timestamps)
+            table.fill("Wrist_SVM", self.wrist.epoch.svm)
+            table.fill("Wrist_Intensity", self.wrist.model.epoch_intensity)
+
+        if self.load_ankle:
+            if not self.load_wrist:
+                table.fill("Timestamps", self.ankle.epoch.timestamps)
+
+            table.fill("Ankle_SVM", self.ankle.epoch.svm)
+            table.fill("Ankle_Intensity", self.ankle.model.epoch_intensity)
+            table.fill("Ankle_METs", self.ankle.model.predicted_mets)
+            table.fill("Ankle_Speed", self.ankle.model.linear_speed)
 
         """REQUIRES UPDATE"""
         if self.load_ecg:
 
             if not self.load_wrist and not self.load_ankle:
-                timestamps = self.ecg.epoch_timestamps
-
-            epoch_hr = self.ecg.valid_hr
-            # hrr = self.ecg.perc_hrr
-            # hr_intensity = self.ecg.epoch_intensity
-            ecg_validity = ["Valid" if i == 0 else "Invalid" for i in self.ecg.epoch_validity]
-            hr_intensity = [None for i in range(self.data_len)]
+                table.fill("Timestamps", self.ecg.epoch_timestamps)
 
-        if self.sleep.status is not None:
-            sleep_status = ["Awake" if i == 0 else ("Napping" if i == 1 else "Asleep") for i in self.sleep.status]
+            table.fill("HR", self.ecg.valid_hr)
+            # table.fill("%HRR", self.ecg.perc_hrr)
+            # table.fill("HR_Intensity", self.ecg.epoch_intensity)
+            table.fill("ECG_Validity", self.ecg.epoch_validity)
 
-        if self.nonwear.status is not None:
-            nonwear_status = ["Wear" if i == 0 else "Nonwear" for i in self.nonwear.status]
+        table.fill("Sleep_Status", self.sleep.status)
+        table.fill("Nonwear_Status", self.nonwear.status)
 
-        # Doesn't lose data due to zip shortest list
-        df = pd.DataFrame({"Timestamps": pd.Series(timestamps), "Wrist_SVM": pd.Series(wrist_svm),
-                          "Wrist_Intensity": pd.Series(wrist_intensity_cat), "Ankle_SVM": pd.Series(ankle_svm),
-                           "Ankle_Intensity": pd.Series(ankle_intensity_cat),
-                           "Ankle_Speed": pd.Series(ankle_pred_speed), "Ankle_METs": pd.Series(ankle_pred_mets),
-                           "HR": pd.Series(epoch_hr), "%HRR": pd.Series(hrr),
-                           "HR_Intensity": pd.Series(hr_intensity),
-                           "ECG_Validity": pd.Series(ecg_validity), "Sleep_Status": pd.Series(sleep_status),
-                           "Nonwear_Status": pd.Series(nonwear_status)})
+        # Columns are padded to the longest device so no data is lost
+        df = table.to_dataframe()
 
-        print("Complete.")
+        Headless.report("Complete.")
 
         if write_file:
-            print("Saved df to .csv")
-            df.to_csv(self.processed_folder + self.proc_filename, index=False)
+            filename = "OND07_WTL_{}_{}_EpochData{}".format(self.subject_id, self.session_num,
+                                                            EpochTable.FILE_EXTENSIONS[self.epoch_file_format])
+
+            with self.instrumentation.stage(Instrumentation.WRITE, n_samples=df.shape[0], source="Subject"):
+                filepath = EpochTable.write_epoch_file(df, self.processed_folder + filename)
+
+            Headless.report("Saved df to {}".format(os.path.basename(filepath)))
 
         return df
 
     def import_epoch_df(self):
 
         if self.from_processed:
-            print("\nImporting epoched data...")
-            self.epoch_df = pd.read_csv(self.proc_filepath)
-            print("Done.")
+            Headless.report("\nImporting epoched data...")
+            with self.instrumentation.stage(Instrumentation.IMPORT, source="Subject") as record:
+                self.epoch_df = EpochTable.read_epoch_file(self.proc_filepath, schema=EpochTable.SUBJECT_SCHEMA)
+                record["Samples"] = self.epoch_df.shape[0]
+
+            Headless.report("Done.")
         if not self.from_processed:
             return None
 
@@ -768,13 +752,14 @@ class Subject:
         """
 
         if self.load_ecg and (self.load_wrist or self.load_ankle):
-            print("\nCreating ECG signal validity contingency table based on wrist and ankle intensity data...")
+            Headless.report("\nCreating ECG signal validity contingency table based on wrist and ankle "
+                            "intensity data...")
         if not self.load_ecg:
-            print("\nCannot create ECG signal validity contingency table based on accelerometer data.")
-            print("-Please load some ECG data and try again.")
+            Headless.report("\nCannot create ECG signal validity contingency table based on accelerometer data.")
+            Headless.report("-Please load some ECG data and try again.")
         if self.load_ecg and not self.load_wrist and not self.load_ankle:
-            print("\nCannot create ECG signal validity contingency table based on accelerometer data.")
-            print("-Please load some accelerometer data and try again.")
+            Headless.report("\nCannot create ECG signal validity contingency table based on accelerometer data.")
+            Headless.report("-Please load some accelerometer data and try again.")
 
         def using_intensity():
 
@@ -992,7 +977,7 @@ class Subject:
 
         validity_df = validity_df.round(2)
 
-        print("Complete.")
+        Headless.report("Complete.")
 
         return validity_df
 
@@ -0,0 +1,108 @@
+import numpy as np
+
+
+class TimeIndex:
+
+    def __init__(self, starttime, sample_rate, n_samples, first=0, step=1):
+        """Lightweight replacement for a materialized array of timestamps. Stores only the start time, sample rate
+           and number of samples. Timestamps are calculated from the data index when they are needed.
+
+        :argument
+        -starttime: timestamp of the first data point (datetime, pd.Timestamp, np.datetime64 or string)
+        -sample_rate: sampling frequency, Hz
+        -n_samples: number of data points
+        -first, step: used internally when slicing (index of first sample and stride relative to starttime)
+        """
+
+        self.starttime = np.datetime64(starttime, "ns")
+        self.sample_rate = sample_rate
+        self.n_samples = int(n_samples)
+        self.first = first
+        self.step = step
+
+    def __len__(self):
+        return self.n_samples
+
+    def __repr__(self):
+        return "TimeIndex(start={}, sample_rate={}, n_samples={})".format(self[0] if len(self) > 0 else None,
+                                                                           self.sample_rate / self.step,
+                                                                           self.n_samples)
+
+    def _to_datetime(self, index):
+        """Converts data index(es) in this view to datetime64[ns]."""
+
+        seconds = (self.first + np.asarray(index, dtype="float64") * self.step) / self.sample_rate
+
+        return self.starttime + np.round(seconds * 1e9).astype("int64").astype("timedelta64[ns]")
+
+    def __getitem__(self, item):
+
+        # Slicing returns another TimeIndex; no timestamps are created
+        if isinstance(item, slice):
+            r = range(self.n_samples)[item]
+            return TimeIndex(starttime=self.starttime, sample_rate=self.sample_rate, n_samples=len(r),
+                             first=self.first + r.start * self.step, step=self.step * r.step)
+
+        # Integer or array indexing returns np.datetime64 values
+        index = np.asarray(item)
+
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+
+        index = np.where(index < 0, index + self.n_samples, index)
+
+        if np.any((index < 0) | (index >= self.n_samples)):
+            raise IndexError("TimeIndex index out of range.")
+
+        return self._to_datetime(index)
+
+    def __iter__(self):
+        # Materializes in chunks to keep memory bounded
+        for start in range(0, self.n_samples, 100000):
+            for stamp in self._to_datetime(np.arange(start, min(start + 100000, self.n_samples))):
+                yield stamp
+
+    def __array__(self, dtype=None, copy=None):
+        stamps = self.materialize()
+
+        if dtype is not None:
+            stamps = stamps.astype(dtype)
+
+        return stamps
+
+    def materialize(self):
+        """Returns full array of timestamps (datetime64[ns]). Use for plotting or short segments only."""
+
+        return self._to_datetime(np.arange(self.n_samples))
+
+    def searchsorted(self, timestamp, side="left"):
+        """Returns the data index where timestamp(s) would be inserted to maintain order. Equivalent to
+           np.searchsorted() on the materialized array but calculated arithmetically.
+
+        :argument
+        -timestamp: single timestamp or array of timestamps
+        -side: "left" or "right", as in np.searchsorted()
+        """
+
+        stamps = np.asarray(timestamp, dtype="datetime64[ns]")
+
+        # Position in samples relative to starttime, then relative to this view
+        seconds = (stamps - self.starttime).astype("int64") / 1e9
+        position = (seconds * self.sample_rate - self.first) / self.step
+
+        # Rounding tolerance so timestamps that fall exactly on a sample are not shifted by float error
+        position = np.round(position, 6)
+
+        if side == "left":
+            index = np.ceil(position)
+        if side == "right":
+            index = np.floor(position) + 1
+
+        index = np.clip(index, 0, self.n_samples).astype("int64")
+
+        return index if index.ndim > 0 else int(index)
+
+    def get_index(self, timestamp):
+        """Returns the index of the data point that occurs at or immediately before timestamp."""
+
+        return max(self.searchsorted(timestamp, side="right") - 1, 0)
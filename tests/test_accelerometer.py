@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("pyedflib")  # Accelerometer imports ImportEDF
+
+import Accelerometer
+import IntensityClassification
+
+
+def test_wrist_model_valid_ecg_uses_validity_labels():
+    svm = [0, 100, 300, 600, 0, 100, 300, 600]
+    validity = ["Valid", "Valid", "Valid", "Valid", "Invalid", "Invalid", "Invalid", "Invalid"]
+
+    accel = SimpleNamespace(epoch_len=15, raw=SimpleNamespace(sample_rate=75), epoch=SimpleNamespace(svm=svm))
+    ecg = SimpleNamespace(epoch_validity=validity)
+
+    model = Accelerometer.WristModel(accel_object=accel, ecg_object=ecg,
+                                     cutpoints={"Light": 50, "Moderate": 200, "Vigorous": 500})
+
+    # Only the first four epochs (valid ECG) are classified
+    assert model.epoch_intensity_valid[:4] == [0, 1, 2, 3]
+    assert all([i is None for i in model.epoch_intensity_valid[4:]])
+
+    expected = IntensityClassification.intensity_totals(categories=IntensityClassification.classify(
+        values=svm[:4], cutpoints=model.cutpoints), epoch_len=15, n_epochs=4)
+
+    assert model.intensity_totals_valid == expected
+    assert model.intensity_totals_valid["Light"] > 0
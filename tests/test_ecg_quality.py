@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+pytest.importorskip("pyedflib")  # ECG imports ImportEDF
+
+import ECG
+
+FS = 250
+EPOCH_LEN = 15
+
+
+def synthetic_ecg():
+    """Returns a fake ECG object and its R peak indexes. Epochs cover valid rhythms, noise only, too few beats,
+       long RR gaps, irregular beats, low voltage and an RR ratio close to the threshold.
+    """
+
+    rng = np.random.default_rng(0)
+    epoch_samples = EPOCH_LEN * FS
+
+    qrs = np.exp(-0.5 * (np.arange(-12, 13) / 3) ** 2)
+
+    rr_intervals = [[.8], [.65, .7, .75], [.8], [.8, .8, .8, .8, .8, 3.5], [2.5], [.5, 1.4], [.6], [.9, 1.0],
+                    [.6, .6, 1.45]]
+    amplitudes = [1000, 800, 0, 900, 1000, 1200, 100, 700, 900]
+
+    signal = rng.normal(scale=20, size=len(rr_intervals) * epoch_samples)
+    r_peaks = []
+
+    for epoch, (rr, amplitude) in enumerate(zip(rr_intervals, amplitudes)):
+        start = epoch * epoch_samples
+
+        # Noise only: peaks are detected but there are no beats
+        if amplitude == 0:
+            signal[start:start + epoch_samples] = rng.normal(scale=300, size=epoch_samples)
+
+        peak = start + int(rng.integers(20, 200))
+        beat = 0
+        while peak < start + epoch_samples - 12:
+            signal[peak - 12:peak + 13] += amplitude * qrs
+            r_peaks.append(peak)
+
+            peak += int(rr[beat % len(rr)] * FS)
+            beat += 1
+
+    ecg = SimpleNamespace(sample_rate=FS, raw=signal, filtered=signal, load_accel=False,
+                          accel_sample_rate=None, accel_vm=None)
+
+    return ecg, np.array(r_peaks)
+
+
+def test_batch_rule_check_matches_check_quality():
+    ecg, r_peaks = synthetic_ecg()
+
+    start_indexes = np.arange(0, len(ecg.raw), EPOCH_LEN * FS)
+    bounds = np.searchsorted(r_peaks, np.append(start_indexes, start_indexes[-1] + EPOCH_LEN * FS))
+    epoch_peaks = [r_peaks[bounds[i]:bounds[i + 1]] - start_indexes[i] for i in range(len(start_indexes))]
+
+    rule_check = ECG.batch_rule_check(ecg_object=ecg, start_indexes=start_indexes, r_peaks=epoch_peaks,
+                                      epoch_len=EPOCH_LEN)
+
+    validity = []
+
+    for i, start_index in enumerate(start_indexes):
+        qc = ECG.CheckQuality(ecg_object=ecg, start_index=start_index, epoch_len=EPOCH_LEN, r_peaks=epoch_peaks[i])
+
+        for key, value in qc.rule_check_dict.items():
+            if key not in rule_check:
+                continue
+
+            batch_value = rule_check[key][i]
+
+            if value is None:
+                assert np.isnan(batch_value), "{} (epoch {})".format(key, i)
+            else:
+                assert batch_value == value, "{} (epoch {})".format(key, i)
+
+        assert rule_check["Valid Period"][i] == bool(qc.valid_period)
+        assert rule_check["Epoch Voltage Range"][i] == qc.volt_range
+
+        if qc.valid_period:
+            assert rule_check["Epoch HR"][i] == round(qc.hr, 2)
+            assert rule_check["RR SD"][i] == pytest.approx(qc.rr_sd)
+            assert list(rule_check["R Peaks"][i]) == qc.r_peaks_index_all
+            assert list(rule_check["Removed Peaks"][i] - start_index) == qc.removed_peak
+
+        validity.append(bool(qc.valid_period))
+
+    # Synthetic data includes both valid and invalid epochs
+    assert any(validity) and not all(validity)
+
+
+def test_check_quality_chunk_batch_matches_per_epoch():
+    ecg, r_peaks = synthetic_ecg()
+
+    batch = ECG.check_quality_chunk(ecg_object=ecg, chunk_start=1000, epoch_len=EPOCH_LEN, r_peaks=r_peaks,
+                                    batch_rules=True)
+    per_epoch = ECG.check_quality_chunk(ecg_object=ecg, chunk_start=1000, epoch_len=EPOCH_LEN, r_peaks=r_peaks,
+                                        batch_rules=False)
+
+    assert batch["Validity"] == per_epoch["Validity"]
+    assert batch["HR"] == per_epoch["HR"]
+    assert batch["Voltage Range"] == per_epoch["Voltage Range"]
+    assert np.allclose(batch["RR SD"], per_epoch["RR SD"])
+    assert sorted(batch["R Peaks"]) == sorted(per_epoch["R Peaks"])
+
+
+def test_check_quality_chunk_batch_empty_data():
+    ecg = SimpleNamespace(sample_rate=FS, raw=np.array([]), filtered=np.array([]), load_accel=False,
+                          accel_sample_rate=None, accel_vm=None)
+
+    results = ECG.check_quality_chunk(ecg_object=ecg, chunk_start=0, epoch_len=EPOCH_LEN, r_peaks=np.array([]),
+                                      batch_rules=True)
+
+    assert results == {"Validity": [], "HR": [], "Voltage Range": [], "RR SD": [], "R Peaks": []}
@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import EpochData
+from TimeIndex import TimeIndex
+
+
+class FakeRaw:
+    """Stands in for ImportEDF.GENEActiv: triaxial data with TimeIndex timestamps."""
+
+    def __init__(self, n_seconds=600, sample_rate=75):
+        rng = np.random.default_rng(0)
+        n = n_seconds * sample_rate
+
+        self.x, self.y, self.z = rng.normal(0, 1, n), rng.normal(0, 1, n), rng.normal(0, 1, n)
+        self.sample_rate = sample_rate
+        self.timestamps = TimeIndex(starttime="2020-01-01 10:00:00", sample_rate=sample_rate, n_samples=n)
+        self.vm = None
+
+
+def test_epoch_from_raw_with_time_index():
+    raw = FakeRaw()
+
+    epoch = EpochData.EpochAccel(raw_data=raw, raw_filename="Test.EDF", from_processed=False, epoch_len=15)
+
+    expected = EpochData.epoch_signal(data=raw.vm, sample_rate=raw.sample_rate, epoch_len=15, correct_padding=True)
+
+    assert len(epoch.svm) == 40
+    assert np.allclose(epoch.svm, np.round(expected["Sum"], 5))
+
+    timestamps = epoch.pyramid.get_epochs(epoch_len=5)["Timestamps"]
+
+    assert len(timestamps) == 120
+    assert (timestamps[1] - timestamps[0]).total_seconds() == 5
+    assert np.datetime64(timestamps[0], "ns") == raw.timestamps[0]
+
+
+def test_epoch_pyramid_only_saved_if_requested(tmp_path):
+    filepath = EpochData.get_pyramid_filepath(folder=str(tmp_path), raw_filename="Test.EDF")
+
+    EpochData.EpochAccel(raw_data=FakeRaw(), raw_filename="Test.EDF", from_processed=False, epoch_len=15,
+                         processed_folder=str(tmp_path))
+
+    assert not os.path.exists(filepath)
+
+    epoch = EpochData.EpochAccel(raw_data=FakeRaw(), raw_filename="Test.EDF", from_processed=False, epoch_len=15,
+                                 processed_folder=str(tmp_path), save_pyramid=True)
+
+    assert os.path.exists(filepath)
+    assert np.allclose(EpochData.EpochPyramid(filepath=filepath).sum, epoch.pyramid.sum)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from scipy.signal import sosfiltfilt
+
+import Filtering
+
+
+def random_walk(n_samples, n_channels=None, seed=0):
+    """Drifting signal with noise; low-frequency content makes highpass edge effects visible."""
+
+    rng = np.random.default_rng(seed)
+    shape = n_samples if n_channels is None else (n_channels, n_samples)
+
+    return np.cumsum(rng.normal(size=shape), axis=-1) + rng.normal(scale=5, size=shape)
+
+
+@pytest.mark.parametrize("filter_type, low_f, high_f, sample_f, filter_order",
+                         [("bandpass", .5, 15, 250, 4),
+                          ("lowpass", 20, None, 75, 4),
+                          ("highpass", None, .05, 100, 2)])  # low cut-off: largest pad_len
+def test_blockwise_filter_matches_sosfiltfilt(filter_type, low_f, high_f, sample_f, filter_order):
+    sos = Filtering.design_filter(filter_type=filter_type, low_f=low_f, high_f=high_f, sample_f=sample_f,
+                                  filter_order=filter_order)
+    pad_len = Filtering.settling_samples(sos)
+    block_len = max(pad_len // 2, 1000)
+
+    # Several blocks, each with overlap on both sides
+    data = random_walk(n_samples=6 * pad_len + 8 * block_len + 123)
+    assert len(data) > block_len + 2 * pad_len
+
+    filtered = Filtering.filter_signal(data=data, filter_type=filter_type, low_f=low_f, high_f=high_f,
+                                       sample_f=sample_f, filter_order=filter_order, block_len=block_len)
+
+    assert filtered.shape == data.shape
+    assert np.allclose(filtered, sosfiltfilt(sos, data), rtol=0, atol=1e-8)
+
+
+def test_blockwise_filter_multichannel():
+    sos = Filtering.design_filter(filter_type="highpass", high_f=.05, sample_f=100, filter_order=2)
+    pad_len = Filtering.settling_samples(sos)
+
+    data = random_walk(n_samples=3 * pad_len + 50000, n_channels=3)
+
+    filtered = Filtering.filter_signals(data=data, filter_type="highpass", high_f=.05, sample_f=100,
+                                        filter_order=2, block_len=10000)
+
+    assert filtered.shape == (3, data.shape[1])
+
+    for channel, filtered_channel in zip(data, filtered):
+        assert np.allclose(filtered_channel, sosfiltfilt(sos, channel), rtol=0, atol=1e-8)
+
+
+def test_filter_signals_requires_2d():
+    with pytest.raises(ValueError):
+        Filtering.filter_signals(data=np.zeros(100), filter_type="lowpass", low_f=5, sample_f=50)
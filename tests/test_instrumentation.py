@@ -0,0 +1,27 @@
+import Instrumentation
+
+
+def make_report(name, n_samples):
+    timer = Instrumentation.StageTimer(name=name)
+
+    with timer.stage(Instrumentation.IMPORT, n_samples=n_samples):
+        with timer.stage(Instrumentation.FILTER, n_samples=n_samples):
+            pass
+
+    return timer
+
+
+def test_aggregate_counts_unnamed_and_duplicate_reports():
+    reports = [make_report(None, 10), make_report(None, 20), make_report("3028", 30), make_report("3028", 40)]
+
+    summary = Instrumentation.aggregate(reports)
+
+    assert list(summary.index) == [Instrumentation.FILTER, Instrumentation.IMPORT]
+    assert list(summary["N subjects"]) == [4, 4]
+    assert list(summary["Samples"]) == [100, 100]
+
+
+def test_aggregate_accepts_dictionaries():
+    reports = [make_report(None, 10).to_dict(), make_report(None, 10)]
+
+    assert list(Instrumentation.aggregate(reports)["N subjects"]) == [2, 2]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+import Nonwear
+
+
+def test_find_bouts():
+    timestamps = pd.date_range("2020-01-01", periods=8, freq="15s")
+    status = np.array([0, 1, 1, 0, 0, 1, 1, 1], dtype=bool)
+
+    bouts = Nonwear.find_bouts(status=status, timestamps=timestamps)
+
+    assert list(bouts["start_index"]) == [1, 5]
+    assert list(bouts["end_index"]) == [3, 8]
+    assert list(bouts["n_epochs"]) == [2, 3]
+
+    # Bout ends at first wear epoch, or the last epoch if non-wear continues to end of data
+    assert list(bouts["start_time"]) == [timestamps[1], timestamps[5]]
+    assert list(bouts["end_time"]) == [timestamps[3], timestamps[7]]
+
+
+def test_find_bouts_of_window_nonwear():
+    epoch_nonwear = np.zeros(100, dtype=bool)
+    epoch_nonwear[30:60] = True
+
+    status = Nonwear.window_nonwear(epoch_nonwear=epoch_nonwear, n_epochs=20, n_epochs_thresh=19, end_gap=1)
+    bouts = Nonwear.find_bouts(status=status)
+
+    assert bouts.shape[0] == 1
+    assert bouts["n_epochs"].sum() == np.asarray(status, dtype=bool).sum()
+    assert "start_time" not in bouts.columns